@@ -0,0 +1,260 @@
+"""
+accounts.py
+"""
+
+import logging
+import threading
+
+from .automod import AutoModClient
+from .clubhouse import Auth
+from .clubhouse import Clubhouse
+from .clubhouse import Config
+from .manager import ChannelManager
+from .ratelimit import RateLimiter
+from .transport import Transport
+
+
+class Account:
+    """
+    One authenticated Clubhouse account.
+
+    Every account gets a transport of its own, so its connections and rate
+    limits are its own: a throttled account does not slow the others down.
+    Circuit breakers and metrics are shared, they describe the hosts.
+    """
+
+    # Endpoints whose throttling counts against the account, see headroom
+    endpoints = frozenset(RateLimiter.LIMITS)
+
+    # A backoff this short, e.g. after a chat throttle message, is not the account being throttled
+    throttle_grace = RateLimiter.THROTTLE_MESSAGE_BACKOFF
+
+    def __init__(self, name, client_id, user_token, user_device=None, transport=None):
+        self.name = name
+        self.client_id = int(client_id)
+        self.user_token = user_token
+        self.user_device = user_device
+        self.transport = transport if transport else Transport(
+            limiter=RateLimiter(Auth.transport.limiter.limits, Auth.transport.limiter.default_limit),
+            breakers=Auth.transport.breakers, metrics=Auth.transport.metrics)
+
+    def __str__(self):
+        return f"Account(name={self.name}, client_id={self.client_id}, headroom={self.headroom():.2f})"
+
+    def get_headers(self, headers=None):
+        """ (Account, dict) -> dict
+
+        Copy of headers, Auth.HEADERS by default, authenticated as this account.
+        """
+        headers = dict(headers if headers else Auth.HEADERS)
+        headers["CH-UserID"] = str(self.client_id)
+        headers["Authorization"] = f"Token {self.user_token}"
+        if self.user_device:
+            headers["CH-DeviceId"] = self.user_device.upper()
+        return headers
+
+    def headroom(self):
+        """ Share of its Clubhouse rate limits the account may use right now, 1 when not throttled. """
+        return self.transport.limiter.headroom(self.endpoints, self.throttle_grace)
+
+    def client(self, client_class=AutoModClient):
+        """ (Account, type) -> AutoModClient
+
+        New client sending every request as this account.
+        """
+        return client_class().use_account(self)
+
+
+class Coordinator:
+    """
+    Moderates rooms with a pool of accounts.
+
+    Every account runs a ChannelManager of its own. A room goes to the account
+    with the most rate limit headroom among the least loaded, and when an
+    account stays throttled for throttle_checks checks in a row its rooms are
+    moved to accounts that are not: the new account joins before the
+    throttled one leaves.
+
+    >>> coordinator = Coordinator(rooms_per_account=5)
+    >>> coordinator.run()
+    """
+
+    def __init__(self, accounts=None, rooms_per_account=10, min_headroom=0.5, check_interval=30,
+                 client_class=AutoModClient, throttle_checks=2):
+        """ (Coordinator, list, int, float, int, type, int) -> NoneType
+
+        accounts defaults to every account in the settings file.
+        An account with less than min_headroom is considered throttled.
+        """
+        if accounts is None:
+            accounts = [Account(**_) for _ in Config.reload_accounts()]
+
+        self.accounts = accounts
+        self.rooms_per_account = rooms_per_account
+        self.min_headroom = min_headroom
+        self.check_interval = check_interval
+        self.client_class = client_class
+        self.throttle_checks = throttle_checks
+        self.strikes = {}
+        self.managers = {}
+        self.rooms = {}
+        self.listeners = []
+        self.watch = None
+        self.lock = threading.Lock()
+
+        for account in accounts:
+            self.managers[account.name] = ChannelManager(
+                rooms_per_account,
+                client_class=lambda account=account: account.client(self.client_class),
+                on_release=lambda channel, account=account: self.release(channel, account)
+            )
+
+    def __str__(self):
+        return f"Coordinator(accounts={len(self.accounts)}, rooms={len(self.rooms)})"
+
+    def throttled(self, account):
+        return account.headroom() < self.min_headroom
+
+    def load(self, account):
+        return len(self.managers[account.name].rooms)
+
+    def pick(self, exclude=()):
+        """ (Coordinator, set) -> Account
+
+        Least loaded account with headroom and capacity, not named in exclude.
+        None if there is none.
+        """
+        accounts = [
+            _ for _ in self.accounts
+            if _.name not in exclude and not self.throttled(_) and self.load(_) < self.rooms_per_account
+        ]
+        if not accounts:
+            return None
+        return min(accounts, key=lambda _: (self.load(_), -_.headroom()))
+
+    def run(self, interval=300):
+        """ (Coordinator, int) -> list
+
+        Listen for pings on every account, and move rooms off throttled
+        accounts every check_interval seconds.
+        """
+        for account in self.accounts:
+            listener = account.client(self.client_class)
+            listener.manager = self
+            listener.automod_active = False
+            listener.waiting_ping_thread = listener.listen_for_ping(interval)
+            self.listeners.append(listener)
+
+        self.watch = Clubhouse.scheduler.schedule_every(
+            self.check_interval, self.check_accounts, name="Coordinator.check_accounts")
+        return self.listeners
+
+    def join(self, channel, notification_id=None, exclude=None):
+        """ (Coordinator, str, str, Account) -> bool
+
+        Join channel with the best account available.
+        Returns None when every account is throttled or at capacity, so the
+        ping is tried again.
+        """
+        with self.lock:
+            if channel in self.rooms and self.rooms[channel] is not exclude:
+                return True
+
+        tried = {exclude.name} if exclude else set()
+        while True:
+            account = self.pick(tried)
+            if account is None:
+                logging.info(f"No account available, not joining {channel}")
+                return None
+
+            tried.add(account.name)
+            join = self.managers[account.name].join(channel, notification_id)
+            if join:
+                with self.lock:
+                    self.rooms[channel] = account
+                logging.info(f"Assigned: {channel} to {account}")
+                return join
+
+            if not self.throttled(account):
+                return join
+
+    def leave(self, channel):
+        account = self.rooms.get(channel)
+        if account:
+            self.managers[account.name].leave(channel)
+
+    def release(self, channel, account=None):
+        """ Forget channel once the account moderating it has left. """
+        with self.lock:
+            if account is None or self.rooms.get(channel) is account:
+                self.rooms.pop(channel, None)
+
+    def failover(self, channel):
+        """ (Coordinator, str) -> bool
+
+        Move channel to another account. The room stays on its account when
+        no other one can take it.
+        """
+        account = self.rooms.get(channel)
+        if account is None:
+            return False
+
+        if not self.join(channel, exclude=account):
+            logging.info(f"No account to fail {channel} over to, staying on {account}")
+            return False
+
+        logging.info(f"Failed over: {channel} from {account} to {self.rooms.get(channel)}")
+        # The room is still moderated, by the new account: it must stay in the snapshot log
+        self.managers[account.name].leave(channel, close_snapshot=False)
+        return True
+
+    def check_accounts(self):
+        """ Move the rooms of every account throttled since the last checks. Runs every check_interval seconds. """
+        for account in self.accounts:
+            if not self.throttled(account):
+                self.strikes[account.name] = 0
+                continue
+
+            self.strikes[account.name] = self.strikes.get(account.name, 0) + 1
+            if self.strikes[account.name] < self.throttle_checks:
+                continue
+
+            rooms = list(self.managers[account.name].rooms)
+            if rooms:
+                logging.info(f"Throttled: {account}, moving {len(rooms)} rooms")
+            for channel in rooms:
+                self.failover(channel)
+
+        return True
+
+    def stats(self):
+        """ (Coordinator) -> dict
+
+        Load and headroom of every account, by name.
+        """
+        return {
+            account.name: {
+                "client_id": account.client_id,
+                "rooms": sorted(self.managers[account.name].rooms),
+                "headroom": round(account.headroom(), 2),
+                "throttled": self.throttled(account),
+            }
+            for account in self.accounts
+        }
+
+    def stop(self):
+        """ (Coordinator) -> NoneType
+
+        Stop listening for pings and leave every room on every account.
+        """
+        if self.watch:
+            self.watch.set()
+
+        for listener in self.listeners:
+            if listener.waiting_ping_thread:
+                listener.waiting_ping_thread.set()
+
+        for manager in self.managers.values():
+            manager.stop()
+
+        logging.info(f"Stopped: {self}")
@@ -0,0 +1,177 @@
+"""
+actions.py
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+from .metrics import Histogram
+
+
+class Action:
+    """ One queued moderation action, e.g. inviting a user to speak. """
+
+    def __init__(self, priority, kind, key, func, args, kwargs):
+        self.priority = priority
+        self.kind = kind
+        self.key = key
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.queued = time.monotonic()
+
+    def __str__(self):
+        return f"Action(kind={self.kind}, key={self.key})"
+
+    def run(self):
+        return self.func(*self.args, **self.kwargs)
+
+
+class ActionQueue:
+    """
+    Moderation actions of one room, run by priority.
+
+    Promoting a moderator goes before inviting a speaker, which goes before
+    welcome messages, which go before announcements; actions of the same kind
+    run first in, first out. An action whose key is already queued is
+    dropped, so a user is never invited or welcomed twice from the backlog.
+
+    Actions are run one at a time by drain(). Given the transport's rate
+    limiter, drain() stops at the first action whose endpoint would have to
+    wait and leaves it for the next call, so a burst of welcome messages never
+    holds a worker thread while the chat bucket refills.
+    """
+
+    PROMOTE_MOD = 0
+    INVITE_SPEAKER = 1
+    WELCOME = 2
+    ANNOUNCEMENT = 3
+
+    KINDS = {
+        PROMOTE_MOD: "promote_mod",
+        INVITE_SPEAKER: "invite_speaker",
+        WELCOME: "welcome",
+        ANNOUNCEMENT: "announcement",
+    }
+
+    # Rate limiter endpoint each kind of action calls
+    ENDPOINTS = {
+        PROMOTE_MOD: "make_moderator",
+        INVITE_SPEAKER: "invite_speaker",
+        WELCOME: "send_channel_message",
+        ANNOUNCEMENT: "send_channel_message",
+    }
+
+    # Queue wait time buckets, in seconds
+    WAIT_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, float("inf"))
+
+    def __init__(self):
+        self.heap = []
+        self.keys = set()
+        self.counter = itertools.count()
+        self.waits = {kind: Histogram(self.WAIT_BUCKETS) for kind in self.KINDS.values()}
+        self.duplicates = 0
+        self.lock = threading.Lock()
+
+    def __str__(self):
+        return f"ActionQueue(depth={len(self.heap)})"
+
+    def __len__(self):
+        return len(self.heap)
+
+    def put(self, priority, key, func, *args, **kwargs):
+        """ (ActionQueue, int, tuple, function) -> bool
+
+        Queue func(*args, **kwargs) at priority.
+        Returns False when an action with the same key is already queued.
+        """
+        with self.lock:
+            if key in self.keys:
+                self.duplicates += 1
+                return False
+
+            action = Action(priority, self.KINDS.get(priority, str(priority)), key, func, args, kwargs)
+            self.keys.add(key)
+            heapq.heappush(self.heap, (priority, next(self.counter), action))
+        return True
+
+    def get(self):
+        """ (ActionQueue) -> Action
+
+        Take the most urgent action, None when the queue is empty.
+        """
+        with self.lock:
+            if not self.heap:
+                return None
+
+            _, _, action = heapq.heappop(self.heap)
+            self.keys.discard(action.key)
+            self.waits[action.kind].observe(time.monotonic() - action.queued)
+        return action
+
+    def peek(self):
+        """ Most urgent action, left in the queue. None when the queue is empty. """
+        with self.lock:
+            return self.heap[0][2] if self.heap else None
+
+    def ready(self, action, limiter):
+        """ (ActionQueue, Action, RateLimiter) -> bool
+
+        Whether action can run without waiting on the rate limit of its endpoint.
+        """
+        endpoint = self.ENDPOINTS.get(action.priority)
+        if limiter is None or endpoint is None:
+            return True
+
+        bucket = limiter.bucket(endpoint)
+        wait = bucket.reserve()
+        bucket.refund()
+        return wait <= 0
+
+    def drain(self, limit=None, limiter=None):
+        """ (ActionQueue, int, RateLimiter) -> int
+
+        Run queued actions until the queue is empty, limit actions were run,
+        or, with limiter, the next action would wait on its rate limit.
+        Returns the number run.
+        """
+        count = 0
+        while limit is None or count < limit:
+            action = self.peek()
+            if action is None or not self.ready(action, limiter):
+                break
+
+            action = self.get()
+            try:
+                action.run()
+            except Exception as error:
+                logging.exception(f"{action} {error}")
+            count += 1
+        return count
+
+    def clear(self):
+        with self.lock:
+            self.heap = []
+            self.keys = set()
+
+    def stats(self):
+        """ (ActionQueue) -> dict
+
+        Queue depth by kind, and how long actions of each kind waited.
+        """
+        with self.lock:
+            depth = {kind: 0 for kind in self.KINDS.values()}
+            for _, _, action in self.heap:
+                depth[action.kind] = depth.get(action.kind, 0) + 1
+            oldest = min((action.queued for _, _, action in self.heap), default=None)
+
+            return {
+                "depth": len(self.heap),
+                "queued": depth,
+                "oldest": round(time.monotonic() - oldest, 3) if oldest is not None else 0,
+                "duplicates": self.duplicates,
+                "wait": {kind: histogram.snapshot() for kind, histogram in self.waits.items()},
+            }
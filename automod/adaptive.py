@@ -0,0 +1,87 @@
+"""
+adaptive.py
+"""
+
+import threading
+import time
+from collections import deque
+
+
+class ActivityMeter:
+    """
+    Counts activity in a room over a sliding window: users joining or
+    leaving, chat commands, ... Adaptive intervals poll faster as it rises.
+    """
+
+    def __init__(self, window=120):
+        self.window = window
+        self.events = deque()
+        self.totals = {}
+        self.lock = threading.Lock()
+
+    def __str__(self):
+        return f"ActivityMeter(rate={self.rate():.1f}/min, totals={self.totals})"
+
+    def record(self, kind, count=1):
+        if count <= 0:
+            return
+
+        now = time.monotonic()
+        with self.lock:
+            self.events.append((now, count))
+            self.totals[kind] = self.totals.get(kind, 0) + count
+            self.prune(now)
+
+    def rate(self):
+        """ (ActivityMeter) -> float
+
+        Events per minute over the window.
+        """
+        with self.lock:
+            self.prune(time.monotonic())
+            return sum(count for _, count in self.events) * 60 / self.window
+
+    def prune(self, now):
+        """ Drop events older than the window. Must be called with the lock held. """
+        while self.events and now - self.events[0][0] > self.window:
+            self.events.popleft()
+
+
+class AdaptiveInterval:
+    """
+    Polling interval between min_interval and max_interval set by activity.
+
+    An idle room is polled every max_interval seconds, a room with busy_rate
+    events per minute or more every min_interval seconds, and anything in
+    between on a geometric scale.
+    """
+
+    BUSY_RATE = 6
+
+    def __init__(self, interval, min_interval, max_interval, meter, busy_rate=None):
+        self.interval = interval
+        self.min_interval = min(min_interval, interval)
+        self.max_interval = max(max_interval, interval)
+        self.meter = meter
+        self.busy_rate = busy_rate if busy_rate else self.BUSY_RATE
+
+    def __str__(self):
+        return "AdaptiveInterval(interval={:.1f}, bounds=({}, {}), rate={:.1f}/min)".format(
+            self.interval,
+            self.min_interval,
+            self.max_interval,
+            self.effective_rate()
+        )
+
+    def next_interval(self):
+        """ (AdaptiveInterval) -> float
+
+        Seconds until the next poll, given the current activity.
+        """
+        busy = min(1, self.meter.rate() / self.busy_rate)
+        self.interval = self.max_interval * (self.min_interval / self.max_interval) ** busy
+        return self.interval
+
+    def effective_rate(self):
+        """ Polls per minute at the current interval. """
+        return 60 / self.interval
@@ -0,0 +1,228 @@
+"""
+aioautomod.py
+
+Asyncio run loop for the AutoMod client.
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from functools import wraps
+
+from .automod import AutoModClient
+from .clubhouse import get_adaptive_interval
+from .scheduler import Cadence
+
+
+def run_automod_client(interval=300):
+    asyncio.run(AsyncAutoModClient().run_automod(interval))
+
+
+class TaskHandle:
+    """
+    Handle of a periodic asyncio task, returned where set_interval returns a job.
+
+    set() cancels the task and can be called from any thread.
+    """
+
+    def __init__(self, loop, future, name):
+        self.loop = loop
+        self.future = future
+        self.name = name
+
+    def __str__(self):
+        return f"TaskHandle(name={self.name}, done={self.is_set()})"
+
+    def cancel(self):
+        if isinstance(self.future, asyncio.Future):
+            self.loop.call_soon_threadsafe(self.future.cancel)
+        else:
+            self.future.cancel()
+
+    set = cancel
+
+    def is_set(self):
+        return self.future.done()
+
+    isSet = is_set
+
+
+class AsyncAutoModClient(AutoModClient):
+    """
+    AutoModClient whose loops run as tasks in one asyncio event loop.
+
+    Ping listening, channel refresh, chat handling, welcoming, keep alive and
+    announcements are each a task sleeping on the event loop between runs.
+    A run executes the same blocking step as the threaded client, on a small
+    executor of workers threads, so only the steps in progress hold a thread.
+
+    Every task started for a room belongs to that room. Leaving the room
+    cancels all of them and waits for steps in progress to return, and
+    stop() does the same for the whole client.
+
+    >>> asyncio.run(AsyncAutoModClient().run_automod())
+    """
+
+    workers = 8
+
+    def __init__(self):
+        super().__init__()
+        self.loop = None
+        self.executor = None
+        self.stopped = None
+        self.tasks = set()
+        self.room_tasks = set()
+        self.room_channel = None
+
+    async def run_automod(self, interval=300):
+        """ (AsyncAutoModClient, int) -> NoneType
+
+        Listen for pings and moderate the rooms they lead to until stop() is called.
+        """
+        self.loop = asyncio.get_running_loop()
+        self.executor = ThreadPoolExecutor(self.workers, thread_name_prefix="automod-step")
+        self.stopped = asyncio.Event()
+        self.automod_active = False
+        if not await self.run_step(self.resume_rooms):
+            self.waiting_ping_thread = self.listen_for_ping(interval)
+
+        try:
+            await self.stopped.wait()
+        finally:
+            await self.shutdown()
+
+    def stop(self):
+        """ Stop run_automod. Can be called from any thread. """
+        if self.loop and self.stopped:
+            self.loop.call_soon_threadsafe(self.stopped.set)
+
+    async def shutdown(self):
+        """ (AsyncAutoModClient) -> NoneType
+
+        Leave the active room, cancel every task and wait for them to finish.
+        """
+        if self.automod_active and self.room_channel:
+            await self.run_step(self.terminate_channel_init, self.room_channel)
+
+        # Steps finishing during cancellation may still start tasks
+        while self.tasks:
+            tasks = list(self.tasks)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        self.executor.shutdown(wait=True)
+        logging.info("Stopped: AsyncAutoModClient")
+
+    async def run_step(self, func, *args, **kwargs):
+        """ (AsyncAutoModClient, function) -> any
+
+        Run a blocking step on the executor. When cancelled, the step is allowed
+        to return before the cancellation propagates, so nothing outlives its task.
+        """
+        future = self.loop.run_in_executor(self.executor, partial(func, *args, **kwargs))
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            await asyncio.wait([future])
+            raise
+
+    async def run_interval(self, interval, func, args, kwargs, adaptive=None, cadence=None):
+        cadence = cadence if cadence else Cadence()
+        due = cadence.first_due(time.monotonic(), interval, interval)
+        while True:
+            await asyncio.sleep(max(0, due - time.monotonic()))
+            run = await self.run_step(func, *args, **kwargs)
+            if not run:
+                logging.info(f"Stopped: {func}")
+                return
+
+            if adaptive:
+                interval = adaptive.next_interval()
+            due = cadence.next_due(time.monotonic(), interval)
+
+    def start_interval(self, interval, func, *args, room=True, adaptive=None, fixed_rate=False, jitter=0, **kwargs):
+        """ (AsyncAutoModClient, float, function) -> TaskHandle
+
+        Run func every interval seconds as a task until it returns a falsy value.
+        Safe to call from the event loop and from executor threads.
+        """
+        coro = self.run_interval(interval, func, args, kwargs, adaptive, Cadence(fixed_rate, jitter))
+        if self.in_loop():
+            future = self.track(self.loop.create_task(coro), room)
+        else:
+            future = asyncio.run_coroutine_threadsafe(self.track_async(coro, room), self.loop)
+
+        logging.info(f"Started: {func}")
+        handle = TaskHandle(self.loop, future, getattr(func, "__qualname__", repr(func)))
+        return self.lifecycle.register(self.session if room else None, handle)
+
+    def in_loop(self):
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    def track(self, task, room):
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        if room:
+            self.room_tasks.add(task)
+            task.add_done_callback(self.room_tasks.discard)
+        return task
+
+    async def track_async(self, coro, room):
+        self.track(asyncio.current_task(), room)
+        return await coro
+
+    def set_interval(self, interval, fixed_rate=False, jitter=0):
+        """ Instance counterpart of Clubhouse.set_interval, for the announcement closures. """
+        def decorator(func):
+            @wraps(func)
+            def wrap(*args, **kwargs):
+                return self.start_interval(interval, func, *args, fixed_rate=fixed_rate, jitter=jitter, **kwargs)
+
+            return wrap
+
+        return decorator
+
+    def interval_method(self, method, *args, room=True, **kwargs):
+        return self.start_interval(
+            method.interval, method.__wrapped__, self, *args, room=room,
+            adaptive=get_adaptive_interval(self, method), fixed_rate=method.fixed_rate, jitter=method.jitter, **kwargs)
+
+    def keep_alive_ping(self, channel):
+        return self.interval_method(AutoModClient.keep_alive_ping, channel)
+
+    def run_actions(self, channel):
+        return self.interval_method(AutoModClient.run_actions, channel)
+
+    def snapshot_room_loop(self, channel):
+        return self.interval_method(AutoModClient.snapshot_room_loop, channel)
+
+    def listen_for_ping(self, interval=300, dump_interval=4):
+        return self.interval_method(AutoModClient.listen_for_ping, interval, dump_interval, room=False)
+
+    def active_channel_init(self, channel, reconnect_interval=10, reconnect_timeout=120, dump_interval=16):
+        self.room_channel = channel
+        return self.interval_method(
+            AutoModClient.active_channel_init, channel, reconnect_interval, reconnect_timeout, dump_interval)
+
+    def chat_client_init(self, channel, response_interval=300):
+        return self.interval_method(AutoModClient.chat_client_init, channel, response_interval)
+
+    def welcome_client_init(self, channel):
+        return self.interval_method(AutoModClient.welcome_client_init, channel)
+
+    def terminate_channel_init(self, channel, close_snapshot=True):
+        super().terminate_channel_init(channel, close_snapshot)
+        self.room_channel = None
+
+        # Announcements and anything else started for the room go with it
+        self.loop.call_soon_threadsafe(self.cancel_room_tasks)
+
+    def cancel_room_tasks(self):
+        for task in list(self.room_tasks):
+            task.cancel()
@@ -0,0 +1,385 @@
+"""
+aioclubhouse.py
+
+Awaitable variant of the Clubhouse API wrapper.
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import time
+from functools import partial
+from functools import wraps
+
+import requests
+
+from .clubhouse import Auth
+from .clubhouse import Client
+from .clubhouse import User
+from .clubhouse import Notifications
+from .clubhouse import Channel
+from .clubhouse import ChannelMod
+from .clubhouse import ChannelChat
+from .clubhouse import Message
+from .clubhouse import Event
+from .clubhouse import Club
+from .clubhouse import Topic
+from .clubhouse import parse_response
+from .clubhouse import record_retry
+from .decoding import loads
+from .transport import CircuitOpenError
+from .transport import Deadline
+from .transport import DeadlineExceeded
+from .transport import get_body_size
+from .transport import get_endpoint
+from .transport import get_host
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class PendingRequest:
+    """ A request built by a blocking endpoint but not sent yet. """
+
+    def __init__(self, method, url, kwargs):
+        self.method = method
+        self.url = url
+        self.kwargs = kwargs
+
+
+class RequestRecorder:
+    """
+    Stand-in transport handed to the blocking endpoint classes.
+
+    Instead of sending anything, it returns the request the endpoint would
+    have sent so the async transport can send it instead. It keeps no state,
+    so concurrent calls can share one recorder.
+
+    Headers and payloads are copied: endpoints like update_photo change
+    self.HEADERS back right after building the request, before it is sent.
+    """
+
+    def request(self, method, url, **kwargs):
+        for name in ("headers", "params", "data", "json"):
+            if isinstance(kwargs.get(name), dict):
+                kwargs[name] = dict(kwargs[name])
+        return PendingRequest(method, url, kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+
+class AsyncResponse:
+    """ Minimal requests.Response lookalike so parse_response and RetryPolicy apply unchanged. """
+
+    def __init__(self, method, url, status_code, reason, content, headers=None):
+        self.method = method
+        self.url = url
+        self.status_code = status_code
+        self.reason = reason
+        self.content = content
+        self.headers = headers or {}
+        self.request = PendingRequest(method, url, {})
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return loads(self.content)
+
+    def raise_for_status(self):
+        if 400 <= self.status_code < 600:
+            raise requests.exceptions.HTTPError(
+                f"{self.status_code} Error: {self.reason} for url: {self.url}", response=self)
+
+
+class AsyncTransport:
+    """
+    Non-blocking counterpart of Transport.
+
+    Uses aiohttp when it is installed. Without it, requests are handed to the
+    shared blocking transport on the default executor so the API stays usable.
+    Unless given its own limiter, it shares the rate limiter of Auth.transport.
+    It always shares the circuit breakers of Auth.transport, and honours the
+    Deadline around the awaiting code like the blocking transport does.
+    """
+
+    def __init__(self, limit=100, limit_per_host=100, keepalive_timeout=30, limiter=None):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.limiter = limiter
+        self.session = None
+
+        if not aiohttp:
+            logging.warning("aiohttp is not installed. Falling back to the blocking transport.")
+
+    def __str__(self):
+        return "AsyncTransport(limit={}, limit_per_host={}, aiohttp={})".format(
+            self.limit,
+            self.limit_per_host,
+            bool(aiohttp)
+        )
+
+    def get_session(self):
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            self.session = aiohttp.ClientSession(connector=connector)
+        return self.session
+
+    async def request(self, method, url, headers=None, **kwargs):
+        """ (AsyncTransport, str, str, dict) -> AsyncResponse or requests.Response
+
+        Send a request. Transport failures are raised as requests exceptions,
+        carrying the request like the ones raised by requests do.
+        """
+        # aiohttp has no equivalent for requests' files= upload
+        if not aiohttp or "files" in kwargs:
+            loop = asyncio.get_running_loop()
+            # The deadline of this task goes along to the executor thread
+            context = contextvars.copy_context()
+            call = partial(context.run, Auth.transport.request, method, url, headers=headers, **kwargs)
+            return await loop.run_in_executor(None, call)
+
+        endpoint = get_endpoint(url)
+        metrics = Auth.transport.metrics
+        breaker = Auth.transport.breakers.get(get_host(url))
+        if not breaker.allow_request():
+            metrics.record_request(endpoint, method, error="CircuitOpenError")
+            raise CircuitOpenError(f"Circuit open for {breaker.name}, retry in {breaker.retry_after():.0f}s")
+
+        limiter = self.limiter if self.limiter else Auth.transport.limiter
+        bucket = limiter.bucket(endpoint)
+        queue_time = max(0, bucket.reserve())
+        time_left = Deadline.time_left()
+        if time_left is not None and queue_time > time_left:
+            bucket.refund()
+            metrics.record_request(endpoint, method, error="DeadlineExceeded")
+            raise DeadlineExceeded(f"Deadline exceeded waiting for the {endpoint} rate limit")
+
+        if queue_time > 0:
+            await asyncio.sleep(queue_time)
+
+        if "json" in kwargs:
+            bytes_sent = len(json.dumps(kwargs["json"]).encode())
+        else:
+            bytes_sent = get_body_size(kwargs.get("data"))
+
+        connect_timeout, read_timeout = Auth.transport.get_timeout()
+        timeout = aiohttp.ClientTimeout(
+            total=Deadline.time_left(), sock_connect=connect_timeout, sock_read=read_timeout)
+        kwargs.setdefault("timeout", timeout)
+
+        request = PendingRequest(method, url, {})
+        session = self.get_session()
+        started = time.perf_counter()
+        try:
+            async with session.request(method, url, headers=headers, **kwargs) as resp:
+                content = await resp.read()
+                response = AsyncResponse(method, url, resp.status, resp.reason, content, resp.headers)
+
+        except asyncio.TimeoutError as timeout_error:
+            breaker.record_failure()
+            metrics.record_request(
+                endpoint, method, latency=time.perf_counter() - started, bytes_sent=bytes_sent, queue_time=queue_time,
+                error="Timeout")
+            raise requests.exceptions.Timeout(timeout_error, request=request)
+
+        except aiohttp.ClientConnectionError as conn_error:
+            breaker.record_failure()
+            metrics.record_request(
+                endpoint, method, latency=time.perf_counter() - started, bytes_sent=bytes_sent, queue_time=queue_time,
+                error="ConnectionError")
+            raise requests.exceptions.ConnectionError(conn_error, request=request)
+
+        except aiohttp.ClientError as client_error:
+            metrics.record_request(
+                endpoint, method, latency=time.perf_counter() - started, bytes_sent=bytes_sent, queue_time=queue_time,
+                error="RequestException")
+            raise requests.exceptions.RequestException(client_error, request=request)
+
+        latency = time.perf_counter() - started
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+        limiter.update(endpoint, response)
+        metrics.record_request(
+            endpoint, method, response.status_code, latency, bytes_sent, len(content), queue_time)
+        return response
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+            logging.info(f"Closed: {self}")
+
+
+class AsyncEndpoints:
+    """
+    Awaitable view over one of the blocking endpoint classes.
+
+    Every method decorated with validate_response becomes a coroutine that
+    builds the exact same request (headers, auth, payload) and decodes the
+    reply with the same parse_response. Anything else is passed through.
+
+    Calls are never served from the response cache, nor coalesced, but a call
+    that succeeds invalidates the same cached responses as its blocking
+    counterpart, so blocking callers never read what it made stale.
+    """
+
+    def __init__(self, endpoints, transport):
+        self.endpoints = endpoints
+        self.endpoints.transport = RequestRecorder()
+        self.transport = transport
+
+    def __getattr__(self, name):
+        attr = getattr(self.endpoints, name)
+        method = getattr(type(self.endpoints), name, None)
+        build_request = getattr(method, "build_request", None)
+        if build_request is None:
+            return attr
+
+        invalidated = getattr(method, "invalidated", ())
+
+        @wraps(attr)
+        async def call(*args, **kwargs):
+            response = await self.dispatch(build_request, *args, **kwargs)
+            if invalidated and isinstance(response, dict) and response.get("success") is not False:
+                self.endpoints.response_cache.invalidate(*invalidated)
+            return response
+
+        return call
+
+    async def dispatch(self, build_request, *args, **kwargs):
+        """ (AsyncEndpoints, function) -> dict
+
+        Build a request with the blocking endpoint and send it asynchronously.
+        """
+        req = build_request(self.endpoints, *args, **kwargs)
+
+        # Some endpoints validate their arguments and return early
+        if not isinstance(req, PendingRequest):
+            return req
+
+        policy = self.endpoints.retry_policy
+        name = build_request.__name__
+        started = time.monotonic()
+        attempt = 0
+
+        # Same retry rules as validate_response
+        while True:
+            try:
+                response = await self.transport.request(req.method, req.url, **req.kwargs)
+
+            except requests.exceptions.RequestException as req_error:
+                if policy.should_retry_error(req_error) and await self.backoff(name, req, attempt, started, req_error):
+                    attempt += 1
+                    continue
+
+                logging.error(f"{name} {req_error}")
+                return {"success": False}
+
+            if policy.should_retry_response(response):
+                if await self.backoff(name, req, attempt, started, response.status_code):
+                    attempt += 1
+                    continue
+
+            return parse_response(response, name, self.endpoints.decoder)
+
+    async def backoff(self, name, req, attempt, started, reason):
+        """ (AsyncEndpoints, str, PendingRequest, int, float, any) -> bool
+
+        Wait before retry number attempt + 1 without blocking the loop, as
+        RetryPolicy.wait does. Returns False, without waiting, if there is none.
+        """
+        backoff = self.endpoints.retry_policy.next_wait(attempt, started)
+        if backoff is None:
+            return False
+
+        record_retry(Auth.transport, req, name)
+        logging.info(f"Retrying {name} ({attempt + 1}): {reason}")
+        await asyncio.sleep(backoff)
+        return True
+
+
+class AsyncMessage(AsyncEndpoints):
+    """ Message endpoints that chain several calls need their own coroutines. """
+
+    async def get_message_thread(self, participant_ids):
+        _search = await self.search_messages(participant_ids)
+        req = {"success": False, "Internal Response": "No chat history"}
+        if _search.get("success"):
+            if _search.get("chats"):
+                chat_id = _search.get("chats")[0].get("chat_id")
+                req = await self.get_message(chat_id)
+        return req
+
+    async def get_message_id(self, participant_ids):
+        chat_id = False
+        _search = await self.search_messages(participant_ids)
+        if _search.get("success"):
+            if _search.get("chats"):
+                chat_id = _search.get("chats")[0].get("chat_id")
+        else:
+            req = await self.create_message(participant_ids)
+            if req.get("success"):
+                chat_id = req["chat_id"]
+                logging.info(req)
+        return chat_id
+
+    async def send(self, message, chat_id=None, participant_ids=None):
+        if not chat_id:
+            chat_id = await self.get_message_id(participant_ids)
+        return await self.dispatch(Message.send.build_request, message, chat_id)
+
+
+class AsyncClubhouse:
+    """
+    Asyncio counterpart of the Clubhouse facade.
+
+    >>> async with AsyncClubhouse() as clubhouse:
+    ...     channel_info = await clubhouse.channel.get_channel(channel)
+    """
+
+    def __init__(self, transport=None):
+        self.transport = transport if transport else AsyncTransport()
+        self.auth = AsyncEndpoints(Auth(), self.transport)
+        self.client = AsyncEndpoints(Client(), self.transport)
+        self.user = AsyncEndpoints(User(), self.transport)
+        self.notifications = AsyncEndpoints(Notifications(), self.transport)
+        self.channel = AsyncEndpoints(Channel(), self.transport)
+        self.mod = AsyncEndpoints(ChannelMod(), self.transport)
+        self.chat = AsyncEndpoints(ChannelChat(), self.transport)
+        self.message = AsyncMessage(Message(), self.transport)
+        self.event = AsyncEndpoints(Event(), self.transport)
+        self.club = AsyncEndpoints(Club(), self.transport)
+        self.topic = AsyncEndpoints(Topic(), self.transport)
+
+    @property
+    def client_id(self):
+        return self.auth.client_id
+
+    @property
+    def HEADERS(self):
+        return self.auth.HEADERS
+
+    async def close(self):
+        await self.transport.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
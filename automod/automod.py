@@ -2,23 +2,57 @@
 
 
 import logging
+import time
 from datetime import datetime
 import pytz
 
 # import sys
 # sys.path.append("/Users/deon/Documents/GitHub/ch_auto_mod/automod")
 
+from automod.clubhouse import Clubhouse
 from automod.moderator import ModClient as Mod
 from automod.chat import ChatClient as Chat
 from automod.audio import AudioClient as Audio
 from automod.tracker import Tracker
+from automod.session import SessionAttribute
+from automod.dedupe import BoundedSet
+from automod.snapshot import SnapshotLog
+from automod.roomstate import RoomState
 
 
 set_interval = Mod.set_interval
 
 
-def run_automod_client(interval=300):
-    AutoModClient().run_automod(interval)
+def run_automod_client(interval=300, processes=0, snapshot_file=None):
+    """ With processes, rooms are sharded across that many worker processes, see supervisor.py.
+    With snapshot_file, rooms are snapshotted there and resumed on restart, see snapshot.py;
+    sharded rooms are snapshotted to one file per shard.
+    Runs until interrupted, then cancels every background task before exiting.
+    """
+    supervisor = None
+    try:
+        if not processes:
+            if snapshot_file:
+                Mod.snapshots = SnapshotLog(snapshot_file)
+            AutoModClient().run_automod(interval)
+        else:
+            # Imported here, the supervisor module builds on AutoModClient
+            from automod.supervisor import Supervisor
+            supervisor = Supervisor(processes, snapshot_file=snapshot_file)
+            supervisor.run(interval)
+
+        # Background tasks run on daemon threads, the process has to stay up for them.
+        # Short sleeps, so Ctrl-C is seen whichever thread the signal lands on
+        while True:
+            time.sleep(1)
+
+    except KeyboardInterrupt:
+        logging.info("Interrupted")
+
+    finally:
+        if supervisor:
+            supervisor.stop()
+        Clubhouse.shutdown()
 
 
 # noinspection DuplicatedCode
@@ -29,8 +63,22 @@ class AutoModClient(Mod, Chat, Audio, Tracker):
 
     def run_automod(self, interval=300):
         self.automod_active = False
+        if self.resume_rooms():
+            return
+
         self.waiting_ping_thread = self.listen_for_ping(interval)
 
+    def resume_rooms(self):
+        """ (AutoModClient) -> bool
+
+        Pick up where the last run left off: resume the first snapshotted room still open.
+        """
+        rooms = self.snapshots.rooms() if self.snapshots else {}
+        for channel, state in rooms.items():
+            if self.automod_resume(channel, state):
+                return True
+        return False
+
     @set_interval(30)
     def listen_for_ping(self, interval=300, dump_interval=4):
         logging.info("Waiting for ping")
@@ -48,7 +96,8 @@ class AutoModClient(Mod, Chat, Audio, Tracker):
                 continue
 
             respond = self.ping_responder(notification, notification_id, interval)
-            if respond:
+            # A manager keeps listening for pings to more rooms
+            if respond and not self.manager:
                 return False
 
         if self.dump_counter == dump_interval:
@@ -92,7 +141,11 @@ class AutoModClient(Mod, Chat, Audio, Tracker):
         user_name = notification.get("user_profile").get("name")
         logging.info(f"Client pinged to {channel} by {user_name}: {message}")
 
-        join = self.automod_init(channel, notification_id)
+        if self.manager:
+            join = self.manager.join(channel, notification_id)
+        else:
+            join = self.automod_init(channel, notification_id)
+
         if join:
             self.scanned_notifications_set.add(notification_id)
 
@@ -100,11 +153,10 @@ class AutoModClient(Mod, Chat, Audio, Tracker):
 
     def automod_init(
             self, channel, notification_id=None, api_retry_interval_sec=10, thread_timeout=120,
-            announcement=None, announcement_interval_min=60, announcement_delay=None):
+            announcement=None, announcement_interval_min=60):
 
         join_info = self.channel_init(
-            channel, api_retry_interval_sec, thread_timeout, announcement, announcement_interval_min,
-            announcement_delay)
+            channel, api_retry_interval_sec, thread_timeout, announcement, announcement_interval_min)
 
         if join_info is False:
             self.ping_responded_set.add(channel)
@@ -123,14 +175,7 @@ class AutoModClient(Mod, Chat, Audio, Tracker):
                 logging.info("Channel is closed")
             return
 
-        if self.waiting_ping_thread:
-            self.waiting_ping_thread.set()
-
-        self.active_channel_thread = self.active_channel_init(channel)
-        self.chat_client_thread = self.chat_client_init(channel)
-        self.welcome_client_thread = self.welcome_client_init(channel)
-        self.automod_active = True
-        self.ping_responded_set.add(channel)
+        self.start_automod(channel)
         self.scanned_notifications_set.add(notification_id)
         logging.info(f"Scanned notifications: {self.scanned_notifications_set}")
 
@@ -139,17 +184,42 @@ class AutoModClient(Mod, Chat, Audio, Tracker):
 
         return True
 
-    @set_interval(15)
+    def automod_resume(self, channel, state, api_retry_interval_sec=10, thread_timeout=120):
+        """ (AutoModClient, str, dict, int, int) -> bool
+
+        Resume moderating channel from its snapshot, see ModClient.resume_channel.
+        """
+        if not self.resume_channel(channel, state, api_retry_interval_sec, thread_timeout):
+            return False
+
+        self.start_automod(channel)
+        return True
+
+    def start_automod(self, channel):
+        if self.waiting_ping_thread:
+            self.waiting_ping_thread.set()
+
+        self.automod_active = True
+        self.ping_responded_set.add(channel)
+
+        # Moderation starts once the client is speaker and mod, never if the room closes first
+        def on_active(future):
+            if not future.cancelled() and self.automod_active:
+                self.active_channel_thread = self.active_channel_init(channel)
+                self.chat_client_thread = self.chat_client_init(channel)
+                self.welcome_client_thread = self.welcome_client_init(channel)
+
+        self.room_state.when(RoomState.ACTIVE).add_done_callback(on_active)
+
+    @set_interval(15, min_interval=5, max_interval=60)
     def active_channel_init(
-            self, channel, message_delay=2, reconnect_interval=10, reconnect_timeout=120, dump_interval=16):
+            self, channel, reconnect_interval=10, reconnect_timeout=120, dump_interval=16):
 
-        channel_info = self.active_channel(channel, message_delay, reconnect_interval, reconnect_timeout)
+        channel_info = self.active_channel(channel, reconnect_interval, reconnect_timeout)
 
+        # Reconnecting or waiting for privileges, closing the room stops this loop
         if not channel_info:
-            self.automod_active = False
-            self.waiting_ping_thread = self.listen_for_ping()
-            self.terminate_channel_init(channel)
-            return
+            return self.automod_active
 
         self.chat_active = self.get_chat_enabled(channel_info)
 
@@ -168,24 +238,38 @@ class AutoModClient(Mod, Chat, Audio, Tracker):
 
         return True
 
-    @set_interval(20)
-    def chat_client_init(self, channel, response_interval=300, response_delay=10):
-        if not self.chat_active:
+    @set_interval(20, min_interval=5, max_interval=60)
+    def chat_client_init(self, channel, response_interval=300):
+        # Paused while reconnecting or waiting for privileges again
+        if not self.chat_active or not self.room_is_active():
             return True
-        self.run_chat_client(channel, response_interval, response_delay)
+        self.run_chat_client(channel, response_interval)
         return True
 
-    @set_interval(20)
-    def welcome_client_init(self, channel, message_delay=5):
+    @set_interval(20, min_interval=5, max_interval=60)
+    def welcome_client_init(self, channel):
+        if not self.room_is_active():
+            return True
         user_info = self.get_users_info(channel)
         if not user_info:
             return True
-        self.welcome_guests(channel, user_info, message_delay)
+        self.welcome_guests(channel, user_info)
         return True
 
-    def terminate_channel_init(self, channel):
+    def room_closed(self, channel):
+        self.automod_active = False
+        self.terminate_channel_init(channel)
+        self.channel_exited(channel)
+
+    def channel_exited(self, channel):
+        if self.manager:
+            self.manager.release(channel)
+        else:
+            self.waiting_ping_thread = self.listen_for_ping()
+
+    def terminate_channel_init(self, channel, close_snapshot=True):
 
-        self.terminate_channel(channel)
+        self.terminate_channel(channel, close_snapshot)
 
         if self.active_channel_thread:
             self.active_channel_thread.set()
@@ -197,16 +281,20 @@ class AutoModClient(Mod, Chat, Audio, Tracker):
             self.welcome_client_thread.set()
 
 
-    automod_active = None
-    chat_active = None
+    # Room state, stored on self.session
+    automod_active = SessionAttribute()
+    chat_active = SessionAttribute()
+    active_channel_thread = SessionAttribute()
+    chat_client_thread = SessionAttribute()
+    welcome_client_thread = SessionAttribute()
 
-    ping_responded_set = set()
-    scanned_notifications_set = set()
+    # Pings older than the listen interval are ignored anyway, a day is plenty
+    ping_responded_set = BoundedSet(maxlen=1000, ttl=24 * 3600)
+    scanned_notifications_set = BoundedSet(maxlen=10000, ttl=24 * 3600)
 
+    # Set when the client moderates one of the rooms of a ChannelManager
+    manager = None
     waiting_ping_thread = None
-    active_channel_thread = None
-    chat_client_thread = None
-    welcome_client_thread = None
 
     chat_counter = 0
     dump_counter = 0
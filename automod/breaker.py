@@ -0,0 +1,138 @@
+"""
+breaker.py
+"""
+
+import logging
+import threading
+import time
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one host.
+
+    closed: requests go through and consecutive failures are counted.
+    open: requests fail fast until recovery_timeout has passed.
+    half_open: a single trial request is let through. Success closes the
+    circuit again, failure re-opens it. A trial that never reports back is
+    replaced after another recovery_timeout.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, failure_threshold=5, recovery_timeout=30, listeners=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.listeners = listeners if listeners is not None else []
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.trial_started = None
+        self.lock = threading.Lock()
+
+    def __str__(self):
+        return f"CircuitBreaker(name={self.name}, state={self.state}, failures={self.failures})"
+
+    def set_state(self, state):
+        """ Change state and notify listeners. Must be called with the lock held. """
+        previous = self.state
+        if previous == state:
+            return
+
+        self.state = state
+        for listener in self.listeners:
+            try:
+                listener(self.name, previous, state)
+            except Exception as error:
+                logging.error(f"Circuit breaker listener {listener} {error}")
+
+    def allow_request(self):
+        """ (CircuitBreaker) -> bool
+
+        Whether a request may be sent now.
+        """
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+
+            now = time.monotonic()
+            if self.state == self.OPEN:
+                if now - self.opened_at < self.recovery_timeout:
+                    return False
+                self.set_state(self.HALF_OPEN)
+                self.trial_started = None
+
+            if self.trial_started is None or now - self.trial_started > self.recovery_timeout:
+                self.trial_started = now
+                return True
+
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.trial_started = None
+            self.set_state(self.CLOSED)
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self.trial_started = None
+                self.set_state(self.OPEN)
+
+    def retry_after(self):
+        """ (CircuitBreaker) -> float
+
+        Seconds until an open circuit lets a trial request through.
+        """
+        with self.lock:
+            if self.state != self.OPEN:
+                return 0
+            return max(0, self.opened_at + self.recovery_timeout - time.monotonic())
+
+
+class CircuitBreakers:
+    """
+    One CircuitBreaker per host, created on first use.
+
+    Listeners are called as listener(host, previous_state, new_state) on every
+    state transition of any breaker.
+    """
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.listeners = [self.log_transition]
+        self.breakers = {}
+        self.lock = threading.Lock()
+
+    def get(self, host):
+        with self.lock:
+            breaker = self.breakers.get(host)
+            if breaker is None:
+                breaker = self.breakers[host] = CircuitBreaker(
+                    host, self.failure_threshold, self.recovery_timeout, self.listeners)
+            return breaker
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def states(self):
+        """ (CircuitBreakers) -> dict
+
+        Current state of every known host.
+        """
+        with self.lock:
+            return {host: breaker.state for host, breaker in self.breakers.items()}
+
+    @staticmethod
+    def log_transition(host, previous, state):
+        if state == CircuitBreaker.OPEN:
+            logging.warning(f"Circuit {host}: {previous} -> {state}")
+        else:
+            logging.info(f"Circuit {host}: {previous} -> {state}")
@@ -0,0 +1,211 @@
+"""
+cache.py
+"""
+
+import logging
+import shelve
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+
+class MemoryCache:
+    """ In-memory LRU cache with a time to live per entry. """
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+
+            expires, value = entry
+            if expires <= time.time():
+                del self.entries[key]
+                return None
+
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (time.time() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, endpoint):
+        """ (MemoryCache, str) -> int
+
+        Drop every entry of endpoint. Returns the number of entries dropped.
+        """
+        with self.lock:
+            keys = [key for key in self.entries if key[0] == endpoint]
+            for key in keys:
+                del self.entries[key]
+            return len(keys)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class DiskCache:
+    """
+    On-disk cache backed by shelve, so entries survive a restart.
+
+    Expired entries are dropped when read, or when more than maxsize entries
+    are stored.
+    """
+
+    def __init__(self, filename="automod_cache", maxsize=2048):
+        self.filename = filename
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def get_key(key):
+        return repr(key)
+
+    def get(self, key):
+        with self.lock, shelve.open(self.filename) as shelf:
+            entry = shelf.get(self.get_key(key))
+            if entry is None:
+                return None
+
+            expires, endpoint, value = entry
+            if expires <= time.time():
+                del shelf[self.get_key(key)]
+                return None
+
+            return value
+
+    def set(self, key, value, ttl):
+        with self.lock, shelve.open(self.filename) as shelf:
+            shelf[self.get_key(key)] = (time.time() + ttl, key[0], value)
+            if len(shelf) > self.maxsize:
+                self.prune(shelf)
+
+    def invalidate(self, endpoint):
+        with self.lock, shelve.open(self.filename) as shelf:
+            keys = [key for key in shelf.keys() if shelf[key][1] == endpoint]
+            for key in keys:
+                del shelf[key]
+            return len(keys)
+
+    def clear(self):
+        with self.lock, shelve.open(self.filename) as shelf:
+            shelf.clear()
+
+    def prune(self, shelf):
+        """ Drop expired entries, then the oldest ones until under maxsize. """
+        now = time.time()
+        entries = sorted((shelf[key][0], key) for key in shelf.keys())
+        for expires, key in entries:
+            if expires > now and len(shelf) <= self.maxsize:
+                break
+            del shelf[key]
+
+
+class ResponseCache:
+    """
+    Cache for read-only endpoints, keyed by endpoint, account and parameters.
+
+    The backend is pluggable, any object with get, set, invalidate and clear
+    works. Each endpoint has its own time to live; endpoints missing from ttls
+    use default_ttl. Only successful responses are stored.
+    """
+
+    # endpoint: seconds
+    TTLS = {
+        "feed": 20,
+        "get_profile": 300,
+        "get_club": 600,
+        "get_all_topics": 3600,
+        "get_events": 300,
+        "get_events_to_start": 300,
+        "get_events_for_user": 300,
+    }
+    DEFAULT_TTL = 60
+
+    def __init__(self, backend=None, ttls=None, default_ttl=None):
+        self.backend = backend if backend else MemoryCache()
+        self.ttls = dict(self.TTLS)
+        if isinstance(ttls, dict):
+            self.ttls.update(ttls)
+        self.default_ttl = default_ttl if default_ttl else self.DEFAULT_TTL
+        self.listeners = []
+
+    def __str__(self):
+        return f"ResponseCache(backend={type(self.backend).__name__}, ttls={self.ttls})"
+
+    def get_ttl(self, endpoint):
+        return self.ttls.get(endpoint, self.default_ttl)
+
+    def get(self, key):
+        return self.backend.get(key)
+
+    def set(self, key, value):
+        ttl = self.get_ttl(key[0])
+        if ttl > 0:
+            self.backend.set(key, value, ttl)
+
+    def invalidate(self, *endpoints):
+        """ (ResponseCache, str) -> NoneType
+
+        Drop every cached response of the given endpoints and notify listeners.
+        """
+        for endpoint in endpoints:
+            dropped = self.backend.invalidate(endpoint)
+            if dropped:
+                logging.info(f"Invalidated {dropped} cached {endpoint} responses")
+            for listener in self.listeners:
+                listener(endpoint)
+
+    def add_listener(self, listener):
+        """ Call listener(endpoint) whenever an endpoint is invalidated. """
+        self.listeners.append(listener)
+
+    def clear(self):
+        self.backend.clear()
+
+
+def cached(func):
+    """ Serve the endpoint from self.response_cache while the cached response is fresh. """
+    @wraps(func)
+    def wrap(self, *args, **kwargs):
+        cache = self.response_cache
+        key = (func.__name__, self.HEADERS.get("CH-UserID"), args, tuple(sorted(kwargs.items())))
+
+        response = cache.get(key)
+        if response is None:
+            response = func(self, *args, **kwargs)
+            if isinstance(response, dict) and response.get("success") is not False:
+                cache.set(key, response)
+
+        # Callers are free to modify what they get back
+        return dict(response) if isinstance(response, dict) else response
+
+    return wrap
+
+
+def invalidates(*endpoints):
+    """ Drop the cached responses of endpoints once the decorated call succeeds. """
+    def decorator(func):
+        @wraps(func)
+        def wrap(self, *args, **kwargs):
+            response = func(self, *args, **kwargs)
+            if isinstance(response, dict) and response.get("success") is not False:
+                self.response_cache.invalidate(*endpoints)
+            return response
+
+        # Read by the async client, which sends the request without calling wrap
+        wrap.invalidated = endpoints
+        return wrap
+
+    return decorator
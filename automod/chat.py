@@ -1,6 +1,4 @@
-import requests
 import logging
-import time
 from datetime import datetime
 
 import pytz
@@ -11,6 +9,9 @@ from .clubhouse import ChannelChat
 from .clubhouse import Message
 from .fancytext import fancy
 from .clubhouse import validate_response
+from .dedupe import BoundedSet
+from .ratelimit import RateLimiter
+from .transport import Transport
 
 
 class ChatConfig(Auth):
@@ -25,6 +26,11 @@ class ChatConfig(Auth):
     MW_KEY = Config.config_to_dict(Config.load_config(), "MW", "key")
     MW_SPANISH_KEY = Config.config_to_dict(Config.load_config(), "MW", "spanish_key")
 
+    # Dictionary lookups are limited by the third-party APIs, not by Clubhouse: they get a limiter
+    # of their own, which use_account leaves alone, so they never count against an account's headroom
+    lookup_transport = Transport(
+        limiter=RateLimiter(), breakers=Auth.transport.breakers, metrics=Auth.transport.metrics)
+
     UD_PREFIXES = ("/urban", "/ud")
     MW_PREFIXES = ("/def", "/dict", "/mw")
     IMDB_PREFIXES = ("/imdb", "/IMDB")
@@ -37,7 +43,8 @@ class ChatConfig(Auth):
         self.chat = ChannelChat()
         self.message = Message()
 
-    def send_command_response(self, channel, message, delay=10):
+    def send_command_response(self, channel, message):
+        # Messages are paced by the send_channel_message rate limit in the transport
         response = False
 
         if isinstance(message, str):
@@ -46,7 +53,6 @@ class ChatConfig(Auth):
         for _ in message:
             run = self.chat.send_chat(channel, _)
             response = run.get("success")
-            time.sleep(delay)
 
         return response
 
@@ -57,6 +63,7 @@ class ChatClient(ChatConfig):
         super().__init__()
         self.urban_dict = UrbanDict()
         self.mw = MW()
+        self.seen_command_set = BoundedSet(maxlen=5000)
 
     def __str__(self):
         """
@@ -64,7 +71,7 @@ class ChatClient(ChatConfig):
         """
         return f"ChatClient(host={self.HEADERS.get('X-RapidAPI-Host')}, key={self.HEADERS.get('X-RapidAPI-Key')})"
 
-    def run_chat_client(self, channel, interval=120, delay=10):
+    def run_chat_client(self, channel, interval=120):
         self.ud_commands = []
         self.mw_commands = []
         self.imdb_commands = []
@@ -86,21 +93,33 @@ class ChatClient(ChatConfig):
         if not recent_requests_list:
             return
 
+        self.record_commands(recent_requests_list)
+
         self.filter_commands(recent_requests_list)
 
         if self.ud_commands:
             logging.info(self.ud_commands)
-            self.urban_dict.run_urban_dict_client(self.ud_commands, channel, delay)
+            self.urban_dict.run_urban_dict_client(self.ud_commands, channel)
 
         if self.mw_commands:
             logging.info(self.mw_commands)
-            self.mw.run_mw_dict_client(self.mw_commands, channel, delay)
+            self.mw.run_mw_dict_client(self.mw_commands, channel)
 
         if self.imdb_commands:
             pass
 
         return True
 
+    def record_commands(self, requests_list):
+        """ Count commands not seen before as room activity, when the client tracks it. """
+        activity = getattr(self, "activity", None)
+        if activity is None:
+            return
+
+        message_ids = set(_.get("message_id") for _ in requests_list)
+        activity.record("commands", len([_ for _ in message_ids if _ not in self.seen_command_set]))
+        self.seen_command_set |= message_ids
+
     def get_chat_stream(self, channel):
         chat_stream = self.chat.get_chat(channel)
         return chat_stream
@@ -195,6 +214,9 @@ class UrbanDict(ChatConfig):
 
         """
         super().__init__()
+        # Per client, so every room keeps its own history
+        self.ud_message_responded_set = BoundedSet(maxlen=5000)
+        self.ud_defined_term_set = BoundedSet(maxlen=1000)
 
     def __str__(self):
         """
@@ -202,7 +224,7 @@ class UrbanDict(ChatConfig):
         """
         return f"UrbanDict(host={self.HEADERS.get('X-RapidAPI-Host')}, key={self.HEADERS.get('X-RapidAPI-Key')})"
 
-    def run_urban_dict_client(self, ud_requests, channel, delay=30):
+    def run_urban_dict_client(self, ud_requests, channel):
 
         filtered_requests = self.filter_new_requests(ud_requests)
         if not filtered_requests:
@@ -221,13 +243,17 @@ class UrbanDict(ChatConfig):
                 continue
 
             defined_term = self.get_definition(term)
+            if defined_term is None:
+                logging.info(f"[{term}] could not be looked up, dictionary API unavailable")
+                continue
+
             definition = self.clean_definition(defined_term)
 
             message_id = request.get("message_id")
             user_name = request.get("user_profile").get("name")
 
             response = self.set_response(user_name, term, definition)
-            send = self.send_command_response(channel, response, delay)
+            send = self.send_command_response(channel, response)
 
             if send:
                 self.ud_defined_term_set.add(term)
@@ -277,10 +303,14 @@ class UrbanDict(ChatConfig):
             querystring = {
                 "term": term
             }
-            req = requests.get(self.URBAN_DICT_URL, headers=self.RAPID_API_HEADERS, params=querystring)
+            req = self.lookup_transport.get(
+                self.URBAN_DICT_URL, headers=self.RAPID_API_HEADERS, params=querystring, endpoint="urban_dictionary")
             return req
 
         response = api_request()
+        if response.get("success") is False:
+            return
+
         if not response.get("list"):
             return f'No definition for "{term}" was found on Urban Dictionary'
 
@@ -318,19 +348,19 @@ class UrbanDict(ChatConfig):
         logging.info(reply_message)
         return reply_message
 
-    ud_message_responded_set = set()
-    ud_defined_term_set = set()
-
 
 class MW(ChatConfig):
 
     def __init__(self):
         super().__init__()
+        # Per client, so every room keeps its own history
+        self.mw_message_responded_set = BoundedSet(maxlen=5000)
+        self.mw_defined_term_set = BoundedSet(maxlen=1000)
 
     def __str__(self):
         pass
 
-    def run_mw_dict_client(self, mw_requests, channel, delay=30):
+    def run_mw_dict_client(self, mw_requests, channel):
 
         filtered_requests = self.filter_new_requests(mw_requests)
         if not filtered_requests:
@@ -349,13 +379,17 @@ class MW(ChatConfig):
                 continue
 
             defined_term = self.get_definition(term)
+            if defined_term is None:
+                logging.info(f"[{term}] could not be looked up, dictionary API unavailable")
+                continue
+
             definition = self.clean_definition(defined_term)
 
             message_id = request.get("message_id")
             user_name = request.get("user_profile").get("name")
 
             response = self.set_response(user_name, term, definition)
-            send = self.send_command_response(channel, response, delay)
+            send = self.send_command_response(channel, response)
 
             if send:
                 self.mw_defined_term_set.add(term)
@@ -427,10 +461,14 @@ class MW(ChatConfig):
         @validate_response
         def api_request():
 
-            req = requests.get(f"{self.MW_URL}{term}?key={self.MW_KEY}")
+            req = self.lookup_transport.get(f"{self.MW_URL}{term}?key={self.MW_KEY}", endpoint="merriam_webster")
             return req
 
-        return api_request()
+        response = api_request()
+        if isinstance(response, dict) and response.get("success") is False:
+            return
+
+        return response
 
     @staticmethod
     def clean_definition(definition):
@@ -468,9 +506,6 @@ class MW(ChatConfig):
         logging.info(reply_message)
         return reply_message
 
-    mw_message_responded_set = set()
-    mw_defined_term_set = set()
-
 
 class ESPN(ChatConfig):
 
@@ -12,10 +12,22 @@ import requests
 import uuid
 import random
 import secrets
-import threading
+import time
 from functools import wraps
 from configparser import ConfigParser
 
+from .transport import Transport
+from .transport import get_endpoint
+from .retry import RetryPolicy
+from .singleflight import coalesce
+from .cache import ResponseCache
+from .cache import cached
+from .cache import invalidates
+from .decoding import Decoder
+from .scheduler import Scheduler
+from .lifecycle import Lifecycle
+from .adaptive import AdaptiveInterval
+
 # Need to fix login and finish authorization functions
 
 
@@ -41,42 +53,109 @@ def unstable_endpoint(func):
 
 
 def validate_response(func):
-
+    """ Decode the endpoint's response, retrying transient failures per the retry policy. """
     @wraps(func)  # Is this in the right place?
     def wrap(*args, **kwargs):
-        response = {"success": False}
+        policy = getattr(args[0], "retry_policy", Auth.retry_policy) if args else Auth.retry_policy
+        transport = getattr(args[0], "transport", Auth.transport) if args else Auth.transport
+        started = time.monotonic()
+        attempt = 0
+
+        while True:
+            try:
+                req = func(*args, **kwargs)
+
+            except requests.exceptions.RequestException as req_error:
+                if policy.should_retry_error(req_error) and policy.wait(attempt, started):
+                    attempt += 1
+                    record_retry(transport, req_error.request, func.__name__)
+                    logging.info(f"Retrying {func.__name__} ({attempt}): {req_error}")
+                    continue
+
+                logging.error(f"{func.__name__} {req_error}")
+                return {"success": False}
+
+            if isinstance(req, requests.Response) and policy.should_retry_response(req):
+                if policy.wait(attempt, started):
+                    attempt += 1
+                    record_retry(transport, req.request, func.__name__)
+                    logging.info(f"Retrying {func.__name__} ({attempt}): {req.status_code}")
+                    continue
+
+            return parse_response(req, func.__name__, getattr(args[0], "decoder", None) if args else None)
+
+    # Undecorated endpoint, used by the async client to build the same request
+    wrap.build_request = func
+    return wrap
 
-        req = func(*args, **kwargs)
 
-        try:
-            req.raise_for_status()
+def get_adaptive_interval(client, method):
+    """ (Clubhouse, function) -> AdaptiveInterval or NoneType
 
-        except requests.exceptions.HTTPError as http_error:
-            logging.error(f"{func.__name__} {http_error}")
+    Adaptive interval for a set_interval method called on client, None when
+    the method has no bounds or the client does not poll adaptively.
+    """
+    if not method.bounds or not getattr(client, "adaptive_polling", False):
+        return None
 
-            if req.json().get("success") is False:
-                logging.error(req.text)
-                return req.json()
+    meter = getattr(client, "activity", None)
+    if meter is None:
+        return None
 
-        except requests.exceptions.ConnectionError as conn_error:
-            logging.error(f"{func.__name__} {conn_error}")
+    min_interval, max_interval = method.bounds
+    return AdaptiveInterval(method.interval, min_interval, max_interval or method.interval, meter)
 
-        except requests.exceptions.Timeout as timeout_error:
-            logging.error(f"{func.__name__} {timeout_error}")
 
-        except requests.exceptions.RequestException as req_error:
-            logging.error(f"{func.__name__} {req_error}")
-            return req.json()
+def record_retry(transport, request, name):
+    """ Count a retry against the endpoint the request was sent to. """
+    metrics = getattr(transport, "metrics", None)
+    if metrics is not None:
+        metrics.record_retry(get_endpoint(request.url) if request is not None else name)
 
-        except KeyError as key_error:
-            logging.error(f"{func.__name__} {key_error}")
 
-        else:
-            response = req.json()
+def parse_response(req, name, decoder=None):
+    """ (requests.Response, str, Decoder) -> dict
+
+    Decode a response the way every endpoint expects it.
+    """
+    response = {"success": False}
+    decoder = decoder if decoder else Auth.decoder
 
-        return response
+    try:
+        req.raise_for_status()
 
-    return wrap
+    except requests.exceptions.HTTPError as http_error:
+        logging.error(f"{name} {http_error}")
+
+        try:
+            error_response = decoder.decode(req, name)
+        except ValueError:
+            return response
+
+        if isinstance(error_response, dict) and error_response.get("success") is False:
+            logging.error(req.text)
+            return error_response
+
+    except requests.exceptions.ConnectionError as conn_error:
+        logging.error(f"{name} {conn_error}")
+
+    except requests.exceptions.Timeout as timeout_error:
+        logging.error(f"{name} {timeout_error}")
+
+    except requests.exceptions.RequestException as req_error:
+        logging.error(f"{name} {req_error}")
+        return decoder.decode(req, name)
+
+    except KeyError as key_error:
+        logging.error(f"{name} {key_error}")
+
+    else:
+        try:
+            response = decoder.decode(req, name)
+        except ValueError as value_error:
+            logging.error(f"{name} {value_error}")
+
+    return response
 
 
 class Config:
@@ -151,6 +230,36 @@ class Config:
         logging.info("Reload client successful")
         return reload_dict
 
+    @staticmethod
+    def reload_accounts(config_file="/Users/deon/Documents/GitHub/HQ/setting.ini"):
+        """
+        A function to load every account from the settings file.
+
+        Accounts are the sections named Account, Account.2, Account.3, ...
+
+        :return accounts: A list of dicts with name, client_id, user_token and user_device
+        """
+        config_object = Config.load_config(config_file)
+        accounts = []
+        for section in config_object.sections():
+            if section != "Account" and not section.startswith("Account."):
+                continue
+
+            user_config = Config.config_to_dict(config_object, section)
+            if not user_config.get("client_id") or not user_config.get("user_token"):
+                logging.info(f"Skipped incomplete account: {section}")
+                continue
+
+            accounts.append({
+                "name": section,
+                "client_id": user_config.get("client_id"),
+                "user_token": user_config.get("user_token"),
+                "user_device": user_config.get("user_device"),
+            })
+
+        logging.info(f"Loaded {len(accounts)} accounts")
+        return accounts
+
     @staticmethod
     def write_config(user_id, user_token, user_device, filename='/Users/deon/Documents/GitHub/HQ/setting.ini'):
         """ (str, str, str, str) -> bool
@@ -218,7 +327,7 @@ class Auth(Config):
         "CH-AppBuild": f"{API_BUILD_ID}",
         "CH-AppVersion": f"{API_BUILD_VERSION}",
         "User-Agent": f"{API_UA}",
-        "Connection": "close",
+        "Connection": "keep-alive",
         "Content-Type": "application/json; charset=utf-8",
         "Cookie": f"__cfduid={secrets.token_hex(21)}{random.randint(1, 9)}",
         'CH-UserID': reload_dict.get("client_id"),
@@ -228,6 +337,12 @@ class Auth(Config):
         # "Ch-Session-Id": str(uuid.uuid4()).upper(),
     }
 
+    # Pooled keep-alive session shared by every endpoint class
+    transport = Transport()
+    retry_policy = RetryPolicy()
+    response_cache = ResponseCache()
+    decoder = Decoder()
+
     def __init__(self, client_id='', user_token='', user_device='', headers=None):
         """ (Clubhouse, str, str, str, dict) -> NoneType
         Set authenticated information
@@ -257,6 +372,51 @@ class Auth(Config):
             self.HEADERS.get('CH-DeviceId')
         )
 
+    @staticmethod
+    def configure_transport(pool_connections=10, pool_maxsize=20, pool_block=False, keep_alive=True, limiter=None,
+                            connect_timeout=3.05, read_timeout=10):
+        """ (int, int, bool, bool, RateLimiter, float, float) -> Transport
+
+        Replace the shared transport used by every Auth subclass.
+        Connections already checked out by the previous transport finish normally.
+        The current circuit breakers and metrics are kept, the rate limiter too unless a new one is given.
+        """
+        limiter = limiter if limiter else Auth.transport.limiter
+        Auth.transport = Transport(
+            pool_connections, pool_maxsize, pool_block, keep_alive, limiter, connect_timeout, read_timeout,
+            breakers=Auth.transport.breakers, metrics=Auth.transport.metrics)
+        logging.info(f"Configured: {Auth.transport}")
+        return Auth.transport
+
+    @staticmethod
+    def set_timeouts(connect_timeout=3.05, read_timeout=10):
+        """ (float, float) -> NoneType
+
+        Change the connect/read timeouts of the shared transport.
+        """
+        Auth.transport.connect_timeout = connect_timeout
+        Auth.transport.read_timeout = read_timeout
+        logging.info(f"Configured: {Auth.transport}")
+
+    def use_account(self, account, _bound=None):
+        """ (Auth, Account) -> Auth
+
+        Send every request of this object, and of the endpoint objects it
+        holds (channel, chat, mod, ...), as account, over account's transport.
+        """
+        bound = _bound if _bound is not None else set()
+        bound.add(id(self))
+
+        self.HEADERS = account.get_headers(self.HEADERS)
+        self.client_id = account.client_id
+        self.transport = account.transport
+
+        for value in list(vars(self).values()):
+            if isinstance(value, Auth) and id(value) not in bound:
+                value.use_account(account, bound)
+
+        return self
+
     # Why doesn't this endpoint trigger a verification code?
     @validate_response
     def start_auth(self, phone_number):
@@ -280,7 +440,7 @@ class Auth(Config):
             },
             "phone_number": phone_number
         }
-        req = requests.post(f"{self.API_URL}/start_phone_number_auth", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/start_phone_number_auth", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -299,7 +459,7 @@ class Auth(Config):
             },
             "phone_number": phone_number
         }
-        req = requests.post(f"{self.API_URL}/resend_phone_number_auth", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/resend_phone_number_auth", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -319,7 +479,7 @@ class Auth(Config):
             "phone_number": phone_number,
             "verification_code": verification_code
         }
-        req = requests.post(f"{self.API_URL}/complete_phone_number_auth", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/complete_phone_number_auth", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -329,20 +489,41 @@ class Auth(Config):
         Logout from the app.
         """
         data = {}
-        req = requests.post(f"{self.API_URL}/logout", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/logout", headers=self.HEADERS, json=data)
         return req
 
 
 class Clubhouse(Auth):
 
+    scheduler = Scheduler()
+    lifecycle = Lifecycle()
+
     @staticmethod
-    def set_interval(interval):
+    def set_interval(interval, min_interval=None, max_interval=None, fixed_rate=False, jitter=0):
         """
         A function to set the interval decorator.
 
+        Every call of the decorated function schedules it on the shared
+        scheduler, to run every interval seconds until it returns a falsy
+        value or the returned job is set.
+
+        Jobs started on a client are registered under its room session, so
+        leaving the room cancels them.
+
+        With bounds, and when called on a client with adaptive_polling on, the
+        interval follows the activity of the client's room between
+        min_interval and max_interval.
+
+        Runs are fixed delay by default: the next one starts interval seconds
+        after the last one returned. With fixed_rate they stay interval
+        seconds apart however long they take. jitter spreads them by up to
+        that fraction of the interval, see scheduler.Cadence.
 
         :param interval: The interval duration
-        :param timeout:
+        :param min_interval: The shortest adaptive interval
+        :param max_interval: The longest adaptive interval
+        :param fixed_rate: Whether to keep runs on a fixed schedule
+        :param jitter: The fraction of the interval runs are moved by at random
         :type interval: int
         :return: decorator
         :rtype: function
@@ -351,25 +532,34 @@ class Clubhouse(Auth):
         def decorator(func):
             @wraps(func)  # Is this in the right place?
             def wrap(*args, **kwargs):
-                is_stopped = threading.Event()
-
-                def loop():
-                    while not is_stopped.wait(interval):
-                        run = func(*args, **kwargs)
-                        if not run:
-                            logging.info(f"Stopped: {func}")
-                            break
-
-                thread = threading.Thread(target=loop)
-                thread.daemon = True
-                thread.start()
+                adaptive = get_adaptive_interval(args[0], wrap) if args else None
+                job = Clubhouse.scheduler.schedule_every(
+                    interval, func, args, kwargs, adaptive=adaptive, fixed_rate=fixed_rate, jitter=jitter)
+                Clubhouse.lifecycle.register(getattr(args[0], "session", None) if args else None, job)
                 logging.info(f"Started: {func}")
-                return is_stopped
+                return job
 
+            wrap.interval = interval
+            wrap.bounds = (min_interval, max_interval) if min_interval else None
+            wrap.fixed_rate = fixed_rate
+            wrap.jitter = jitter
             return wrap
 
         return decorator
 
+    @staticmethod
+    def shutdown():
+        """ () -> NoneType
+
+        Cancel every background task and stop the scheduler, before the process exits.
+        """
+        leaked = Clubhouse.lifecycle.leaked()
+        if leaked:
+            logging.error(f"Leaked tasks: {[str(_) for _ in leaked]}")
+
+        Clubhouse.lifecycle.shutdown()
+        Clubhouse.scheduler.shutdown()
+
     def __init__(self):
         super().__init__()
         self.auth = Auth()
@@ -400,16 +590,17 @@ class Client(Auth):
             "timezone_identifier": timezone_identifier,
             "return_following_ids": return_following_ids
         }
-        req = requests.post(f"{self.API_URL}/me", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/me", headers=self.HEADERS, json=data)
         return req
 
+    @cached
     @validate_response
     def feed(self):
         """ (Clubhouse) -> dict
 
         Get list of channels, current invite status, etc.
         """
-        req = requests.get(f"{self.API_URL}/get_feed?", headers=self.HEADERS)
+        req = self.transport.get(f"{self.API_URL}/get_feed?", headers=self.HEADERS)
         return req
 
     @validate_response
@@ -428,7 +619,7 @@ class Client(Auth):
             "user_id": self.client_id,
             "username": None
         }
-        req = requests.post(f"{self.API_URL}/get_profile", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/get_profile", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -442,7 +633,7 @@ class Client(Auth):
             "channel": channel,
             "user_id": int(user_id)
         }
-        req = requests.post(f"{self.API_URL}/invite_to_existing_channel", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/invite_to_existing_channel", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -452,7 +643,7 @@ class Client(Auth):
         Get following users type2
         """
         query = f"user_id={self.client_id}&page_size={page_size}&page={page}"
-        req = requests.get(f"{self.API_URL}/get_following?{query}", headers=self.HEADERS)
+        req = self.transport.get(f"{self.API_URL}/get_following?{query}", headers=self.HEADERS)
         return req
 
     @validate_response
@@ -466,7 +657,7 @@ class Client(Auth):
             page_size,
             page
         )
-        req = requests.get(f"{self.API_URL}/get_followers?{query}", headers=self.HEADERS)
+        req = self.transport.get(f"{self.API_URL}/get_followers?{query}", headers=self.HEADERS)
         return req
 
     @validate_response
@@ -482,7 +673,7 @@ class Client(Auth):
             "followers_only": followers_only,
             "query": query
         }
-        req = requests.post(f"{self.API_URL}/search", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/search", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -494,7 +685,7 @@ class Client(Auth):
         data = {
             "is_startable_only": is_startable_only
         }
-        req = requests.post(f"{self.API_URL}/get_clubs", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/get_clubs", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -503,7 +694,7 @@ class Client(Auth):
 
         List all online friends.
         """
-        req = requests.post(f"{self.API_URL}/get_online_friends", headers=self.HEADERS, json={})
+        req = self.transport.post(f"{self.API_URL}/get_online_friends", headers=self.HEADERS, json={})
         return req
 
     @validate_response
@@ -512,7 +703,7 @@ class Client(Auth):
 
         Receive user's settings.
         """
-        req = requests.get(f"{self.API_URL}/get_settings", headers=self.HEADERS)
+        req = self.transport.get(f"{self.API_URL}/get_settings", headers=self.HEADERS)
         return req
 
     @validate_response
@@ -525,7 +716,7 @@ class Client(Auth):
         data = {
             "email": email
         }
-        req = requests.post(f"{self.API_URL}/add_email", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/add_email", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -541,7 +732,7 @@ class Client(Auth):
             "club_id": int(club_id) if club_id else None,
             "topic_id": int(topic_id) if topic_id else None
         }
-        req = requests.post(f"{self.API_URL}/add_user_topic", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/add_user_topic", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -554,9 +745,10 @@ class Client(Auth):
             "club_id": int(club_id) if club_id else None,
             "topic_id": int(topic_id) if topic_id else None
         }
-        req = requests.post(f"{self.API_URL}/remove_user_topic", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/remove_user_topic", headers=self.HEADERS, json=data)
         return req
 
+    @invalidates("get_profile")
     @validate_response
     def update_photo(self, photo_filename):
         """ (Clubhouse, str) -> dict
@@ -568,10 +760,11 @@ class Client(Auth):
         }
         tmp = self.HEADERS['Content-Type']
         self.HEADERS.pop("Content-Type")
-        req = requests.post(f"{self.API_URL}/update_photo", headers=self.HEADERS, files=files)
+        req = self.transport.post(f"{self.API_URL}/update_photo", headers=self.HEADERS, files=files)
         self.HEADERS['Content-Type'] = tmp
         return req
 
+    @invalidates("get_profile")
     @validate_response
     def update_bio(self, bio):
         """ (Clubhouse, str) -> dict
@@ -581,9 +774,10 @@ class Client(Auth):
         data = {
             "bio": bio
         }
-        req = requests.post(f"{self.API_URL}/update_bio", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/update_bio", headers=self.HEADERS, json=data)
         return req
 
+    @invalidates("get_profile")
     @validate_response
     def update_name(self, name):
         """ (Clubhouse, str) -> dict
@@ -595,9 +789,10 @@ class Client(Auth):
         data = {
             "name": name,
         }
-        req = requests.post(f"{self.API_URL}/update_name", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/update_name", headers=self.HEADERS, json=data)
         return req
 
+    @invalidates("get_profile")
     @validate_response
     def update_username(self, username):
         """ (Clubhouse, str) -> dict
@@ -607,10 +802,11 @@ class Client(Auth):
         data = {
             "username": username,
         }
-        req = requests.post(f"{self.API_URL}/update_username", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/update_username", headers=self.HEADERS, json=data)
         return req
 
     # This is same as username and needs to be fixed
+    @invalidates("get_profile")
     @validate_response
     def update_displayname(self, name):
         """ (Clubhouse, str) -> dict
@@ -620,9 +816,10 @@ class Client(Auth):
         data = {
             "name": name,
         }
-        req = requests.post(f"{self.API_URL}/update_name", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/update_name", headers=self.HEADERS, json=data)
         return req
 
+    @invalidates("get_profile")
     @validate_response
     def update_twitter_username(self, username, twitter_token, twitter_secret):
         """ (Clubhouse, str, str, str) -> dict
@@ -637,9 +834,10 @@ class Client(Auth):
             "twitter_token": twitter_token,
             "twitter_secret": twitter_secret
         }
-        req = requests.post(f"{self.API_URL}/update_twitter_username", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/update_twitter_username", headers=self.HEADERS, json=data)
         return req
 
+    @invalidates("get_profile")
     @validate_response
     def update_instagram_username(self, code):
         """ (Clubhouse, str) -> dict
@@ -652,7 +850,7 @@ class Client(Auth):
         data = {
             "code": code
         }
-        req = requests.post(f"{self.API_URL}/update_instagram_username", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/update_instagram_username", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -667,7 +865,7 @@ class Client(Auth):
         data = {
             "skintone": skintone
         }
-        req = requests.post(f"{self.API_URL}/update_skintone", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/update_skintone", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -681,7 +879,7 @@ class Client(Auth):
             "user_id": int(client_id),
             "notification_type": int(notification_type)
         }
-        req = requests.post(f"{self.API_URL}/update_follow_notifications", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/update_follow_notifications", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -693,7 +891,7 @@ class Client(Auth):
         data = {
             "refresh": refresh_token
         }
-        req = requests.post(f"{self.API_URL}/refresh_token", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/refresh_token", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -711,7 +909,7 @@ class Client(Auth):
             "incident_description": incident_description,
             "email": email
         }
-        req = requests.post(f"{self.API_URL}/report_incident", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/report_incident", headers=self.HEADERS, json=data)
         return req
 
 
@@ -719,6 +917,7 @@ class User(Auth):
     def __init__(self):
         super().__init__()
 
+    @cached
     @validate_response
     def get_profile(self, user_id='', username=''):
         """ (Clubhouse, str, str) -> dict
@@ -731,9 +930,10 @@ class User(Auth):
             "user_id": int(user_id) if user_id else None,
             "username": username if username else None
         }
-        req = requests.post(f"{self.API_URL}/get_profile", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/get_profile", headers=self.HEADERS, json=data)
         return req
 
+    @invalidates("get_profile")
     @validate_response
     def follow(self, user_id, user_ids=None, source=4, source_topic_id=None):
         """ (Clubhouse, int, list, int, int) -> dict
@@ -747,9 +947,10 @@ class User(Auth):
             "user_id": int(user_id),
             "source": source
         }
-        req = requests.post(f"{self.API_URL}/follow", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/follow", headers=self.HEADERS, json=data)
         return req
 
+    @invalidates("get_profile")
     @validate_response
     def unfollow(self, user_id):
         """ (Clubhouse, int) -> dict
@@ -759,9 +960,10 @@ class User(Auth):
         data = {
             "user_id": int(user_id)
         }
-        req = requests.post(f"{self.API_URL}/unfollow", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/unfollow", headers=self.HEADERS, json=data)
         return req
 
+    @invalidates("get_profile")
     @validate_response
     def follow_multiple(self, user_ids, user_id=None, source=7, source_topic_id=None):
         """ (Clubhouse, list, int, int, int) -> dict
@@ -775,7 +977,7 @@ class User(Auth):
             "user_id": user_id,
             "source": source
         }
-        req = requests.post(f"{self.API_URL}/follow_multiple", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/follow_multiple", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -785,7 +987,7 @@ class User(Auth):
         Get following users type2
         """
         query = f"user_id={user_id}&page_size={page_size}&page={page}"
-        req = requests.get(f"{self.API_URL}/get_following?{query}", headers=self.HEADERS)
+        req = self.transport.get(f"{self.API_URL}/get_following?{query}", headers=self.HEADERS)
         return req
 
     @validate_response
@@ -799,7 +1001,7 @@ class User(Auth):
             page_size,
             page
         )
-        req = requests.get(f"{self.API_URL}/get_followers?{query}", headers=self.HEADERS)
+        req = self.transport.get(f"{self.API_URL}/get_followers?{query}", headers=self.HEADERS)
         return req
 
     @validate_response
@@ -813,9 +1015,10 @@ class User(Auth):
             page_size,
             page
         )
-        req = requests.get(f"{self.API_URL}/get_mutual_follows?{query}", headers=self.HEADERS)
+        req = self.transport.get(f"{self.API_URL}/get_mutual_follows?{query}", headers=self.HEADERS)
         return req
 
+    @invalidates("get_profile")
     @validate_response
     def block(self, user_id):
         """ (Clubhouse, int) -> dict
@@ -825,9 +1028,10 @@ class User(Auth):
         data = {
             "user_id": int(user_id)
         }
-        req = requests.post(f"{self.API_URL}/block", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/block", headers=self.HEADERS, json=data)
         return req
 
+    @invalidates("get_profile")
     @validate_response
     def unblock(self, user_id):
         """ (Clubhouse, int) -> dict
@@ -837,10 +1041,11 @@ class User(Auth):
         data = {
             "user_id": int(user_id)
         }
-        req = requests.post(f"{self.API_URL}/unblock", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/unblock", headers=self.HEADERS, json=data)
         return req
 
     # What is this?
+    @cached
     @validate_response
     def get_events_for_user(self, user_id='', page_size=25, page=1):
         """ (Clubhouse, str, int, int) -> dict
@@ -848,7 +1053,7 @@ class User(Auth):
         Get events for the specific user.
         """
         query = f"user_id={user_id}&page_size={page_size}&page={page}"
-        req = requests.get(f"{self.API_URL}/get_events_for_user?{query}", headers=self.HEADERS)
+        req = self.transport.get(f"{self.API_URL}/get_events_for_user?{query}", headers=self.HEADERS)
         return req
 
 
@@ -863,7 +1068,7 @@ class Notifications(Auth):
         Get my notifications.
         """
         query = f"page_size={page_size}&page={page}"
-        req = requests.get(f"{self.API_URL}/get_notifications?{query}", headers=self.HEADERS)
+        req = self.transport.get(f"{self.API_URL}/get_notifications?{query}", headers=self.HEADERS)
         return req
 
     @validate_response
@@ -872,7 +1077,7 @@ class Notifications(Auth):
 
         Get notifications. This may return some notifications that require some actions
         """
-        req = requests.get(f"{self.API_URL}/get_actionable_notifications", headers=self.HEADERS)
+        req = self.transport.get(f"{self.API_URL}/get_actionable_notifications", headers=self.HEADERS)
         return req
 
     @validate_response
@@ -885,7 +1090,7 @@ class Notifications(Auth):
         data = {
             "actionable_notification_id": actionable_notification_id
         }
-        req = requests.post(f"{self.API_URL}/ignore_actionable_notification", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/ignore_actionable_notification", headers=self.HEADERS, json=data)
         return req
 
 
@@ -893,19 +1098,24 @@ class Channel(Auth):
     def __init__(self):
         super().__init__()
 
+    @coalesce(ttl=5)
     @validate_response
     def get_channel(self, channel, channel_id=None):
         """ (Clubhouse, str, int) -> dict
 
-        Get information of the given channel
+        Get information of the given channel.
+        Concurrent calls for the same channel, and calls within 5 seconds of a
+        successful one, share a single request. Endpoints marked
+        @invalidates("get_channel") drop the shared results, see forget_coalesced.
         """
         data = {
             "channel": channel,
             "channel_id": channel_id
         }
-        req = requests.post(f"{self.API_URL}/get_channel", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/get_channel", headers=self.HEADERS, json=data)
         return req
 
+    @invalidates("get_channel")
     @validate_response
     def join_channel(self, channel, attribution_source="feed",
                      attribution_details="eyJpc19leHBsb3JlIjpmYWxzZSwicmFuayI6MX0="):
@@ -919,7 +1129,7 @@ class Channel(Auth):
             "attribution_details": attribution_details,  # base64_json
             # logging_context (json of some details)
         }
-        req = requests.post(f"{self.API_URL}/join_channel", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/join_channel", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -933,9 +1143,10 @@ class Channel(Auth):
             "raise_hands": raise_hands,
             "unraise_hands": unraise_hands
         }
-        req = requests.post(f"{self.API_URL}/audience_reply", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/audience_reply", headers=self.HEADERS, json=data)
         return req
 
+    @invalidates("get_channel")
     @validate_response
     def accept_speaker_invite(self, channel, client_id):
         """ (Clubhouse, str, int) -> dict
@@ -947,7 +1158,7 @@ class Channel(Auth):
             "channel": channel,
             "user_id": int(client_id)
         }
-        req = requests.post(f"{self.API_URL}/accept_speaker_invite", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/accept_speaker_invite", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -960,7 +1171,7 @@ class Channel(Auth):
             "channel": channel,
             "user_id": int(client_id)
         }
-        req = requests.post(f"{self.API_URL}/reject_speaker_invite", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/reject_speaker_invite", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -975,7 +1186,7 @@ class Channel(Auth):
             "audio_profile": 11,
             "is_on_call": False
         }
-        req = requests.post(f"{self.API_URL}/update_channel_user_status", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/update_channel_user_status", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -988,7 +1199,7 @@ class Channel(Auth):
             "channel": channel,
             "chanel_id": None
         }
-        req = requests.post(f"{self.API_URL}/active_ping", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/active_ping", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -1000,7 +1211,7 @@ class Channel(Auth):
         data = {
             "channel": channel
         }
-        req = requests.post(f"{self.API_URL}/leave_channel", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/leave_channel", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -1017,7 +1228,7 @@ class Channel(Auth):
             "event_id": event_id,
             "topic": topic
         }
-        req = requests.post(f"{self.API_URL}/create_channel", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/create_channel", headers=self.HEADERS, json=data)
         return req
 
     # Is this a private room or a wave?
@@ -1032,7 +1243,7 @@ class Channel(Auth):
             "user_id": int(user_id),
             "channel": channel
         }
-        req = requests.post(f"{self.API_URL}/invite_to_new_channel", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/invite_to_new_channel", headers=self.HEADERS, json=data)
         return req
 
     # Is this a private room or a wave?
@@ -1046,7 +1257,7 @@ class Channel(Auth):
         data = {
             "channel_invite_id": channel_invite_id
         }
-        req = requests.post(f"{self.API_URL}/accept_new_channel_invite", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/accept_new_channel_invite", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -1059,7 +1270,7 @@ class Channel(Auth):
         data = {
             "channel_invite_id": channel_invite_id
         }
-        req = requests.post(f"{self.API_URL}/reject_new_channel_invite", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/reject_new_channel_invite", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -1072,7 +1283,7 @@ class Channel(Auth):
         data = {
             "channel_invite_id": channel_invite_id
         }
-        req = requests.post(f"{self.API_URL}/cancel_new_channel_invite", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/cancel_new_channel_invite", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -1086,7 +1297,7 @@ class Channel(Auth):
             "channel": channel,
             "hide": hide
         }
-        req = requests.post(f"{self.API_URL}/hide_channel", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/hide_channel", headers=self.HEADERS, json=data)
         return req
 
     # What is this?
@@ -1097,14 +1308,29 @@ class Channel(Auth):
         Not sure what this does. Triggered upon channel creation
         """
         data = {}
-        req = requests.post(f"{self.API_URL}/get_create_channel_targets", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/get_create_channel_targets", headers=self.HEADERS, json=data)
         return req
 
 
+def forget_coalesced(endpoint):
+    """ (str) -> NoneType
+
+    Drop the shared results of a coalesced Channel endpoint once it is invalidated,
+    so the next call sees the changes made by the invalidating call.
+    """
+    flights = getattr(getattr(Channel, endpoint, None), "flights", None)
+    if flights:
+        flights.forget()
+
+
+Auth.response_cache.add_listener(forget_coalesced)
+
+
 class ChannelMod(Auth):
     def __init__(self):
         super().__init__()
 
+    @invalidates("get_channel")
     @validate_response
     def make_moderator(self, channel, user_id):
         """ (Clubhouse, str, int) -> dict
@@ -1115,9 +1341,10 @@ class ChannelMod(Auth):
             "channel": channel,
             "user_id": int(user_id)
         }
-        req = requests.post(f"{self.API_URL}/make_moderator", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/make_moderator", headers=self.HEADERS, json=data)
         return req
 
+    @invalidates("get_channel")
     @validate_response
     def invite_speaker(self, channel, user_id):
         """ (Clubhouse, str, int) -> dict
@@ -1128,7 +1355,7 @@ class ChannelMod(Auth):
             "channel": channel,
             "user_id": int(user_id)
         }
-        req = requests.post(f"{self.API_URL}/invite_speaker", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/invite_speaker", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -1141,7 +1368,7 @@ class ChannelMod(Auth):
             "channel": channel,
             "user_id": int(user_id)
         }
-        req = requests.post(f"{self.API_URL}/uninvite_speaker", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/uninvite_speaker", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -1154,7 +1381,7 @@ class ChannelMod(Auth):
             "channel": channel,
             "user_id": int(user_id)
         }
-        req = requests.post(f"{self.API_URL}/mute_speaker", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/mute_speaker", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -1167,7 +1394,7 @@ class ChannelMod(Auth):
             "channel": channel,
             "link": link
         }
-        req = requests.post(f"{self.API_URL}/add_channel_link", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/add_channel_link", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -1183,7 +1410,7 @@ class ChannelMod(Auth):
             "channel": channel,
             "link": link_id
         }
-        req = requests.post(f"{self.API_URL}/remove_channel_link", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/remove_channel_link", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -1197,7 +1424,7 @@ class ChannelMod(Auth):
             "channel": channel,
             "channel_id": channel_id
         }
-        req = requests.post(f"{self.API_URL}/make_channel_public", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/make_channel_public", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -1211,7 +1438,7 @@ class ChannelMod(Auth):
             "channel": channel,
             "channel_id": channel_id
         }
-        req = requests.post(f"{self.API_URL}/make_channel_social", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/make_channel_social", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -1224,7 +1451,7 @@ class ChannelMod(Auth):
             "channel": channel,
             "channel_id": channel_id
         }
-        req = requests.post(f"{self.API_URL}/end_channel", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/end_channel", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -1237,7 +1464,7 @@ class ChannelMod(Auth):
             "channel": channel,
             "user_id": int(user_id)
         }
-        req = requests.post(f"{self.API_URL}/block_from_channel", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/block_from_channel", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -1262,7 +1489,7 @@ class ChannelMod(Auth):
             "is_enabled": is_enabled,
             "handraise_permission": handraise_permission
         }
-        req = requests.post(f"{self.API_URL}/change_handraise_settings", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/change_handraise_settings", headers=self.HEADERS, json=data)
         return req
 
 
@@ -1277,7 +1504,7 @@ class ChannelChat(Auth):
         Get events for the specific user.
         """
         query = f"channel={channel}&is_chronological_order=0"
-        req = requests.get(f"{self.API_URL}/get_channel_messages?{query}", headers=self.HEADERS)
+        req = self.transport.get(f"{self.API_URL}/get_channel_messages?{query}", headers=self.HEADERS)
         return req
 
     @validate_response
@@ -1290,7 +1517,7 @@ class ChannelChat(Auth):
             "channel": channel,
             "message": message
         }
-        req = requests.post(f"{self.API_URL}/send_channel_message", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/send_channel_message", headers=self.HEADERS, json=data)
         return req
 
 
@@ -1305,7 +1532,7 @@ class Message(Auth):
 
         Get events for the specific user.
         """
-        req = requests.get(f"{self.API_URL}/get_chats", headers=self.HEADERS)
+        req = self.transport.get(f"{self.API_URL}/get_chats", headers=self.HEADERS)
         return req
 
     @validate_response
@@ -1318,7 +1545,7 @@ class Message(Auth):
             "source": 4,
             "participant_ids": participant_ids
         }
-        req = requests.post(f"{self.API_URL}/create_chat", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/create_chat", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -1331,7 +1558,7 @@ class Message(Auth):
             "source": None,
             "participant_ids": participant_ids
         }
-        req = requests.post(f"{self.API_URL}/search_chats", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/search_chats", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -1340,7 +1567,7 @@ class Message(Auth):
 
         Get events for the specific user.
         """
-        req = requests.get(f"{self.API_URL}/get_chat_messages?chat_id={chat_id}", headers=self.HEADERS)
+        req = self.transport.get(f"{self.API_URL}/get_chat_messages?chat_id={chat_id}", headers=self.HEADERS)
         return req
 
     @validate_response
@@ -1386,7 +1613,7 @@ class Message(Auth):
             "message_body": message
         }
 
-        req = requests.post(f"{self.API_URL}/send_chat_message", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/send_chat_message", headers=self.HEADERS, json=data)
         return req
 
 
@@ -1411,9 +1638,10 @@ class Event(Auth):
             # "time_start_epoch": time_start_epoch,
             # "name": name
         }
-        req = requests.post(f"{self.API_URL}/get_event", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/get_event", headers=self.HEADERS, json=data)
         return req
 
+    @invalidates("get_events", "get_events_to_start", "get_events_for_user")
     @validate_response
     def create_event(self, name, time_start_epoch, description, event_id=None, user_ids=(), club_id=None,
                is_member_only=False, event_hashid=None):
@@ -1431,9 +1659,10 @@ class Event(Auth):
             "time_start_epoch": time_start_epoch,
             "name": name
         }
-        req = requests.post(f"{self.API_URL}/edit_event", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/edit_event", headers=self.HEADERS, json=data)
         return req
 
+    @invalidates("get_events", "get_events_to_start", "get_events_for_user")
     @validate_response
     def edit_event(self, name, time_start_epoch, description, event_id=None, user_ids=(), club_id=None,
              is_member_only=False, event_hashid=None):
@@ -1451,9 +1680,10 @@ class Event(Auth):
             "time_start_epoch": time_start_epoch,
             "name": name
         }
-        req = requests.post(f"{self.API_URL}/edit_event", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/edit_event", headers=self.HEADERS, json=data)
         return req
 
+    @invalidates("get_events", "get_events_to_start", "get_events_for_user")
     @validate_response
     def delete_event(self, event_id, user_ids=None, club_id=None, is_member_only=False, event_hashid=None,
                description=None, time_start_epoch=None, name=None):
@@ -1471,9 +1701,10 @@ class Event(Auth):
             "time_start_epoch": time_start_epoch,
             "name": name
         }
-        req = requests.post(f"{self.API_URL}/delete_event", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/delete_event", headers=self.HEADERS, json=data)
         return req
 
+    @cached
     @validate_response
     def get_events(self, is_filtered=True, page_size=25, page=1):
         """ (Clubhouse, bool, int, int) -> dict
@@ -1486,19 +1717,21 @@ class Event(Auth):
             page_size,
             page
         )
-        req = requests.get(f"{self.API_URL}/get_events?{query}", headers=self.HEADERS)
+        req = self.transport.get(f"{self.API_URL}/get_events?{query}", headers=self.HEADERS)
         return req
 
     # What is this?
+    @cached
     @validate_response
     def get_events_to_start(self):
         """ (Clubhouse) -> dict
 
         Get events to start
         """
-        req = requests.get(f"{self.API_URL}/get_events_to_start", headers=self.HEADERS)
+        req = self.transport.get(f"{self.API_URL}/get_events_to_start", headers=self.HEADERS)
         return req
 
+    @cached
     @validate_response
     def get_events_for_user(self, user_id='', page_size=25, page=1):
         """ (Clubhouse, str, int, int) -> dict
@@ -1506,7 +1739,7 @@ class Event(Auth):
         Get events for the specific user.
         """
         query = f"user_id={user_id}&page_size={page_size}&page={page}"
-        req = requests.get(f"{self.API_URL}/get_events_for_user?{query}", headers=self.HEADERS)
+        req = self.transport.get(f"{self.API_URL}/get_events_for_user?{query}", headers=self.HEADERS)
         return req
 
 
@@ -1514,6 +1747,7 @@ class Club(Auth):
     def __init__(self):
         super().__init__()
 
+    @cached
     @validate_response
     def get_club(self, club_id, source_topic_id=None):
         """ (Clubhouse, int, int) -> dict
@@ -1527,7 +1761,7 @@ class Club(Auth):
             "query_result_position": None,
             "slug": None,
         }
-        req = requests.post(f"{self.API_URL}/get_club", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/get_club", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -1543,9 +1777,10 @@ class Club(Auth):
             page_size,
             page
         )
-        req = requests.get(f"{self.API_URL}/get_club_members?{query}", headers=self.HEADERS)
+        req = self.transport.get(f"{self.API_URL}/get_club_members?{query}", headers=self.HEADERS)
         return req
 
+    @invalidates("get_club")
     @validate_response
     def join_club(self, club_id, source_topic_id=None):
         """ (Clubhouse, int, int) -> dict
@@ -1556,9 +1791,10 @@ class Club(Auth):
             "club_id": int(club_id),
             "source_topic_id": source_topic_id
         }
-        req = requests.post(f"{self.API_URL}/join_club", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/join_club", headers=self.HEADERS, json=data)
         return req
 
+    @invalidates("get_club")
     @validate_response
     def leave_club(self, club_id, source_topic_id=None):
         """ (Clubhouse, int, int) -> dict
@@ -1569,9 +1805,10 @@ class Club(Auth):
             "club_id": int(club_id),
             "source_topic_id": source_topic_id
         }
-        req = requests.post(f"{self.API_URL}/leave_club", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/leave_club", headers=self.HEADERS, json=data)
         return req
 
+    @invalidates("get_club")
     @validate_response
     def add_club_admin(self, club_id, user_id):
         """ (Clubhouse, int, int) -> dict
@@ -1582,9 +1819,10 @@ class Club(Auth):
             "club_id": int(club_id),
             "user_id": int(user_id)
         }
-        req = requests.post(f"{self.API_URL}/add_club_admin", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/add_club_admin", headers=self.HEADERS, json=data)
         return req
 
+    @invalidates("get_club")
     @validate_response
     def remove_club_admin(self, club_id, user_id):
         """ (Clubhouse, int, int) -> dict
@@ -1595,9 +1833,10 @@ class Club(Auth):
             "club_id": int(club_id) if club_id else None,
             "user_id": int(user_id)
         }
-        req = requests.post(f"{self.API_URL}/remove_club_admin", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/remove_club_admin", headers=self.HEADERS, json=data)
         return req
 
+    @invalidates("get_club")
     @validate_response
     def remove_club_member(self, club_id, user_id):
         """ (Clubhouse, int, int) -> dict
@@ -1608,9 +1847,10 @@ class Club(Auth):
             "club_id": int(club_id) if club_id else None,
             "user_id": int(user_id)
         }
-        req = requests.post(f"{self.API_URL}/remove_club_member", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/remove_club_member", headers=self.HEADERS, json=data)
         return req
 
+    @invalidates("get_club")
     @validate_response
     def accept_club_member_invite(self, club_id, source_topic_id=None, invite_code=None):
         """ (Clubhouse, int, int, str) -> dict
@@ -1625,9 +1865,10 @@ class Club(Auth):
             "slug": None,
             "source_topic_id": source_topic_id
         }
-        req = requests.post(f"{self.API_URL}/accept_club_member_invite", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/accept_club_member_invite", headers=self.HEADERS, json=data)
         return req
 
+    @invalidates("get_club")
     @validate_response
     def add_club_member(self, club_id, user_id, name, phone_number, message, reason):
         """ (Clubhouse, int, int, str, str, str, unknown) -> dict
@@ -1642,7 +1883,7 @@ class Club(Auth):
             "message": message,
             "reason": reason
         }
-        req = requests.post(f"{self.API_URL}/add_club_member", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/add_club_member", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -1655,7 +1896,7 @@ class Club(Auth):
             "club_id": int(club_id),
             "source_topic_id": source_topic_id
         }
-        req = requests.post(f"{self.API_URL}/get_club_nominations", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/get_club_nominations", headers=self.HEADERS, json=data)
         return req
 
     def approve_club_nomination(self, club_id, source_topic_id, invite_nomination_id):
@@ -1668,7 +1909,7 @@ class Club(Auth):
             "source_topic_id": source_topic_id,
             "invite_nomination_id": invite_nomination_id
         }
-        req = requests.post(f"{self.API_URL}/approve_club_nomination", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/approve_club_nomination", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -1682,9 +1923,10 @@ class Club(Auth):
             "source_topic_id": source_topic_id,
             "invite_nomination_id": invite_nomination_id
         }
-        req = requests.post(f"{self.API_URL}/approve_club_nomination", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/approve_club_nomination", headers=self.HEADERS, json=data)
         return req
 
+    @invalidates("get_club")
     @validate_response
     def add_club_topic(self, club_id, topic_id):
         """ (Club, int, int) -> dict
@@ -1695,9 +1937,10 @@ class Club(Auth):
             "club_id": int(club_id),
             "topic_id": int(topic_id)
         }
-        req = requests.post(f"{self.API_URL}/add_club_topic", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/add_club_topic", headers=self.HEADERS, json=data)
         return req
 
+    @invalidates("get_club")
     @validate_response
     def remove_club_topic(self, club_id, topic_id):
         """ (Club, int, int) -> dict
@@ -1708,9 +1951,10 @@ class Club(Auth):
             "club_id": int(club_id),
             "topic_id": int(topic_id)
         }
-        req = requests.post(f"{self.API_URL}/remove_club_topic", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/remove_club_topic", headers=self.HEADERS, json=data)
         return req
 
+    @invalidates("get_club")
     @validate_response
     def update_is_follow_allowed(self, club_id, is_follow_allowed=True):
         """ (Clubhouse, int, bool) -> dict
@@ -1721,9 +1965,10 @@ class Club(Auth):
             "club_id": int(club_id),
             "is_follow_allowed": is_follow_allowed
         }
-        req = requests.post(f"{self.API_URL}/update_is_follow_allowed", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/update_is_follow_allowed", headers=self.HEADERS, json=data)
         return req
 
+    @invalidates("get_club")
     @validate_response
     def update_is_membership_private(self, club_id, is_membership_private=False):
         """ (Clubhouse, int, bool) -> dict
@@ -1735,9 +1980,10 @@ class Club(Auth):
             "club_id": int(club_id),
             "is_membership_private": is_membership_private
         }
-        req = requests.post(f"{self.API_URL}/update_is_membership_private", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/update_is_membership_private", headers=self.HEADERS, json=data)
         return req
 
+    @invalidates("get_club")
     @validate_response
     def update_is_community(self, club_id, is_community=False):
         """ (Clubhouse, int, bool) -> dict
@@ -1748,9 +1994,10 @@ class Club(Auth):
             "club_id": int(club_id),
             "is_community": is_community
         }
-        req = requests.post(f"{self.API_URL}/update_is_community", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/update_is_community", headers=self.HEADERS, json=data)
         return req
 
+    @invalidates("get_club")
     @validate_response
     def update_club_description(self, club_id, description):
         """ (Clubhouse, int, str) -> dict
@@ -1761,9 +2008,10 @@ class Club(Auth):
             "club_id": int(club_id),
             "description": description
         }
-        req = requests.post(f"{self.API_URL}/update_club_description", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/update_club_description", headers=self.HEADERS, json=data)
         return req
 
+    @invalidates("get_club")
     @validate_response
     def update_club_rules(self, club_id='', rules=()):
         """ (Clubhouse, str, list) -> dict
@@ -1775,7 +2023,7 @@ class Club(Auth):
             "club_id": int(club_id),
             "rules": rules if rules else [],
         }
-        req = requests.post(f"{self.API_URL}/update_club_rules", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/update_club_rules", headers=self.HEADERS, json=data)
         return req
 
 
@@ -1783,13 +2031,14 @@ class Topic(Auth):
     def __init__(self):
         super().__init__()
 
+    @cached
     @validate_response
     def get_all_topics(self):
         """ (Clubhouse) -> dict
 
         Get list of topics, based on the server's channel selection algorithm
         """
-        req = requests.get(f"{self.API_URL}/get_all_topics", headers=self.HEADERS)
+        req = self.transport.get(f"{self.API_URL}/get_all_topics", headers=self.HEADERS)
         return req
 
     @validate_response
@@ -1801,7 +2050,7 @@ class Topic(Auth):
         data = {
             "topic_id": int(topic_id)
         }
-        req = requests.post(f"{self.API_URL}/get_topic", headers=self.HEADERS, json=data)
+        req = self.transport.post(f"{self.API_URL}/get_topic", headers=self.HEADERS, json=data)
         return req
 
     @validate_response
@@ -1815,7 +2064,7 @@ class Topic(Auth):
             page_size,
             page
         )
-        req = requests.get(f"{self.API_URL}/get_users_for_topic?{query}", headers=self.HEADERS)
+        req = self.transport.get(f"{self.API_URL}/get_users_for_topic?{query}", headers=self.HEADERS)
         return req
 
     @validate_response
@@ -1829,7 +2078,7 @@ class Topic(Auth):
             page_size,
             page
         )
-        req = requests.get(f"{self.API_URL}/get_clubs_for_topic?{query}", headers=self.HEADERS)
+        req = self.transport.get(f"{self.API_URL}/get_clubs_for_topic?{query}", headers=self.HEADERS)
         return req
 
 
@@ -0,0 +1,174 @@
+"""
+dedupe.py
+"""
+
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import MutableSet
+
+
+class BoundedSet(MutableSet):
+    """
+    Set that forgets: items are evicted once they are older than ttl seconds,
+    or, past maxlen items, oldest first.
+
+    Stands in for the plain sets used to remember notifications, users and
+    messages already handled, so a process running for months keeps a flat
+    memory footprint. Adding an item again renews it.
+
+    >>> scanned = BoundedSet(maxlen=10000, ttl=24 * 3600)
+    """
+
+    def __init__(self, iterable=(), maxlen=None, ttl=None):
+        self.maxlen = maxlen
+        self.ttl = ttl
+        self.items = OrderedDict()
+        self.evicted = 0
+        self.lock = threading.Lock()
+        for item in iterable:
+            self.add(item)
+
+    def __repr__(self):
+        return f"BoundedSet(size={len(self.items)}, maxlen={self.maxlen}, ttl={self.ttl}, evicted={self.evicted})"
+
+    def __contains__(self, item):
+        with self.lock:
+            added = self.items.get(item)
+            if added is None:
+                return False
+
+            if self.ttl is not None and time.monotonic() - added > self.ttl:
+                del self.items[item]
+                self.evicted += 1
+                return False
+
+        return True
+
+    def __iter__(self):
+        with self.lock:
+            self.prune(time.monotonic())
+            return iter(list(self.items))
+
+    def __len__(self):
+        with self.lock:
+            self.prune(time.monotonic())
+            return len(self.items)
+
+    def add(self, item):
+        now = time.monotonic()
+        with self.lock:
+            self.items[item] = now
+            self.items.move_to_end(item)
+            self.prune(now)
+
+    def discard(self, item):
+        with self.lock:
+            self.items.pop(item, None)
+
+    def update(self, *others):
+        for other in others:
+            for item in other:
+                self.add(item)
+
+    def copy(self):
+        copy = BoundedSet(maxlen=self.maxlen, ttl=self.ttl)
+        with self.lock:
+            copy.items = OrderedDict(self.items)
+        return copy
+
+    def union(self, *others):
+        union = self.copy()
+        union.update(*others)
+        return union
+
+    @classmethod
+    def _from_iterable(cls, iterable):
+        """ Result of the &, |, - and ^ operators: a plain set of the items at that moment.
+        A BoundedSet built there would drop the bounds, or renew every item's ttl.
+        """
+        return set(iterable)
+
+    def prune(self, now):
+        """ Evict expired and excess items. Must be called with the lock held. """
+        if self.ttl is not None:
+            while self.items and now - next(iter(self.items.values())) > self.ttl:
+                self.items.popitem(last=False)
+                self.evicted += 1
+
+        if self.maxlen is not None:
+            while len(self.items) > self.maxlen:
+                self.items.popitem(last=False)
+                self.evicted += 1
+
+
+class BloomSet:
+    """
+    Compact, approximate set of ids, for dedupe where an occasional false
+    "already seen" is acceptable.
+
+    Two Bloom filters of capacity items each are kept: once the newer one is
+    full, the older one is dropped and a fresh one started. Memory is fixed at
+    two filters of about 1.2 bytes per item of capacity at error_rate 0.01,
+    and the last capacity to 2 * capacity items are remembered. Items cannot
+    be removed.
+
+    >>> seen = BloomSet(capacity=100000, error_rate=0.001)
+    """
+
+    def __init__(self, capacity=100000, error_rate=0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self.filters = [bytearray((self.bits + 7) // 8)]
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def __repr__(self):
+        return "BloomSet(capacity={}, error_rate={}, bytes={})".format(
+            self.capacity,
+            self.error_rate,
+            sum(len(_) for _ in self.filters)
+        )
+
+    def positions(self, item):
+        digest = hashlib.blake2b(repr(item).encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.bits for i in range(self.hashes)]
+
+    def __contains__(self, item):
+        positions = self.positions(item)
+        with self.lock:
+            return any(
+                all(bloom[_ >> 3] & (1 << (_ & 7)) for _ in positions)
+                for bloom in self.filters
+            )
+
+    def __len__(self):
+        """ Items added since the newest filter was started. """
+        return self.count
+
+    def add(self, item):
+        positions = self.positions(item)
+        with self.lock:
+            if self.count >= self.capacity:
+                self.filters = [self.filters[-1], bytearray((self.bits + 7) // 8)]
+                self.count = 0
+
+            bloom = self.filters[-1]
+            for _ in positions:
+                bloom[_ >> 3] |= 1 << (_ & 7)
+            self.count += 1
+
+    def update(self, *others):
+        for other in others:
+            for item in other:
+                self.add(item)
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
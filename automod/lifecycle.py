@@ -0,0 +1,131 @@
+"""
+lifecycle.py
+"""
+
+import logging
+import threading
+import time
+
+
+def is_running(handle):
+    """ (any) -> bool
+
+    Whether a task handle still runs: a ScheduledJob or TaskHandle that is not
+    set or is in the middle of a run, or a thread that is alive.
+    """
+    if isinstance(handle, threading.Thread):
+        return handle.is_alive()
+    return not handle.is_set() or getattr(handle, "running", False)
+
+
+class Lifecycle:
+    """
+    Registry of every background task, by the room session that owns it.
+
+    Loops started through set_interval are registered under the session of
+    the client they run for, or under None when they belong to the process.
+    Leaving a room closes its session, which cancels all of its tasks; a task
+    still running grace seconds after its owner was closed is counted as
+    leaked.
+
+    >>> Clubhouse.lifecycle.stats()
+    {'owners': 3, 'live': 11, 'leaked': 0, 'threads': 9}
+    """
+
+    def __init__(self, grace=60):
+        self.grace = grace
+        self.tasks = {}
+        self.closed = []
+        self.lock = threading.Lock()
+
+    def __str__(self):
+        return "Lifecycle(owners={}, live={}, leaked={})".format(
+            len(self.tasks),
+            len(self.live()),
+            len(self.leaked())
+        )
+
+    def register(self, owner, handle):
+        """ (Lifecycle, ChannelSession, any) -> any
+
+        Track handle as a task of owner and return it.
+        """
+        with self.lock:
+            tasks = [_ for _ in self.tasks.get(owner, ()) if is_running(_)]
+            tasks.append(handle)
+            self.tasks[owner] = tasks
+        return handle
+
+    def close(self, owner):
+        """ (Lifecycle, ChannelSession) -> int
+
+        Cancel every task of owner. Returns the number of tasks cancelled.
+        """
+        with self.lock:
+            tasks = self.tasks.pop(owner, [])
+
+        cancelled = 0
+        for handle in tasks:
+            if not is_running(handle):
+                continue
+            if not isinstance(handle, threading.Thread):
+                handle.set()
+            cancelled += 1
+
+        with self.lock:
+            now = time.monotonic()
+            self.closed = [_ for _ in self.closed if is_running(_[1])]
+            self.closed.extend((now, _) for _ in tasks if is_running(_))
+
+        if cancelled:
+            logging.info(f"Cancelled {cancelled} tasks of {owner}")
+        return cancelled
+
+    def live(self, owner=None):
+        """ (Lifecycle, ChannelSession) -> list
+
+        Running tasks of owner, or of every owner by default.
+        """
+        with self.lock:
+            if owner is not None:
+                return [_ for _ in self.tasks.get(owner, ()) if is_running(_)]
+            return [_ for tasks in self.tasks.values() for _ in tasks if is_running(_)]
+
+    def leaked(self):
+        """ (Lifecycle) -> list
+
+        Tasks still running more than grace seconds after their owner was closed.
+        """
+        now = time.monotonic()
+        with self.lock:
+            self.closed = [_ for _ in self.closed if is_running(_[1])]
+            return [handle for closed, handle in self.closed if now - closed > self.grace]
+
+    def stats(self):
+        """ (Lifecycle) -> dict
+
+        Live task, leaked task and thread counts, to watch a long running
+        process for leaks.
+        """
+        with self.lock:
+            owners = len(self.tasks)
+
+        return {
+            "owners": owners,
+            "live": len(self.live()),
+            "leaked": len(self.leaked()),
+            "threads": threading.active_count(),
+        }
+
+    def shutdown(self):
+        """ (Lifecycle) -> NoneType
+
+        Cancel the tasks of every owner.
+        """
+        with self.lock:
+            owners = list(self.tasks)
+
+        for owner in owners:
+            self.close(owner)
+
+        logging.info(f"Closed: {self}")
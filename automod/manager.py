@@ -0,0 +1,160 @@
+"""
+manager.py
+"""
+
+import logging
+import threading
+
+from .automod import AutoModClient
+from .clubhouse import Clubhouse
+from .session import ChannelSession
+
+
+class ChannelManager:
+    """
+    Moderates up to max_rooms rooms concurrently from one process.
+
+    Every room gets a client of its own with its own ChannelSession. Rooms
+    share the account, the transport and the scheduler, but none of their
+    state, and leaving one room leaves the others untouched.
+
+    >>> manager = ChannelManager(max_rooms=5)
+    >>> manager.run()
+    """
+
+    # Scheduler workers reserved for every room the manager may run
+    workers_per_room = 4
+
+    def __init__(self, max_rooms=10, client_class=AutoModClient, on_release=None, snapshots=None):
+        """ (ChannelManager, int, type, function, SnapshotLog) -> NoneType
+
+        on_release(channel) is called whenever a room's slot is freed.
+        With snapshots, rooms are snapshotted there and resumed by run().
+        """
+        self.max_rooms = max_rooms
+        self.client_class = client_class
+        self.on_release = on_release
+        self.snapshots = snapshots
+        self.rooms = {}
+        self.listener = None
+        self.lock = threading.Lock()
+
+        scheduler = Clubhouse.scheduler
+        scheduler.workers = max(scheduler.workers, max_rooms * self.workers_per_room)
+
+    def __str__(self):
+        return f"ChannelManager(rooms={len(self.rooms)}/{self.max_rooms})"
+
+    def run(self, interval=300):
+        """ (ChannelManager, int) -> ScheduledJob
+
+        Listen for pings, joining every room the client is pinged to while there is capacity.
+        """
+        self.resume()
+
+        self.listener = self.client_class()
+        self.listener.manager = self
+        self.listener.automod_active = False
+        self.listener.waiting_ping_thread = self.listener.listen_for_ping(interval)
+        return self.listener.waiting_ping_thread
+
+    def join(self, channel, notification_id=None, **kwargs):
+        """ (ChannelManager, str, str) -> bool
+
+        Join channel with a new client and start moderating it.
+        Returns None when the manager is at capacity, so the ping is tried again.
+        """
+        with self.lock:
+            if channel in self.rooms:
+                logging.info(f"Already moderating {channel}")
+                return True
+
+            if len(self.rooms) >= self.max_rooms:
+                logging.info(f"At capacity ({self.max_rooms} rooms), not joining {channel}")
+                return None
+
+            client = self.new_client(channel)
+
+        join = client.automod_init(channel, notification_id, **kwargs)
+        if not join:
+            self.release(channel)
+        else:
+            logging.info(f"Joined: {channel} ({self})")
+
+        return join
+
+    def resume(self):
+        """ (ChannelManager) -> int
+
+        Resume the snapshotted rooms of the last run, up to capacity. Returns the number resumed.
+        """
+        if not self.snapshots:
+            return 0
+
+        resumed = 0
+        for channel, state in self.snapshots.rooms().items():
+            with self.lock:
+                if channel in self.rooms or len(self.rooms) >= self.max_rooms:
+                    continue
+                client = self.new_client(channel)
+
+            if client.automod_resume(channel, state):
+                resumed += 1
+                logging.info(f"Resumed: {channel} ({self})")
+            else:
+                self.release(channel)
+
+        return resumed
+
+    def new_client(self, channel):
+        """ Client of a new room. Must be called with the lock held. """
+        client = self.client_class()
+        client.manager = self
+        client.session = ChannelSession(channel)
+        if self.snapshots:
+            client.snapshots = self.snapshots
+        self.rooms[channel] = client
+        return client
+
+    def leave(self, channel, close_snapshot=True):
+        """ (ChannelManager, str, bool) -> NoneType
+
+        Stop moderating channel and leave it.
+        Without close_snapshot the room stays in the snapshot log.
+        """
+        client = self.rooms.get(channel)
+        if client is None:
+            return
+
+        client.automod_active = False
+        client.terminate_channel_init(channel, close_snapshot)
+        self.release(channel)
+
+    def release(self, channel):
+        """ Free the slot of a room its client has left. """
+        with self.lock:
+            client = self.rooms.pop(channel, None)
+
+        if client is not None:
+            logging.info(f"Released: {channel} ({self})")
+            if self.on_release:
+                self.on_release(channel)
+
+    def sessions(self):
+        """ (ChannelManager) -> dict
+
+        Session of every room being moderated.
+        """
+        with self.lock:
+            return {channel: client.session for channel, client in self.rooms.items()}
+
+    def stop(self):
+        """ (ChannelManager) -> NoneType
+
+        Stop listening for pings and leave every room.
+        """
+        if self.listener and self.listener.waiting_ping_thread:
+            self.listener.waiting_ping_thread.set()
+
+        for channel in list(self.rooms):
+            self.leave(channel)
@@ -0,0 +1,230 @@
+"""
+metrics.py
+"""
+
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+
+import pytz
+
+
+class Histogram:
+    """ Cumulative latency histogram with fixed upper bounds, Prometheus style. """
+
+    BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float("inf"))
+
+    def __init__(self, buckets=None):
+        self.buckets = tuple(buckets) if buckets else self.BUCKETS
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+
+    def quantile(self, q):
+        """ (Histogram, float) -> float
+
+        Upper bound of the bucket holding quantile q.
+        """
+        if not self.count:
+            return 0
+        for bound, total in self.cumulative():
+            if total >= q * self.count:
+                return bound
+        return self.buckets[-1]
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "buckets": {format_bound(bound): total for bound, total in self.cumulative()},
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+        }
+
+
+class EndpointStats:
+    """ Counters and latency histogram for one endpoint. """
+
+    def __init__(self):
+        self.calls = 0
+        self.retries = 0
+        self.status_codes = {}
+        self.errors = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.queue_time = 0
+        self.latency = Histogram()
+
+    def snapshot(self):
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "status_codes": dict(self.status_codes),
+            "errors": dict(self.errors),
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "queue_time": round(self.queue_time, 6),
+            "latency": self.latency.snapshot(),
+        }
+
+
+class Metrics:
+    """
+    Per-endpoint request instrumentation used by the transport.
+
+    Read it in-process with snapshot(), export it with prometheus(), or add
+    sinks that receive every request as an event dict, e.g. JsonLinesSink.
+    """
+
+    def __init__(self):
+        self.endpoints = {}
+        self.sinks = []
+        self.started = time.time()
+        self.lock = threading.Lock()
+
+    def get_stats(self, endpoint):
+        """ Must be called with the lock held. """
+        stats = self.endpoints.get(endpoint)
+        if stats is None:
+            stats = self.endpoints[endpoint] = EndpointStats()
+        return stats
+
+    def record_request(self, endpoint, method, status_code=None, latency=None, bytes_sent=0, bytes_received=0,
+                       queue_time=0, error=None):
+        """ (Metrics, str, str, int, float, int, int, float, str) -> NoneType
+
+        Record one request. status_code is None when no response was received.
+        """
+        with self.lock:
+            stats = self.get_stats(endpoint)
+            stats.calls += 1
+            stats.bytes_sent += bytes_sent
+            stats.bytes_received += bytes_received
+            stats.queue_time += queue_time
+            if status_code is not None:
+                stats.status_codes[status_code] = stats.status_codes.get(status_code, 0) + 1
+            if error:
+                stats.errors[error] = stats.errors.get(error, 0) + 1
+            if latency is not None:
+                stats.latency.observe(latency)
+
+        self.emit({
+            "time": datetime.now(pytz.UTC).isoformat(),
+            "endpoint": endpoint,
+            "method": method,
+            "status_code": status_code,
+            "latency": latency,
+            "bytes_sent": bytes_sent,
+            "bytes_received": bytes_received,
+            "queue_time": queue_time,
+            "error": error,
+        })
+
+    def record_retry(self, endpoint):
+        with self.lock:
+            self.get_stats(endpoint).retries += 1
+
+    def emit(self, event):
+        for sink in self.sinks:
+            try:
+                sink(event)
+            except Exception as error:
+                logging.error(f"Metrics sink {sink} {error}")
+
+    def add_sink(self, sink):
+        """ Call sink(event) for every recorded request. """
+        self.sinks.append(sink)
+
+    def remove_sink(self, sink):
+        self.sinks.remove(sink)
+
+    def snapshot(self):
+        """ (Metrics) -> dict
+
+        Copy of every endpoint's counters.
+        """
+        with self.lock:
+            return {endpoint: stats.snapshot() for endpoint, stats in self.endpoints.items()}
+
+    def reset(self):
+        with self.lock:
+            self.endpoints = {}
+            self.started = time.time()
+
+    def prometheus(self, prefix="automod"):
+        """ (Metrics, str) -> str
+
+        Render every endpoint in the Prometheus text exposition format.
+        """
+        snapshot = self.snapshot()
+        lines = []
+
+        def family(name, metric_type, help_text):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {metric_type}")
+
+        family("requests_total", "counter", "Requests by endpoint and status code.")
+        for endpoint, stats in snapshot.items():
+            for status_code, count in stats["status_codes"].items():
+                lines.append(f'{prefix}_requests_total{{endpoint="{endpoint}",status="{status_code}"}} {count}')
+
+        family("request_errors_total", "counter", "Requests that got no response, by error.")
+        for endpoint, stats in snapshot.items():
+            for error, count in stats["errors"].items():
+                lines.append(f'{prefix}_request_errors_total{{endpoint="{endpoint}",error="{error}"}} {count}')
+
+        for name, key, help_text in (
+                ("request_retries_total", "retries", "Retried requests."),
+                ("request_bytes_sent_total", "bytes_sent", "Request body bytes sent."),
+                ("request_bytes_received_total", "bytes_received", "Response body bytes received."),
+                ("request_queue_seconds_total", "queue_time", "Seconds spent waiting on the rate limiter.")):
+            family(name, "counter", help_text)
+            for endpoint, stats in snapshot.items():
+                lines.append(f'{prefix}_{name}{{endpoint="{endpoint}"}} {stats[key]}')
+
+        family("request_duration_seconds", "histogram", "Request latency.")
+        for endpoint, stats in snapshot.items():
+            latency = stats["latency"]
+            for bound, total in latency["buckets"].items():
+                lines.append(f'{prefix}_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {total}')
+            lines.append(f'{prefix}_request_duration_seconds_sum{{endpoint="{endpoint}"}} {latency["sum"]}')
+            lines.append(f'{prefix}_request_duration_seconds_count{{endpoint="{endpoint}"}} {latency["count"]}')
+
+        return "\n".join(lines) + "\n"
+
+
+class JsonLinesSink:
+    """ Metrics sink appending every request event to a file as one JSON line. """
+
+    def __init__(self, filename="automod_metrics.jsonl"):
+        self.filename = filename
+        self.lock = threading.Lock()
+
+    def __str__(self):
+        return f"JsonLinesSink(filename={self.filename})"
+
+    def __call__(self, event):
+        line = json.dumps(event)
+        with self.lock, open(self.filename, "a") as metrics_file:
+            metrics_file.write(line + "\n")
+
+
+def format_bound(bound):
+    return "+Inf" if bound == float("inf") else str(bound)
@@ -1,9 +1,8 @@
 """
 moderator.py
 """
+import json
 import logging
-import threading
-import time
 import random
 
 from datetime import datetime
@@ -12,6 +11,14 @@ import pytz
 
 from .clubhouse import Config
 from .clubhouse import Clubhouse
+from .actions import ActionQueue
+from .session import ChannelSession
+from .session import guest_set
+from .session import SessionAttribute
+from .roomstate import RoomState
+from .roster import RoomRoster
+from .roster import RosterDiff
+from .transport import Deadline
 
 
 set_interval = Clubhouse.set_interval
@@ -20,8 +27,8 @@ set_interval = Clubhouse.set_interval
 # noinspection DuplicatedCode
 class ModClient(Clubhouse):
     # Should I add phone number and verification code to __init__?
-    # Add pickling to save data in case client refreshes before channel ends
-    def __init__(self):
+    def __init__(self, session=None):
+        self.session = session if session else ChannelSession()
         super().__init__()
 
 
@@ -30,55 +37,127 @@ class ModClient(Clubhouse):
 
     def channel_init(
             self, channel, api_retry_interval_sec=10, thread_timeout=120,
-            announcement=None, announcement_interval_min=60, announcement_delay=None):
+            announcement=None, announcement_interval_min=60):
 
-        join_info = self.set_join_status(channel)
-        if not join_info:
-            logging.info(f"Did not successfully join channel: {channel}")
-            return
+        self.announcement = announcement
+        self.announcement_interval_min = announcement_interval_min
 
-        if not join_info.get("success"):
-            return join_info
+        # The join handshake shares one latency budget; waiting for speaker/mod is bounded by thread_timeout
+        with Deadline(self.channel_init_deadline):
+            join_info = self.set_join_status(channel)
+            if not join_info:
+                logging.info(f"Did not successfully join channel: {channel}")
+                return
 
-        channel_status = self.set_channel_status(channel)
-        if not channel_status:
-            logging.info(f"Did not successfully get channel info: {channel}")
-            return
+            if not join_info.get("success"):
+                return join_info
 
-        self.set_channel_init()
+            channel_status = self.set_channel_status(channel)
+            if not channel_status:
+                logging.info(f"Did not successfully get channel info: {channel}")
+                return
 
-        self.keep_alive_thread = self.keep_alive_ping(channel)
+            self.set_channel_init()
 
-        if self.chat_enabled:
-            self.send_hello_message(channel)
+            self.keep_alive_thread = self.keep_alive_ping(channel)
+            self.action_thread = self.run_actions(channel)
 
-        if self.waiting_speaker:
-            is_speaker = self.wait_to_speak(channel, api_retry_interval_sec, thread_timeout)
+            if self.chat_enabled:
+                self.send_hello_message(channel)
 
-            if not is_speaker:
-                logging.info("Client was not invited as speaker")
-                self.terminate_channel(channel)
-                return False
+        self.start_room_state(channel, api_retry_interval_sec, thread_timeout)
+        self.snapshot_thread = self.start_snapshots(channel)
+        return join_info
+
+    def start_room_state(self, channel, api_retry_interval_sec=10, thread_timeout=120, announce_now=True):
+        """ (ModClient, str, int, int, bool) -> RoomState
 
-        if self.waiting_mod:
-            is_mod = self.wait_for_mod(channel, api_retry_interval_sec, thread_timeout)
+        Await speaker and mod privileges in the background, see watch_room,
+        and start the announcements once the room is active.
+        """
+        self.room_state = RoomState(channel)
+        self.room_state.on(RoomState.WAITING_SPEAKER, lambda *_: self.request_to_speak(channel))
+        self.room_state.on(RoomState.CLOSED, self.on_room_closed)
+
+        def on_active(future):
+            if not future.cancelled():
+                self.start_announcements(
+                    channel, self.announcement, self.announcement_interval_min, announce_now)
+
+        self.room_state.when(RoomState.ACTIVE).add_done_callback(on_active)
+
+        if self.update_room_state() != RoomState.ACTIVE:
+            self.watch_room(channel, api_retry_interval_sec, thread_timeout)
+
+        return self.room_state
+
+    def resume_channel(self, channel, state, api_retry_interval_sec=10, thread_timeout=120):
+        """ (ModClient, str, dict, int, int) -> bool
+
+        Resume moderating channel from a snapshot, after a restart.
+
+        Guests already welcomed or screened stay so, the room keeps its
+        creation time and no hello message or announcement is repeated: the
+        client only rejoins and refreshes the room, then carries on.
+        """
+        self.session.restore(state)
+        self.channel_active = True
 
-            if not is_mod:
-                logging.info("Client was not given moderator privileges")
-                self.terminate_channel(channel)
+        with Deadline(self.channel_init_deadline):
+            join = self.channel.join_channel(channel)
+            if not join.get("success"):
+                logging.info(f"Could not resume {channel}: {join.get('error_message')}")
+                if self.snapshots:
+                    self.snapshots.close(channel)
                 return False
 
-        if self.chat_enabled:
-            if self.url_announcement:
-                self.url_announcement_thread = self.set_url_announcement(channel)
+            self.token = self.get_token(join)
+            self.set_channel_status(channel)
+            self.keep_alive_thread = self.keep_alive_ping(channel)
+            self.action_thread = self.run_actions(channel)
 
-            self.runtime_announcement_thread = self.set_runtime_announcement(channel)
+        self.start_room_state(channel, api_retry_interval_sec, thread_timeout, announce_now=False)
+        self.snapshot_thread = self.start_snapshots(channel)
+        logging.info(f"Resumed: {channel}")
+        return True
 
-            if announcement:
-                self.announcement_thread = self.set_announcement(
-                    channel, announcement, announcement_interval_min, announcement_delay)
+    def start_announcements(self, channel, announcement=None, announcement_interval_min=60, announce_now=True):
+        if not self.chat_enabled:
+            return
 
-        return join_info
+        if self.url_announcement:
+            self.url_announcement_thread = self.set_url_announcement(channel, announce_now=announce_now)
+
+        self.runtime_announcement_thread = self.set_runtime_announcement(channel, announce_now=announce_now)
+
+        if announcement:
+            self.announcement_thread = self.set_announcement(
+                channel, announcement, announcement_interval_min)
+
+    def start_snapshots(self, channel):
+        """ Snapshot the room now and then every minute it changed, when snapshots are on. """
+        if not self.snapshots:
+            return None
+
+        self.snapshot_room(channel)
+        return self.snapshot_room_loop(channel)
+
+    def snapshot_room(self, channel):
+        """ Append the room's state to the snapshot log, unless unchanged since the last one. """
+        state = self.session.snapshot()
+        digest = hash(json.dumps(state, sort_keys=True, default=str))
+        if digest == self.snapshot_digest or self.room_state is None:
+            return
+
+        self.snapshots.append(channel, state)
+        self.snapshot_digest = digest
+
+    @set_interval(60)
+    def snapshot_room_loop(self, channel):
+        if self.room_state is None:
+            return False
+        self.snapshot_room(channel)
+        return True
 
     def get_join_info(self, channel):
         join_info = self.channel.join_channel(channel)
@@ -90,13 +169,14 @@ class ModClient(Clubhouse):
         if not join_info.get("success"):
             return join_info
 
+        roster = self.roster = RoomRoster.from_response(join_info)
         self.channel_type = self.get_channel_type(join_info)
-        self.host_name, self.host_id = self.get_host_info(join_info)
+        self.host_name, self.host_id = self.get_host_info(join_info, roster)
         self.club_id = self.get_club(join_info)
         self.auto_speaker_approval = self.get_auto_speaker_approval(join_info)
-        self.time_created = self.get_time_created(join_info)
+        self.time_created = self.get_time_created(join_info, roster)
         self.token = self.get_token(join_info)
-        self.screened_user_set = self.get_users_in_room(join_info)
+        self.screened_user_set = guest_set(self.get_users_in_room(join_info, roster))
         self.chat_enabled = self.get_chat_enabled(join_info)
 
         self.already_welcomed_set.add(self.host_id)
@@ -117,6 +197,7 @@ class ModClient(Clubhouse):
 
         users_info = self.get_users_info(channel_info, channel_info=True)
         client_info = self.get_client_info(users_info, user_info=True)
+        self.record_churn(users_info)
         self.channel_active = True
         self.chat_enabled = self.get_chat_enabled(channel_info)
         self.filtered_users_list = self.filter_screened_users(users_info)
@@ -155,49 +236,57 @@ class ModClient(Clubhouse):
         return True
 
     def active_channel(
-            self, channel, message_delay=2, reconnect_interval=10, reconnect_timeout=120):
+            self, channel, reconnect_interval=10, reconnect_timeout=120):
 
         channel_info, users_info, client_info = self.refresh_channel_status(channel)
 
-        if not self.channel_active:
-            is_active = self.wait_for_reconnection(channel, reconnect_interval, reconnect_timeout)
-
-            if not is_active:
-                self.terminate_channel(channel)
-                return
-
-        if self.granted_speaker and not self.active_speaker:
-            is_speaker = self.wait_to_speak(channel, reconnect_interval, reconnect_timeout)
-
-            if not is_speaker:
-                self.terminate_channel(channel)
-                return
-
-        if self.granted_mod and not self.active_mod:
-            is_mod = self.wait_to_speak(channel, reconnect_interval, reconnect_timeout)
-
-            if not is_mod:
-                self.terminate_channel(channel)
-                return
+        # Reconnecting and regaining privileges happen in the background, see watch_room
+        state = self.update_room_state()
+        if state != RoomState.ACTIVE:
+            if state != RoomState.CLOSED:
+                self.watch_room(channel, reconnect_interval, reconnect_timeout)
+            return
 
         # if self.channel_type != "public" or self.in_wwsl_club or self.in_automod_club or self.in_social_club:
-        #     self.welcome_guests(channel, users_info, message_delay=5)
+        #     self.welcome_guests(channel, users_info)
 
         if users_info:
-
-            self.invite_guests(channel, users_info, message_delay)
-            self.mod_guests(channel, users_info)
+            # Only users who joined or started speaking since the last tick need screening
+            roster_diff = self.diff_roster(users_info)
+            self.invite_guests(channel, roster_diff.joined)
+            self.retry_invites(channel, users_info)
+            self.mod_guests(channel, roster_diff.speakers)
 
         return channel_info
 
-    @set_interval(30)
+    def diff_roster(self, roster):
+        """ (ModClient, RoomRoster) -> RosterDiff
+
+        Changes since the roster last moderated, the whole room the first time.
+        """
+        roster_diff = RosterDiff(self.moderated_roster, roster)
+        self.moderated_roster = roster
+        if roster_diff:
+            logging.info(roster_diff)
+        return roster_diff
+
+    @set_interval(30, fixed_rate=True, jitter=0.1)
     def keep_alive_ping(self, channel):
         self.channel.active_ping(channel)
         return True
 
+    @set_interval(1)
+    def run_actions(self, channel):
+        """ Run the room's queued invites, promotions and messages, most urgent first.
+        Actions that would wait on the rate limit are left for the next run.
+        """
+        self.actions.drain(self.actions_per_run, self.transport.limiter)
+        return True
+
     def refresh_channel_status(self, channel):
 
-        channel_info = self.get_channel_info(channel)
+        with Deadline(self.refresh_deadline):
+            channel_info = self.get_channel_info(channel)
 
         if not channel_info:
             self.channel_active = False
@@ -209,6 +298,7 @@ class ModClient(Clubhouse):
 
         users_info = self.get_users_info(channel_info, channel_info=True)
         client_info = self.get_client_info(users_info, user_info=True)
+        self.record_churn(users_info)
 
         self.chat_enabled = self.get_chat_enabled(channel_info)
         self.active_speaker = self.get_speaker_status(client_info, client_info=True)
@@ -216,59 +306,122 @@ class ModClient(Clubhouse):
 
         return channel_info, users_info, client_info
 
-    def wait_for_reconnection(self, channel, interval=20, timeout=120):
+    def record_churn(self, users_info):
+        """ Count users who joined or left since the last refresh as room activity. """
+        user_ids = set(users_info.ids()) if users_info else set()
+        if self.last_user_ids:
+            self.activity.record("churn", len(user_ids ^ self.last_user_ids))
+        self.last_user_ids = user_ids
 
-        active_channel_status = threading.Event()
-        self.waiting_reconnect_thread = threading.Thread(
-            target=self.recheck_connection_status, args=(channel, interval, active_channel_status))
+    def update_room_state(self):
+        """ (ModClient) -> str
 
-        self.waiting_reconnect_thread.daemon = True
-        self.waiting_reconnect_thread.start()
-        logging.info(f"Stopped: {self.waiting_reconnect_thread}")
-        self.waiting_reconnect_thread.join(timeout)
-        logging.info(f"Joined: {self.waiting_reconnect_thread}")
+        Set the room state from the statuses of the last channel refresh.
+        """
+        if self.room_state is None or self.room_state.is_closed():
+            return RoomState.CLOSED
 
-        return True if self.channel_active else False
+        if not self.channel_active:
+            state = RoomState.RECONNECTING
+        elif (self.waiting_speaker or self.granted_speaker) and not self.active_speaker:
+            state = RoomState.WAITING_SPEAKER
+        elif (self.waiting_mod or self.granted_mod) and not self.active_mod:
+            state = RoomState.WAITING_MOD
+        else:
+            state = RoomState.ACTIVE
 
-    def recheck_connection_status(self, channel, interval, active_channel_status):
+        self.room_state.set_state(state)
+        return state
 
-        while not active_channel_status.isSet():
-            join = self.channel.join_channel(channel)
-            if join:
-                if join.get("success"):
-                    self.channel_active = True
-
-                elif join.get("success") is False:
-                    logging.info(join)
-
-                    error_message = join.get("error_message")
-                    if "That room is no longer available" in error_message:
-                        active_channel_status.set()
-                        logging.info("Channel is closed")
-                        logging.info(f"Stopped: {self.waiting_reconnect_thread}")
-
-            if self.channel_active:
-                active_channel_status.set()
-                logging.info(f"Stopped: {self.waiting_reconnect_thread}")
-            else:
-                logging.info("Still attempting to reconnect")
+    def room_is_active(self):
+        """ Whether the client is in the room as speaker and mod, as of the last refresh. """
+        return self.room_state is not None and self.room_state.state == RoomState.ACTIVE
+
+    def watch_room(self, channel, interval=10, timeout=120):
+        """ (ModClient, str, int, int) -> ScheduledJob
+
+        Until the room is active again, every interval seconds: rejoin or accept
+        the speaker invite, then refresh the channel. The room is closed after
+        timeout seconds in the same waiting state. Only one watch runs per room.
+        """
+        if self.room_watch and not self.room_watch.is_set():
+            return self.room_watch
+
+        room_state = self.room_state
+
+        @self.set_interval(interval)
+        def watch(self):
+            state = room_state.state
+            if state == RoomState.RECONNECTING:
+                self.rejoin_channel(channel)
+
+            elif state == RoomState.WAITING_SPEAKER:
+                self.channel.accept_speaker_invite(channel, self.client_id)
+
+            if not room_state.is_closed() and self.room_state is room_state:
+                self.refresh_channel_status(channel)
+                state = self.update_room_state()
+
+            if state in (RoomState.ACTIVE, RoomState.CLOSED):
+                return False
+
+            if room_state.time_in_state() > timeout:
+                logging.info(f"Gave up on {channel} while {state}")
+                room_state.set_state(RoomState.CLOSED)
+                return False
+
+            logging.info(f"Still {state} in {channel}")
+            return True
+
+        self.room_watch = watch(self)
+        return self.room_watch
+
+    def rejoin_channel(self, channel):
+        join = self.channel.join_channel(channel)
+        if join.get("success"):
+            self.channel_active = True
+            return
+
+        logging.info(join)
+        error_message = join.get("error_message") or ""
+        if "That room is no longer available" in error_message:
+            logging.info("Channel is closed")
+            self.room_state.set_state(RoomState.CLOSED)
 
-            active_channel_status.wait(interval)
+    def on_room_closed(self, room_state, previous, state):
+        # Ignore rooms already left through terminate_channel
+        if self.room_state is room_state:
+            self.room_closed(room_state.channel)
+
+    def room_closed(self, channel):
+        """ The room closed, or the client gave up waiting in it. """
+        self.terminate_channel(channel)
 
     def get_users_info(self, param, channel_info=False):
+        """ (ModClient, dict or str, bool) -> RoomRoster
 
-        if channel_info:
-            user_info = param.get("users")
+        Roster of a get_channel response, or of channel fetched anew. The
+        roster of the latest refresh is kept as self.roster.
+        """
+        if not channel_info:
+            param = self.get_channel_info(param)
 
-        else:
-            channel_info = self.get_channel_info(param)
-            user_info = channel_info.get("users")
+        self.roster = RoomRoster.from_response(param)
+        return self.roster
 
-        return user_info
+    def get_roster(self, param, channel_info=False, user_info=False):
+        """ Roster of a roster or user list, a get_channel response, or channel fetched anew. """
+        if user_info:
+            return param if isinstance(param, RoomRoster) else RoomRoster(param)
 
-    def get_users_in_room(self, join_info):
-        users = join_info.get("users")
-        users_set = set(_.get("user_id") for _ in users)
+        if not channel_info:
+            param = self.get_channel_info(param)
+
+        return RoomRoster.from_response(param)
+
+    def get_users_in_room(self, join_info, roster=None):
+        roster = roster if roster else RoomRoster.from_response(join_info)
+        users_set = set(roster.ids())
         self.already_in_room_set = users_set
         users_set.add(self.client_id)
         return users_set
@@ -276,55 +429,31 @@ class ModClient(Clubhouse):
     def filter_screened_users(self, user_info, for_speaker=False, for_mod=False):
 
         if for_speaker:
-            unscreened_new_users_list = [_ for _ in user_info if _.get("user_id") not in self.screened_for_speaker_set]
+            screened = self.screened_for_speaker_set
 
         elif for_mod:
-            unscreened_new_users_list = [_ for _ in user_info if _.get("user_id") not in self.screened_for_mod_set]
+            screened = self.screened_for_mod_set
 
         else:
-            unscreened_new_users_list = [_ for _ in user_info if _.get("user_id") not in self.screened_user_set]
+            screened = self.screened_user_set
 
-        return unscreened_new_users_list
+        return self.get_roster(user_info, user_info=True).unscreened(screened)
 
     def update_screened_users(self):
         union = self.screened_user_set.union(self.unscreened_user_set)
         return union
 
     def get_client_info(self, param, channel_info=False, user_info=False):
-
-        if user_info:
-            client_info = [_ for _ in param if _.get("user_id") == self.client_id][0]
-
-        elif channel_info:
-            user_info = param.pop("users")
-            client_info = [_ for _ in user_info if _.get("user_id") == self.client_id][0]
-
-        else:
-            channel_info = self.get_channel_info(param)
-            user_info = channel_info.pop("users")
-            client_info = [_ for _ in user_info if _.get("user_id") == self.client_id][0]
-
-        return client_info
+        """ The client's own user in the room, None when it is not in it. """
+        return self.get_roster(param, channel_info, user_info).get(self.client_id)
 
     def get_speaker_status(self, param, channel_info=False, user_info=False, client_info=False):
 
         if client_info:
-            speaker_status = param.get("is_speaker")
-
-        elif user_info:
-            client_info = [_ for _ in param if _.get("user_id") == self.client_id][0]
-            speaker_status = client_info.get("is_speaker")
-
-        elif channel_info:
-            user_info = param.pop("users")
-            client_info = [_ for _ in user_info if _.get("user_id") == self.client_id][0]
-            speaker_status = client_info.get("is_speaker")
+            speaker_status = param.get("is_speaker") if param else False
 
         else:
-            channel_info = self.get_channel_info(param)
-            user_info = channel_info.pop("users")
-            client_info = [_ for _ in user_info if _.get("user_id") == self.client_id][0]
-            speaker_status = client_info.get("is_speaker")
+            speaker_status = self.client_id in self.get_roster(param, channel_info, user_info).speakers
 
         if speaker_status:
             self.granted_speaker = True
@@ -337,58 +466,13 @@ class ModClient(Clubhouse):
         request = self.channel.audience_reply(channel)
         return request
 
-    def wait_to_speak(self, channel, interval=10, timeout=120):
-
-        self.request_to_speak(channel)
-        active_speaker_status = threading.Event()
-        self.waiting_speaker_thread = threading.Thread(
-            target=self.recheck_speaker_status, args=(channel, interval, active_speaker_status))
-
-        self.waiting_speaker_thread.daemon = True
-        self.waiting_speaker_thread.start()
-        logging.info(f"Stopped: {self.waiting_speaker_thread}")
-        self.waiting_speaker_thread.join(timeout)
-        logging.info(f"Joined: {self.waiting_speaker_thread}")
-        active_speaker_status.set()
-
-        return True if self.active_speaker else False
-
-    def recheck_speaker_status(self, channel, interval, active_speaker_status):
-
-        while not active_speaker_status.isSet():
-            self.channel.accept_speaker_invite(channel, self.client_id)
-            self.granted_speaker = self.get_speaker_status(channel)
-
-            if self.granted_speaker:
-                active_speaker_status.set()
-                self.waiting_speaker = False
-                self.active_speaker = True
-                logging.info(f"Stopped: {self.waiting_speaker_thread}")
-
-            else:
-                logging.info("Still waiting to join stage")
-
-            active_speaker_status.wait(interval)
-
     def get_mod_status(self, param, channel_info=False, user_info=False, client_info=False):
 
         if client_info:
-            mod_status = param.get("is_moderator")
-
-        elif user_info:
-            client_info = [_ for _ in param if _.get("user_id") == self.client_id][0]
-            mod_status = client_info.get("is_moderator")
-
-        elif channel_info:
-            user_info = param.pop("users")
-            client_info = [_ for _ in user_info if _.get("user_id") == self.client_id][0]
-            mod_status = client_info.get("is_moderator")
+            mod_status = param.get("is_moderator") if param else False
 
         else:
-            channel_info = self.get_channel_info(param)
-            user_info = channel_info.pop("users")
-            client_info = [_ for _ in user_info if _.get("user_id") == self.client_id][0]
-            mod_status = client_info.get("is_moderator")
+            mod_status = self.client_id in self.get_roster(param, channel_info, user_info).moderators
 
         if mod_status:
             self.granted_mod = True
@@ -397,43 +481,13 @@ class ModClient(Clubhouse):
 
         return mod_status
 
-    def wait_for_mod(self, channel, interval=10, timeout=120):
-
-        active_mod_status = threading.Event()
-        self.waiting_mod_thread = threading.Thread(
-            target=self.recheck_mod_status, args=(channel, interval, active_mod_status))
-
-        self.waiting_mod_thread.daemon = True
-        self.waiting_mod_thread.start()
-        logging.info(f"Started: {self.waiting_mod_thread}")
-        self.waiting_mod_thread.join(timeout)
-        logging.info(f"Joined: {self.waiting_mod_thread}")
-        active_mod_status.set()
-
-        return True if self.active_mod else False
-
-    def recheck_mod_status(self, channel, interval, active_mod_status):
-
-        while not active_mod_status.isSet():
-            self.granted_mod = self.get_mod_status(channel)
-
-            if self.granted_mod:
-                active_mod_status.set()
-                self.waiting_mod = False
-                self.active_mod = True
-                logging.info(f"Stopped: {self.waiting_mod_thread}")
-
-            else:
-                logging.info("Still waiting mod privileges")
-
-            active_mod_status.wait(interval)
-
     @staticmethod
     def get_chat_enabled(join_or_channel_info):
         chat_enabled = join_or_channel_info.get("is_chat_enabled")
         return chat_enabled
 
-    def send_room_chat(self, channel, message, delay=10):
+    def send_room_chat(self, channel, message):
+        # Messages are paced by the send_channel_message rate limit in the transport
         response = {"success": False, "error_message": "internal response - send_room_chat"}
 
         if isinstance(message, str):
@@ -441,7 +495,6 @@ class ModClient(Clubhouse):
 
         for _ in message:
             response = self.chat.send_chat(channel, _)
-            time.sleep(delay)
 
         return response
 
@@ -463,12 +516,12 @@ class ModClient(Clubhouse):
 
         return message, message_alt
 
-    def send_hello_message(self, channel, delay=5):
+    def send_hello_message(self, channel):
         targeted_message = self.set_targeted_message()
         hello_message, hello_message_alt = self.set_hello_message(targeted_message)
         response = False
 
-        send = self.send_room_chat(channel, hello_message, delay)
+        send = self.send_room_chat(channel, hello_message)
         logging.info(hello_message)
 
         if send.get("success") is not False:
@@ -477,24 +530,18 @@ class ModClient(Clubhouse):
         error_message = send.get("error_message")
         if "something like that" in error_message:
 
-            response = self.send_room_chat(channel, hello_message_alt, delay)
+            response = self.send_room_chat(channel, hello_message_alt)
             logging.info(f"Sent alternate hello message: {hello_message_alt}")
             logging.info(response)
 
         return response
 
     @staticmethod
-    def get_host_info(join_info):
-        host_id = join_info.get("creator_user_profile_id")
-        host_name = [_.get("first_name") for _ in join_info.get("users") if _.get("user_id") == host_id]
-
-        if host_name:
-            host_name = host_name[0]
-
-        else:
-            host = join_info.get("users")[0]
-            host_name = host.get("first_name")
-            host_id = host.get("user_id")
+    def get_host_info(join_info, roster=None):
+        roster = roster if roster else RoomRoster.from_response(join_info)
+        host = roster.host
+        host_name = host.get("first_name")
+        host_id = host.get("user_id")
 
         logging.info(host_name)
         return host_name, host_id
@@ -562,36 +609,39 @@ class ModClient(Clubhouse):
 
         return message
 
-    def welcome_guests(self, channel, user_info, message_delay=5):
+    def welcome_guests(self, channel, user_info):
 
         for user in user_info:
             user_id = user.get("user_id")
             first_name = user.get("first_name")
             welcome_message = self.set_welcome_message(first_name, user_id)
-            welcome = False
 
             if self.in_automod_club or self.in_social_club or self.in_wwsl_club:
-                if user_id not in self.already_welcomed_set:
-                    logging.info(welcome_message)
-                    welcome = self.send_room_chat(channel, welcome_message, message_delay)
+                welcome = user_id not in self.already_welcomed_set
 
-            elif user_id not in self.already_welcomed_set and user_id not in self.screened_user_set:
-                logging.info(welcome_message)
-                welcome = self.send_room_chat(channel, welcome_message, message_delay)
+            else:
+                welcome = user_id not in self.already_welcomed_set and user_id not in self.screened_user_set
 
             if welcome:
-                if welcome.get("success") is False:
-                    error_message = welcome.get("error_message")
-                    logging.info(error_message)
-                    if "Less is more" in error_message:
-                        time.sleep(30)
-                        break
+                self.actions.put(
+                    ActionQueue.WELCOME, ("welcome", user_id), self.send_welcome, channel, user_id, welcome_message)
 
-                self.already_welcomed_set.add(user_id)
+    def send_welcome(self, channel, user_id, welcome_message):
+        if user_id in self.already_welcomed_set:
+            return
+
+        logging.info(welcome_message)
+        welcome = self.send_room_chat(channel, welcome_message)
 
-            time.sleep(message_delay)
+        if welcome.get("success") is False:
+            # The transport backs off the chat rate limit on "Less is more"
+            logging.info(welcome.get("error_message"))
+            return welcome
 
-    def invite_guests(self, channel, user_info, message_delay=2):
+        self.already_welcomed_set.add(user_id)
+        return welcome
+
+    def invite_guests(self, channel, user_info):
 
         if not self.in_automod_club and not self.in_social_club:
             filtered_users = self.filter_screened_users(user_info, for_speaker=True)
@@ -607,15 +657,35 @@ class ModClient(Clubhouse):
             if user_id in self.guest_list or self.in_automod_club or self.in_social_club:
 
                 if not is_speaker and not is_invited:
-                    self.mod.invite_speaker(channel, user_id)
-                    send = self.send_room_chat(channel, welcome_message, message_delay)
-                    if send.get("success"):
-                        self.already_welcomed_set.add(user_id)
+                    self.actions.put(
+                        ActionQueue.INVITE_SPEAKER, ("invite", user_id), self.mod.invite_speaker, channel, user_id)
+                    self.pending_invites.setdefault(user_id, 1)
+                    self.actions.put(
+                        ActionQueue.WELCOME, ("welcome", user_id), self.send_welcome, channel, user_id, welcome_message)
 
             self.screened_for_speaker_set.add(user_id)
 
         return True
 
+    def retry_invites(self, channel, roster):
+        """ (ModClient, str, RoomRoster) -> bool
+
+        Invite again the guests still in the audience without an invite, in
+        case their invite failed, giving up after invite_retries attempts.
+        """
+        for user_id, attempts in list(self.pending_invites.items()):
+            user = roster.get(user_id)
+            if not user or user.is_speaker or user.is_invited_as_speaker or attempts > self.invite_retries:
+                del self.pending_invites[user_id]
+                continue
+
+            if self.actions.put(
+                    ActionQueue.INVITE_SPEAKER, ("invite", user_id), self.mod.invite_speaker, channel, user_id):
+                logging.info(f"Retrying invite for {user_id}, attempt {attempts + 1}")
+                self.pending_invites[user_id] = attempts + 1
+
+        return True
+
     def mod_guests(self, channel, user_info):
 
         if not self.in_social_club:
@@ -633,57 +703,55 @@ class ModClient(Clubhouse):
 
                 if is_speaker and not is_mod:
                     logging.info(f"Attempted to make {first_name} a moderator")
-                    self.mod.make_moderator(channel, user_id)
+                    self.actions.put(
+                        ActionQueue.PROMOTE_MOD, ("mod", user_id), self.mod.make_moderator, channel, user_id)
 
             # The following should probably go elsewhere
             # if user_id not in self.already_welcomed_set:
-            #     run = self.send_room_chat(channel, welcome_message, message_delay)
+            #     run = self.send_room_chat(channel, welcome_message)
             #     if run:
             #         self.already_welcomed_set.add(user_id)
 
 
             self.screened_for_mod_set.add(user_id)
 
-    def set_announcement(self, channel, message, interval, delay=None):
+    def set_announcement(self, channel, message, interval):
 
-        @self.set_interval(interval * 60)
-        def announcement():
-            response = self.send_room_chat(channel, message, delay)
-            response = response.get("success")
-            return response
+        @self.set_interval(interval * 60, fixed_rate=True, jitter=0.05)
+        def announcement(self):
+            self.queue_announcement(channel, "announcement", message)
+            return True
+
+        return announcement(self)
 
-        return announcement()
+    def queue_announcement(self, channel, name, message):
+        """ Send message after every invite, promotion and welcome already queued. """
+        return self.actions.put(
+            ActionQueue.ANNOUNCEMENT, ("announcement", name), self.send_room_chat, channel, message)
 
-    def set_url_announcement(self, channel, interval=60, delay=2):
+    def set_url_announcement(self, channel, interval=60, announce_now=True):
 
         message_1 = "The share url for this room is:"
         message_2 = f"https://www.clubhouse.com/room/{channel}"
         message = [message_1, message_2]
 
-        self.send_room_chat(channel, message, delay)
+        if announce_now:
+            self.queue_announcement(channel, "url", message)
 
-        @self.set_interval(interval * 60)
-        def announcement():
-            response = self.send_room_chat(channel, message, delay)
-            response = response.get("success")
-            return response
+        @self.set_interval(interval * 60, fixed_rate=True, jitter=0.05)
+        def announcement(self):
+            self.queue_announcement(channel, "url", message)
+            return True
 
-        return announcement()
+        return announcement(self)
 
     @staticmethod
-    def get_time_created(join_info):
-        creator_id = join_info.get("creator_user_profile_id")
-        host_info = [_ for _ in join_info.get("users") if _.get("user_id") == creator_id]
-
-        if host_info:
-            host_info = host_info[0]
-        else:
-            host_info = join_info.get("users")[0]
+    def get_time_created(join_info, roster=None):
+        roster = roster if roster else RoomRoster.from_response(join_info)
+        host_info = roster.host
 
-        earliest_speaker = [_ for _ in join_info.get("users") if _.get("is_speaker") and not _.get("is_moderator")]
-        if earliest_speaker:
-            earliest_speaker = earliest_speaker[0]
-        else:
+        earliest_speaker = roster.first_speaker
+        if not earliest_speaker:
             earliest_speaker = host_info
 
         host_time = datetime.strptime(host_info.get("time_joined_as_speaker"), "%Y-%m-%dT%H:%M:%S.%f%z")
@@ -705,18 +773,17 @@ class ModClient(Clubhouse):
 
         return message
 
-    def set_runtime_announcement(self, channel, interval=30, delay=2):
-        message = self.set_runtime_message()
-        self.send_room_chat(channel, message, delay)
+    def set_runtime_announcement(self, channel, interval=30, announce_now=True):
+        if announce_now:
+            self.queue_announcement(channel, "runtime", self.set_runtime_message())
 
-        @self.set_interval(interval * 60)
-        def announcement():
+        @self.set_interval(interval * 60, fixed_rate=True, jitter=0.05)
+        def announcement(self):
             message_current = self.set_runtime_message()
-            response = self.send_room_chat(channel, message_current, delay)
-            response = response.get("success")
-            return response
+            self.queue_announcement(channel, "runtime", message_current)
+            return True
 
-        return announcement()
+        return announcement(self)
 
     @staticmethod
     def get_channel_type(join_info):
@@ -753,7 +820,21 @@ class ModClient(Clubhouse):
         logging.info(token)
         return token
 
-    def terminate_channel(self, channel):
+    def terminate_channel(self, channel, close_snapshot=True):
+        """ (ModClient, str, bool) -> NoneType
+
+        Leave channel and reset the session. Without close_snapshot the room
+        stays in the snapshot log, e.g. when another account took it over.
+        """
+        # Detach the room state first, so closing it does not call back here
+        room_state = self.room_state
+        self.room_state = None
+        if room_state:
+            room_state.set_state(RoomState.CLOSED)
+
+        if self.room_watch:
+            self.room_watch.set()
+
         self.channel.leave_channel(channel)
 
         if self.keep_alive_thread:
@@ -762,6 +843,26 @@ class ModClient(Clubhouse):
         if self.announcement_thread:
             self.announcement_thread.set()
 
+        if self.url_announcement_thread:
+            self.url_announcement_thread.set()
+
+        if self.runtime_announcement_thread:
+            self.runtime_announcement_thread.set()
+
+        if self.action_thread:
+            self.action_thread.set()
+        self.actions.clear()
+
+        if self.snapshot_thread:
+            self.snapshot_thread.set()
+
+        if self.snapshots and close_snapshot:
+            self.snapshots.close(channel)
+        self.snapshot_digest = None
+
+        # Anything else started for the room, loops of subclasses included
+        self.lifecycle.close(self.session)
+
         self.waiting_speaker = False
         self.granted_speaker = False
         self.active_speaker = False
@@ -782,12 +883,15 @@ class ModClient(Clubhouse):
         self.in_automod_club = False
         self.in_social_club = False
 
-        self.screened_user_set = set()
-        self.unscreened_user_set = set()
-        self.screened_for_speaker_set = set()
-        self.screened_for_mod_set = set()
-        self.already_welcomed_set = set()
+        self.screened_user_set = guest_set()
+        self.unscreened_user_set = guest_set()
+        self.screened_for_speaker_set = guest_set()
+        self.screened_for_mod_set = guest_set()
+        self.already_welcomed_set = guest_set()
         self.filtered_users_list = []
+        self.roster = None
+        self.moderated_roster = None
+        self.pending_invites = {}
 
     automod_clubs = set(Config.config_to_list(Config.load_config(), "AutoModClubs", True))
     social_clubs = set(Config.config_to_list(Config.load_config(), "SocialClubs", True))
@@ -798,49 +902,76 @@ class ModClient(Clubhouse):
         (Config.config_to_list(Config.load_config(), "GuestList", True)
          + Config.config_to_list(Config.load_config(), "ASocialRoomGuestList", True)))
 
-    url = None
-    host_name = None
-    host_id = None
-    creator_id = None
-    channel_type = None
-    club_id = None
-    chat_enabled = None
-    auto_speaker_approval = None
-    time_created = None
-    token = None
-
-    channel_active = False
-    waiting_speaker = False
-    granted_speaker = False
-    active_speaker = False
-    waiting_mod = False
-    granted_mod = False
-    active_mod = False
-
-    already_in_room_set = set()
-    screened_user_set = set()
-    unscreened_user_set = set()
-    screened_for_speaker_set = set()
-    screened_for_mod_set = set()
-    already_welcomed_set = set()
-    filtered_users_list = []
-
-    url_announcement = False
-    in_automod_club = False
-    in_social_club = False
-    in_wwsl_club = False
-
-    waiting_speaker_thread = None
-    waiting_mod_thread = None
-    waiting_reconnect_thread = None
-
-    announcement_thread = None
-    url_announcement_thread = None
-    runtime_announcement_thread = None
+    # Room state, stored on self.session
+    url = SessionAttribute()
+    host_name = SessionAttribute()
+    host_id = SessionAttribute()
+    creator_id = SessionAttribute()
+    channel_type = SessionAttribute()
+    club_id = SessionAttribute()
+    chat_enabled = SessionAttribute()
+    auto_speaker_approval = SessionAttribute()
+    time_created = SessionAttribute()
+    token = SessionAttribute()
+    announcement = SessionAttribute()
+    announcement_interval_min = SessionAttribute()
+
+    # Poll busy rooms faster and idle rooms slower, see adaptive.AdaptiveInterval
+    adaptive_polling = False
+
+    # Set to a SnapshotLog to snapshot rooms and resume them after a restart
+    snapshots = None
+
+    # Most actions run_actions runs at once, see actions.ActionQueue.drain
+    actions_per_run = 10
+
+    # Times a guest is invited again while still in the audience, see retry_invites
+    invite_retries = 3
+
+    # Latency budgets in seconds, see transport.Deadline
+    channel_init_deadline = 30
+    refresh_deadline = 10
+
+    channel_active = SessionAttribute()
+    waiting_speaker = SessionAttribute()
+    granted_speaker = SessionAttribute()
+    active_speaker = SessionAttribute()
+    waiting_mod = SessionAttribute()
+    granted_mod = SessionAttribute()
+    active_mod = SessionAttribute()
+
+    already_in_room_set = SessionAttribute()
+    screened_user_set = SessionAttribute()
+    unscreened_user_set = SessionAttribute()
+    screened_for_speaker_set = SessionAttribute()
+    screened_for_mod_set = SessionAttribute()
+    already_welcomed_set = SessionAttribute()
+    filtered_users_list = SessionAttribute()
+    roster = SessionAttribute()
+    moderated_roster = SessionAttribute()
+    pending_invites = SessionAttribute()
+
+    url_announcement = SessionAttribute()
+    in_automod_club = SessionAttribute()
+    in_social_club = SessionAttribute()
+    in_wwsl_club = SessionAttribute()
+
+    room_state = SessionAttribute()
+    room_watch = SessionAttribute()
+    activity = SessionAttribute()
+    last_user_ids = SessionAttribute()
+
+    announcement_thread = SessionAttribute()
+    url_announcement_thread = SessionAttribute()
+    runtime_announcement_thread = SessionAttribute()
     # music_thread = None
-    welcome_thread = None
-    keep_alive_thread = None
-    chat_client_thread = None
+    welcome_thread = SessionAttribute()
+    keep_alive_thread = SessionAttribute()
+    chat_client_thread = SessionAttribute()
+    actions = SessionAttribute()
+    action_thread = SessionAttribute()
+    snapshot_thread = SessionAttribute()
+    snapshot_digest = SessionAttribute()
 
     # attempted_ping_response = set()
 
@@ -0,0 +1,204 @@
+"""
+ratelimit.py
+"""
+
+import logging
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket with reservation-based waiting.
+
+    Callers reserve the next token and are told how long to wait for it, so
+    concurrent loops queue up in order instead of all waking at once. When the
+    server throttles us the refill rate is halved and then recovers slowly on
+    every successful call.
+    """
+
+    def __init__(self, rate, capacity, min_rate=None, recovery=1.1):
+        """ (TokenBucket, float, int, float, float) -> NoneType
+
+        rate is in tokens per second, capacity is the allowed burst.
+        """
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate if min_rate else rate / 8
+        self.recovery = recovery
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def __str__(self):
+        return f"TokenBucket(rate={self.rate:.3f}/s, capacity={self.capacity}, tokens={self.tokens:.2f})"
+
+    def refill(self, now):
+        # updated is pushed into the future while the server asks us to back off
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def reserve(self):
+        """ (TokenBucket) -> float
+
+        Take the next token and return how many seconds to wait before using it.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.refill(now)
+            self.tokens -= 1
+            deficit = max(0, -self.tokens)
+            return max(0, self.updated - now) + deficit / self.rate
+
+    def refund(self):
+        """ (TokenBucket) -> NoneType
+
+        Give back a reserved token that was not used.
+        """
+        with self.lock:
+            self.tokens = min(self.capacity, self.tokens + 1)
+
+    def throttled(self, retry_after=None):
+        """ (TokenBucket, float) -> NoneType
+
+        Back off after a throttle response from the server.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.refill(now)
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0)
+            if retry_after:
+                self.updated = max(self.updated, now + retry_after)
+
+    def succeeded(self):
+        with self.lock:
+            if self.rate < self.base_rate:
+                self.rate = min(self.base_rate, self.rate * self.recovery)
+
+    def headroom(self, grace=0):
+        """ (TokenBucket, float) -> float
+
+        Share of the base rate currently allowed: 1 when not backed off, 0
+        while the server has asked us to wait more than grace seconds.
+        """
+        with self.lock:
+            if self.updated - time.monotonic() > grace:
+                return 0
+            return self.rate / self.base_rate
+
+
+class RateLimiter:
+    """
+    Per-endpoint token buckets for the Clubhouse API.
+
+    Endpoints are keyed by the last path segment of the url, e.g.
+    send_channel_message or get_channel. Endpoints without an entry in limits
+    share the default limit, each with their own bucket.
+    """
+
+    # endpoint: (tokens per second, burst)
+    LIMITS = {
+        "send_channel_message": (1 / 4, 2),
+        "invite_speaker": (1 / 2, 3),
+        "make_moderator": (1 / 2, 3),
+        "uninvite_speaker": (1 / 2, 3),
+        "get_channel": (1, 4),
+        "join_channel": (1 / 5, 2),
+        "get_channel_messages": (1 / 2, 2),
+        "get_notifications": (1 / 5, 2),
+        "get_feed": (1 / 10, 2),
+    }
+    DEFAULT_LIMIT = (2, 5)
+
+    # Message the server sends back when chat is sent too quickly
+    THROTTLE_MESSAGE = b"Less is more"
+    THROTTLE_MESSAGE_BACKOFF = 30
+
+    def __init__(self, limits=None, default_limit=None):
+        self.limits = dict(self.LIMITS)
+        if isinstance(limits, dict):
+            self.limits.update(limits)
+        self.default_limit = default_limit if default_limit else self.DEFAULT_LIMIT
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, endpoint):
+        with self.lock:
+            bucket = self.buckets.get(endpoint)
+            if bucket is None:
+                rate, capacity = self.limits.get(endpoint, self.default_limit)
+                bucket = self.buckets[endpoint] = TokenBucket(rate, capacity)
+            return bucket
+
+    def reserve(self, endpoint):
+        """ (RateLimiter, str) -> float
+
+        Reserve a slot for endpoint and return the seconds to wait for it.
+        """
+        return self.bucket(endpoint).reserve()
+
+    def acquire(self, endpoint, timeout=None):
+        """ (RateLimiter, str, float) -> bool
+
+        Block until endpoint can be called. If that would take longer than
+        timeout, give the slot back and return False without waiting.
+        """
+        bucket = self.bucket(endpoint)
+        wait = bucket.reserve()
+
+        if timeout is not None and wait > timeout:
+            bucket.refund()
+            return False
+
+        if wait > 0:
+            logging.debug(f"Rate limited {endpoint}: waiting {wait:.2f}s")
+            time.sleep(wait)
+
+        return True
+
+    def update(self, endpoint, response):
+        """ (RateLimiter, str, requests.Response) -> bool
+
+        Read a response for throttle signals. Returns True if throttled.
+        """
+        bucket = self.bucket(endpoint)
+        status_code = response.status_code
+        throttle_message = len(response.content) < 1024 and self.THROTTLE_MESSAGE in response.content
+
+        if status_code == 429 or throttle_message:
+            retry_after = self.get_retry_after(response)
+            if not retry_after and throttle_message:
+                retry_after = self.THROTTLE_MESSAGE_BACKOFF
+            bucket.throttled(retry_after)
+            logging.info(f"Throttled {endpoint}: {bucket}")
+            return True
+
+        if status_code < 400:
+            bucket.succeeded()
+
+        return False
+
+    def headroom(self, endpoints=None, grace=0):
+        """ (RateLimiter, set, float) -> float
+
+        Headroom of the most backed off endpoint, 1 if none is.
+        With endpoints, only those endpoints count. Backoffs of up to grace
+        seconds, like the one after a chat throttle message, are ignored.
+        """
+        with self.lock:
+            buckets = [
+                bucket for endpoint, bucket in self.buckets.items()
+                if endpoints is None or endpoint in endpoints
+            ]
+        return min([bucket.headroom(grace) for bucket in buckets], default=1)
+
+    @staticmethod
+    def get_retry_after(response):
+        retry_after = response.headers.get("Retry-After")
+        try:
+            return float(retry_after) if retry_after else None
+        except ValueError:
+            return None
@@ -0,0 +1,135 @@
+"""
+retry.py
+"""
+
+import random
+import time
+
+import requests
+
+from .transport import Deadline
+from .transport import DeadlineExceeded
+from .transport import get_endpoint
+
+
+class RetryPolicy:
+    """
+    Retry policy applied by validate_response.
+
+    Only idempotent requests are retried after the request may have reached the
+    server: every GET, plus the POST endpoints that only read. A connect timeout
+    means nothing was sent, so it is retried for every endpoint. Waits use
+    exponential backoff with full jitter and never run past the per-call deadline,
+    nor past an enclosing Deadline.
+    """
+
+    IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+    # POST endpoints that do not change anything on the server
+    IDEMPOTENT_ENDPOINTS = {
+        "get_channel",
+        "get_profile",
+        "me",
+        "search",
+        "get_clubs",
+        "get_club",
+        "get_club_nominations",
+        "get_online_friends",
+        "get_event",
+        "get_topic",
+        "search_chats",
+        "get_create_channel_targets",
+        "active_ping",
+    }
+
+    RETRY_STATUS_CODES = {500, 502, 503, 504}
+
+    def __init__(self, retries=3, backoff=0.25, max_backoff=4, deadline=15):
+        """ (RetryPolicy, int, float, float, float) -> NoneType
+
+        retries is the number of extra attempts, deadline the total seconds a
+        call may spend including waits.
+        """
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.deadline = deadline
+
+    def __str__(self):
+        return "RetryPolicy(retries={}, backoff={}, max_backoff={}, deadline={})".format(
+            self.retries,
+            self.backoff,
+            self.max_backoff,
+            self.deadline
+        )
+
+    def is_idempotent(self, method, url):
+        if not method or not url:
+            return False
+        return method.upper() in self.IDEMPOTENT_METHODS or get_endpoint(url) in self.IDEMPOTENT_ENDPOINTS
+
+    def should_retry_error(self, error):
+        """ (RetryPolicy, requests.RequestException) -> bool """
+        if isinstance(error, DeadlineExceeded):
+            return False
+
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            return True
+
+        if not isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+            return False
+
+        request = error.request
+        if request is None:
+            return False
+
+        return self.is_idempotent(request.method, request.url)
+
+    def should_retry_response(self, response):
+        """ (RetryPolicy, requests.Response) -> bool """
+        if response.status_code not in self.RETRY_STATUS_CODES:
+            return False
+
+        request = response.request
+        if request is None:
+            return False
+
+        return self.is_idempotent(request.method, request.url)
+
+    def backoff_time(self, attempt):
+        """ (RetryPolicy, int) -> float
+
+        Full jitter: a random wait between 0 and the exponential backoff cap.
+        """
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def next_wait(self, attempt, started):
+        """ (RetryPolicy, int, float) -> float or NoneType
+
+        Seconds to wait before retry number attempt + 1, or None when retries
+        are used up or the wait would run past the deadline.
+        """
+        if attempt >= self.retries:
+            return None
+
+        backoff = self.backoff_time(attempt)
+        if time.monotonic() + backoff - started > self.deadline:
+            return None
+
+        time_left = Deadline.time_left()
+        if time_left is not None and backoff >= time_left:
+            return None
+
+        return backoff
+
+    def wait(self, attempt, started):
+        """ (RetryPolicy, int, float) -> bool
+
+        Sleep before the next retry. Returns False, without sleeping, if there is none.
+        """
+        backoff = self.next_wait(attempt, started)
+        if backoff is None:
+            return False
+
+        time.sleep(backoff)
+        return True
@@ -0,0 +1,104 @@
+"""
+roomstate.py
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+
+class RoomState:
+    """
+    State machine of the client in one room.
+
+    joined -> waiting_speaker -> waiting_mod -> active, with reconnecting
+    whenever the room stops answering and closed once the client gives up or
+    leaves. Any state can follow any other except closed, which is final.
+
+    Nothing here waits or polls. The state is set from whatever refreshed the
+    channel last, and callers react through callbacks, on(state, callback),
+    or futures, when(*states), instead of blocking a thread on the outcome.
+    """
+
+    JOINED = "joined"
+    WAITING_SPEAKER = "waiting_speaker"
+    WAITING_MOD = "waiting_mod"
+    ACTIVE = "active"
+    RECONNECTING = "reconnecting"
+    CLOSED = "closed"
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.state = self.JOINED
+        self.entered = time.monotonic()
+        self.callbacks = {}
+        self.futures = []
+        self.lock = threading.Lock()
+
+    def __str__(self):
+        return f"RoomState(channel={self.channel}, state={self.state})"
+
+    def set_state(self, state):
+        """ (RoomState, str) -> bool
+
+        Move to state, then run its callbacks and resolve the futures waiting for it.
+        Returns whether the state changed.
+        """
+        with self.lock:
+            previous = self.state
+            if previous == state or previous == self.CLOSED:
+                return False
+
+            self.state = state
+            self.entered = time.monotonic()
+            callbacks = list(self.callbacks.get(state, ()))
+
+            if state == self.CLOSED:
+                resolved, self.futures = self.futures, []
+            else:
+                resolved = [entry for entry in self.futures if state in entry[0]]
+                self.futures = [entry for entry in self.futures if state not in entry[0]]
+
+        logging.info(f"Room {self.channel}: {previous} -> {state}")
+
+        for states, future in resolved:
+            if state in states:
+                future.set_result(state)
+            else:
+                future.cancel()
+
+        for callback in callbacks:
+            try:
+                callback(self, previous, state)
+            except Exception as error:
+                logging.error(f"Room state callback {callback} {error}")
+
+        return True
+
+    def on(self, state, callback):
+        """ Call callback(room_state, previous, state) every time state is entered. """
+        with self.lock:
+            self.callbacks.setdefault(state, []).append(callback)
+
+    def when(self, *states):
+        """ (RoomState, str) -> concurrent.futures.Future
+
+        Future resolved with the first of states entered, cancelled if the room
+        closes first. Already resolved if the room is in one of states.
+        """
+        future = Future()
+        with self.lock:
+            if self.state in states:
+                future.set_result(self.state)
+            elif self.state == self.CLOSED:
+                future.cancel()
+            else:
+                self.futures.append((states, future))
+        return future
+
+    def time_in_state(self):
+        return time.monotonic() - self.entered
+
+    def is_closed(self):
+        return self.state == self.CLOSED
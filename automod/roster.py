@@ -0,0 +1,208 @@
+"""
+roster.py
+"""
+
+
+class UserRecord:
+    """
+    The fields of a room user the moderator reads, and nothing else.
+
+    Users of join_channel and get_channel responses are converted once, as
+    the roster is built. A record takes about a quarter of the memory of the
+    user dict it comes from, and get() keeps it readable like one.
+    """
+
+    __slots__ = (
+        "user_id",
+        "first_name",
+        "is_speaker",
+        "is_moderator",
+        "is_invited_as_speaker",
+        "time_joined_as_speaker",
+    )
+
+    def __init__(self, user_id, first_name=None, is_speaker=False, is_moderator=False, is_invited_as_speaker=False,
+                 time_joined_as_speaker=None):
+        self.user_id = user_id
+        self.first_name = first_name
+        self.is_speaker = bool(is_speaker)
+        self.is_moderator = bool(is_moderator)
+        self.is_invited_as_speaker = bool(is_invited_as_speaker)
+        self.time_joined_as_speaker = time_joined_as_speaker
+
+    @classmethod
+    def from_dict(cls, user):
+        """ (type, dict) -> UserRecord
+
+        Record of a user of an API response, user itself if already converted.
+        """
+        if isinstance(user, cls):
+            return user
+
+        return cls(
+            user.get("user_id"),
+            user.get("first_name"),
+            user.get("is_speaker"),
+            user.get("is_moderator"),
+            user.get("is_invited_as_speaker"),
+            user.get("time_joined_as_speaker"),
+        )
+
+    def __repr__(self):
+        return f"UserRecord(user_id={self.user_id}, first_name={self.first_name})"
+
+    def get(self, field, default=None):
+        return getattr(self, field, default)
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+
+def encode_record(value):
+    """ json.dumps default for responses holding UserRecords. """
+    if isinstance(value, UserRecord):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class RoomRoster:
+    """
+    Users of a room, indexed once per join_channel/get_channel response.
+
+    Users are kept as UserRecords and looked up by id in a dict, and the ids
+    of speakers, moderators and users invited to speak are kept in sets, so
+    the moderation helpers never scan the user list to find one user.
+    """
+
+    def __init__(self, users=None, creator_id=None):
+        self.users = [UserRecord.from_dict(_) for _ in users] if users else []
+        self.creator_id = creator_id
+        self.by_id = {}
+        self.speakers = set()
+        self.moderators = set()
+        self.invited = set()
+        self.first_speaker = None
+
+        for user in self.users:
+            user_id = user.user_id
+            self.by_id[user_id] = user
+
+            if user.is_moderator:
+                self.moderators.add(user_id)
+
+            if user.is_speaker:
+                self.speakers.add(user_id)
+                # Earliest speaker who is not a moderator, see ModClient.get_time_created
+                if self.first_speaker is None and not user.is_moderator:
+                    self.first_speaker = user
+
+            elif user.is_invited_as_speaker:
+                self.invited.add(user_id)
+
+    @classmethod
+    def from_response(cls, response):
+        """ (type, dict) -> RoomRoster
+
+        Roster of a join_channel or get_channel response.
+        """
+        if not response:
+            return cls()
+        return cls(response.get("users"), response.get("creator_user_profile_id"))
+
+    def __str__(self):
+        return "RoomRoster(users={}, speakers={}, moderators={}, invited={})".format(
+            len(self.users),
+            len(self.speakers),
+            len(self.moderators),
+            len(self.invited)
+        )
+
+    def __len__(self):
+        return len(self.users)
+
+    def __iter__(self):
+        return iter(self.users)
+
+    def __contains__(self, user_id):
+        return user_id in self.by_id
+
+    def get(self, user_id):
+        """ User with user_id, None if they are not in the room. """
+        return self.by_id.get(user_id)
+
+    def ids(self):
+        return self.by_id.keys()
+
+    @property
+    def host(self):
+        """ The creator of the room, or its first user when the creator left. """
+        host = self.by_id.get(self.creator_id)
+        if host is None and self.users:
+            host = self.users[0]
+        return host
+
+    def unscreened(self, screened):
+        """ (RoomRoster, set) -> list
+
+        Users whose id is not in screened, in room order.
+        """
+        new = self.by_id.keys() - screened
+        if not new:
+            return []
+        return [_ for _ in self.users if _.user_id in new]
+
+
+class RosterDiff:
+    """
+    What changed in a room between two rosters.
+
+    joined, speakers, moderators and invited hold the users who joined the
+    room, started speaking, were made moderator or were invited to speak
+    since previous; left holds the users who are gone. Against no previous
+    roster, every user of current counts as new.
+
+    Only the users who changed are looked up, so diffing two rosters of a
+    big room that barely changed costs little more than comparing id sets.
+    """
+
+    def __init__(self, previous, current):
+        previous = previous if previous is not None else RoomRoster()
+        self.current = current
+
+        self.joined = [current.by_id[_] for _ in current.ids() - previous.ids()]
+        self.left = [previous.by_id[_] for _ in previous.ids() - current.ids()]
+        self.speakers = [current.by_id[_] for _ in current.speakers - previous.speakers]
+        self.moderators = [current.by_id[_] for _ in current.moderators - previous.moderators]
+        self.invited = [current.by_id[_] for _ in current.invited - previous.invited]
+
+    def __str__(self):
+        return "RosterDiff(joined={}, left={}, speakers={}, moderators={}, invited={})".format(
+            len(self.joined),
+            len(self.left),
+            len(self.speakers),
+            len(self.moderators),
+            len(self.invited)
+        )
+
+    def __bool__(self):
+        return bool(self.joined or self.left or self.speakers or self.moderators or self.invited)
+
+    def churn(self):
+        """ Number of users who joined or left. """
+        return len(self.joined) + len(self.left)
+
+    def events(self):
+        """ (RosterDiff) -> generator
+
+        (event, user) pairs: joined, left, promoted_to_speaker, promoted_to_mod or invited.
+        """
+        for user in self.joined:
+            yield "joined", user
+        for user in self.left:
+            yield "left", user
+        for user in self.speakers:
+            yield "promoted_to_speaker", user
+        for user in self.moderators:
+            yield "promoted_to_mod", user
+        for user in self.invited:
+            yield "invited", user
@@ -0,0 +1,300 @@
+"""
+scheduler.py
+"""
+
+import heapq
+import itertools
+import logging
+import math
+import queue
+import random
+import threading
+import time
+
+
+class Cadence:
+    """
+    When the runs of a periodic job are due.
+
+    Fixed delay waits interval seconds after a run returns, so the period
+    grows by however long the run took. Fixed rate keeps runs on the grid
+    the first run set, interval seconds apart whatever the run time, and
+    skips the runs it fell too far behind to make.
+
+    jitter moves every run by up to that fraction of the interval, either
+    way, so rooms started together do not all hit the API at once. With
+    fixed rate the jitter never accumulates, it is taken off the grid.
+    """
+
+    def __init__(self, fixed_rate=False, jitter=0):
+        self.fixed_rate = fixed_rate
+        self.jitter = jitter
+        self.anchor = None
+        self.missed = 0
+
+    def __str__(self):
+        return f"Cadence(mode={self.mode()}, jitter={self.jitter})"
+
+    def mode(self):
+        return "fixed_rate" if self.fixed_rate else "fixed_delay"
+
+    def first_due(self, now, delay, interval):
+        self.anchor = now + delay
+        return self.jittered(now, interval)
+
+    def next_due(self, now, interval):
+        """ (Cadence, float, float) -> float
+
+        Monotonic time the next run is due, now being when the last run returned.
+        """
+        if not self.fixed_rate:
+            self.anchor = now + interval
+            return self.jittered(now, interval)
+
+        self.anchor += interval
+        if self.anchor < now:
+            missed = math.ceil((now - self.anchor) / interval)
+            self.anchor += missed * interval
+            self.missed += missed
+        return self.jittered(now, interval)
+
+    def jittered(self, now, interval):
+        if not self.jitter:
+            return self.anchor
+        return max(now, self.anchor + random.uniform(-self.jitter, self.jitter) * interval)
+
+
+class ScheduledJob:
+    """
+    Handle of a function scheduled to run every interval seconds.
+
+    It stands in for the threading.Event set_interval used to return:
+    set() cancels the job, is_set() tells whether it was cancelled or stopped.
+    """
+
+    def __init__(self, scheduler, func, interval, args=(), kwargs=None, name=None, adaptive=None, cadence=None):
+        self.scheduler = scheduler
+        self.func = func
+        self.interval = interval
+        self.adaptive = adaptive
+        self.cadence = cadence if cadence else Cadence()
+        self.args = args
+        self.kwargs = kwargs if kwargs else {}
+        self.name = name if name else getattr(func, "__qualname__", repr(func))
+        self.stopped = threading.Event()
+        self.due = None
+        self.running = False
+        self.runs = 0
+        self.lag = 0
+
+    def __str__(self):
+        return f"ScheduledJob(name={self.name}, interval={self.interval:.1f}, runs={self.runs})"
+
+    def next_interval(self):
+        """ Seconds until the next run, recomputed after every run when adaptive. """
+        if self.adaptive:
+            self.interval = self.adaptive.next_interval()
+        return self.interval
+
+    def effective_rate(self):
+        """ Runs per minute at the current interval. """
+        return 60 / self.interval if self.interval else 0
+
+    def cancel(self):
+        """ (ScheduledJob) -> NoneType
+
+        Stop the job. A run already in progress finishes, no new run starts.
+        """
+        if not self.stopped.is_set():
+            self.stopped.set()
+            self.scheduler.discard(self)
+
+    set = cancel
+
+    def is_set(self):
+        return self.stopped.is_set()
+
+    isSet = is_set
+
+    def wait(self, timeout=None):
+        """ Block until the job is cancelled or stops itself. """
+        return self.stopped.wait(timeout)
+
+
+class Scheduler:
+    """
+    Runs every periodic job on one timer thread and a shared worker pool.
+
+    Jobs wait in a heap ordered by their next due time. The timer thread
+    sleeps until the earliest one is due and hands it to a worker. A job is
+    rescheduled interval seconds after its run returns, so a slow run never
+    overlaps the next one, and it stops once a run returns a falsy value.
+
+    Workers are started on demand, up to workers threads, however many jobs
+    and rooms are scheduled.
+    """
+
+    def __init__(self, workers=16):
+        self.workers = workers
+        self.heap = []
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.tasks = queue.Queue()
+        self.threads = []
+        self.idle = 0
+        self.timer = None
+        self.running = False
+
+    def __str__(self):
+        return f"Scheduler(workers={len(self.threads)}/{self.workers}, jobs={len(self.heap)})"
+
+    def schedule_every(self, interval, func, args=(), kwargs=None, delay=None, name=None, adaptive=None,
+                       fixed_rate=False, jitter=0):
+        """ (Scheduler, float, function, tuple, dict, float, str, AdaptiveInterval, bool, float) -> ScheduledJob
+
+        Run func(*args, **kwargs) every interval seconds, the first time after
+        delay seconds (interval by default). With adaptive, the interval is
+        recomputed from it after every run. fixed_rate and jitter set the
+        job's Cadence.
+        """
+        job = ScheduledJob(self, func, interval, args, kwargs, name, adaptive, Cadence(fixed_rate, jitter))
+        self.push(job, job.cadence.first_due(time.monotonic(), interval if delay is None else delay, interval))
+        self.start()
+        return job
+
+    def cancel(self, job):
+        job.cancel()
+
+    def push(self, job, due):
+        with self.condition:
+            job.due = due
+            heapq.heappush(self.heap, (due, next(self.counter), job))
+            self.condition.notify()
+
+    def discard(self, job):
+        """ Remove a cancelled job from the heap. """
+        with self.condition:
+            heap = [entry for entry in self.heap if entry[2] is not job]
+            if len(heap) != len(self.heap):
+                heapq.heapify(heap)
+                self.heap = heap
+                self.condition.notify()
+
+    def start(self):
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+            self.timer = threading.Thread(target=self.run_timer, name="automod-scheduler")
+            self.timer.daemon = True
+            self.timer.start()
+
+    def run_timer(self):
+        with self.condition:
+            while self.running:
+                if not self.heap:
+                    self.condition.wait()
+                    continue
+
+                due, _, job = self.heap[0]
+                delay = due - time.monotonic()
+                if delay > 0:
+                    self.condition.wait(delay)
+                    continue
+
+                heapq.heappop(self.heap)
+                if not job.is_set():
+                    self.submit(job)
+
+    def submit(self, job):
+        """ Hand a due job to a worker. Must be called with the condition held. """
+        self.tasks.put(job)
+        if self.idle == 0 and len(self.threads) < self.workers:
+            thread = threading.Thread(target=self.run_worker, name=f"automod-worker-{len(self.threads)}")
+            thread.daemon = True
+            self.threads.append(thread)
+            thread.start()
+        else:
+            self.idle -= 1
+
+    def run_worker(self):
+        while True:
+            job = self.tasks.get()
+            if job is None:
+                break
+
+            self.execute(job)
+
+            with self.condition:
+                self.idle += 1
+
+    def execute(self, job):
+        if job.is_set():
+            return
+
+        job.lag = max(0, time.monotonic() - job.due)
+        job.running = True
+        try:
+            run = job.func(*job.args, **job.kwargs)
+        except Exception as error:
+            logging.exception(f"{job.name} {error}")
+            run = False
+        finally:
+            job.running = False
+
+        job.runs += 1
+        if not run:
+            if not job.is_set():
+                job.stopped.set()
+                logging.info(f"Stopped: {job.func}")
+            return
+
+        if not job.is_set():
+            self.push(job, job.cadence.next_due(time.monotonic(), job.next_interval()))
+
+    def jobs(self):
+        """ (Scheduler) -> list
+
+        Jobs waiting for their next run, earliest first.
+        """
+        with self.condition:
+            return [job for _, _, job in sorted(self.heap)]
+
+    def rates(self):
+        """ (Scheduler) -> list
+
+        Effective interval and rate of every scheduled job.
+        """
+        return [
+            {
+                "name": job.name,
+                "interval": round(job.interval, 2),
+                "rate_per_min": round(job.effective_rate(), 2),
+                "adaptive": job.adaptive is not None,
+                "mode": job.cadence.mode(),
+                "jitter": job.cadence.jitter,
+                "missed": job.cadence.missed,
+                "runs": job.runs,
+                "lag": round(job.lag, 3),
+            }
+            for job in self.jobs()
+        ]
+
+    def shutdown(self):
+        """ (Scheduler) -> NoneType
+
+        Cancel every job and stop the timer and worker threads.
+        """
+        for job in self.jobs():
+            job.stopped.set()
+
+        with self.condition:
+            self.heap = []
+            self.running = False
+            self.condition.notify()
+            for _ in self.threads:
+                self.tasks.put(None)
+            self.threads = []
+            self.idle = 0
+
+        logging.info(f"Closed: {self}")
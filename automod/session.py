@@ -0,0 +1,161 @@
+"""
+session.py
+"""
+
+from datetime import datetime
+
+from .adaptive import ActivityMeter
+from .actions import ActionQueue
+from .dedupe import BoundedSet
+
+
+def guest_set(iterable=()):
+    """ (iterable) -> BoundedSet
+
+    Set of user ids for one room, capped at ChannelSession.max_guests.
+    """
+    return BoundedSet(iterable, maxlen=ChannelSession.max_guests)
+
+
+class ChannelSession:
+    """
+    Moderation state of one room.
+
+    Every client moderating a room holds its own session, so rooms moderated
+    from the same process never see each other's guests, statuses or loops.
+    """
+
+    # Users remembered per set in a room, the longest absent are forgotten first
+    max_guests = 50000
+
+    # State kept in snapshots, see snapshot.SnapshotLog. The room token is not:
+    # snapshots are plain files, and a resumed room gets a fresh one on rejoining
+    SNAPSHOT_FIELDS = (
+        "url", "host_name", "host_id", "creator_id", "channel_type", "club_id", "chat_enabled",
+        "auto_speaker_approval", "announcement", "announcement_interval_min",
+        "waiting_speaker", "granted_speaker", "waiting_mod", "granted_mod",
+        "url_announcement", "in_automod_club", "in_social_club", "in_wwsl_club",
+    )
+    SNAPSHOT_SETS = (
+        "screened_user_set", "screened_for_speaker_set", "screened_for_mod_set", "already_welcomed_set",
+    )
+
+    def __init__(self, channel=None):
+        self.channel = channel
+
+        # Room info, set on join
+        self.url = None
+        self.host_name = None
+        self.host_id = None
+        self.creator_id = None
+        self.channel_type = None
+        self.club_id = None
+        self.chat_enabled = None
+        self.auto_speaker_approval = None
+        self.time_created = None
+        self.token = None
+        self.announcement = None
+        self.announcement_interval_min = 60
+
+        # Client status in the room
+        self.automod_active = None
+        self.chat_active = None
+        self.channel_active = False
+        self.waiting_speaker = False
+        self.granted_speaker = False
+        self.active_speaker = False
+        self.waiting_mod = False
+        self.granted_mod = False
+        self.active_mod = False
+        self.room_state = None
+
+        # Guests
+        self.already_in_room_set = set()
+        self.screened_user_set = guest_set()
+        self.unscreened_user_set = guest_set()
+        self.screened_for_speaker_set = guest_set()
+        self.screened_for_mod_set = guest_set()
+        self.already_welcomed_set = guest_set()
+        self.filtered_users_list = []
+        self.roster = None
+        self.moderated_roster = None
+
+        # Invites sent but not yet seen on the roster, by user id: attempts so far
+        self.pending_invites = {}
+
+        # Room activity, drives adaptive polling
+        self.activity = ActivityMeter()
+        self.last_user_ids = set()
+
+        # Invites, promotions and messages waiting to be sent
+        self.actions = ActionQueue()
+
+        self.url_announcement = False
+        self.in_automod_club = False
+        self.in_social_club = False
+        self.in_wwsl_club = False
+
+        # Loops started for the room
+        self.room_watch = None
+        self.announcement_thread = None
+        self.url_announcement_thread = None
+        self.runtime_announcement_thread = None
+        self.welcome_thread = None
+        self.keep_alive_thread = None
+        self.action_thread = None
+        self.active_channel_thread = None
+        self.chat_client_thread = None
+        self.welcome_client_thread = None
+        self.snapshot_thread = None
+        self.snapshot_digest = None
+
+    def __str__(self):
+        return "ChannelSession(channel={}, active={}, speaker={}, mod={}, guests={})".format(
+            self.channel,
+            self.channel_active,
+            self.active_speaker,
+            self.active_mod,
+            len(self.screened_user_set)
+        )
+
+    def snapshot(self):
+        """ (ChannelSession) -> dict
+
+        JSON-ready state needed to resume moderating the room after a restart.
+        """
+        state = {field: getattr(self, field) for field in self.SNAPSHOT_FIELDS}
+        state.update({field: list(getattr(self, field)) for field in self.SNAPSHOT_SETS})
+        state["time_created"] = self.time_created.isoformat() if self.time_created else None
+        return state
+
+    def restore(self, state):
+        """ Set the state of a snapshot back on the session. """
+        for field in self.SNAPSHOT_FIELDS:
+            if field in state:
+                setattr(self, field, state[field])
+
+        for field in self.SNAPSHOT_SETS:
+            setattr(self, field, guest_set(state.get(field, ())))
+
+        time_created = state.get("time_created")
+        self.time_created = datetime.fromisoformat(time_created) if time_created else None
+
+
+class SessionAttribute:
+    """
+    Client attribute stored on the client's ChannelSession.
+
+    Lets the moderation code keep reading and assigning self.waiting_mod,
+    self.already_welcomed_set, ... while the state itself lives per room.
+    """
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return getattr(instance.session, self.name)
+
+    def __set__(self, instance, value):
+        setattr(instance.session, self.name, value)
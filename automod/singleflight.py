@@ -0,0 +1,116 @@
+"""
+singleflight.py
+"""
+
+import threading
+import time
+from functools import wraps
+
+
+class Flight:
+    """ One in-flight call that other callers can wait on. """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical calls into one.
+
+    While a call for a key is in flight, other callers for the same key wait
+    for it and share its result. A successful result is also served to callers
+    arriving within ttl seconds after it completed.
+    """
+
+    def __init__(self, ttl=5):
+        self.ttl = ttl
+        self.flights = {}
+        self.results = {}
+        self.lock = threading.Lock()
+
+    def do(self, key, func, *args, **kwargs):
+        """ (SingleFlight, hashable, function) -> any
+
+        Call func(*args, **kwargs) unless an identical call is in flight or fresh.
+        """
+        with self.lock:
+            result = self.results.get(key)
+            if result and time.monotonic() - result[0] < self.ttl:
+                return result[1]
+
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = func(*args, **kwargs)
+        except Exception as error:
+            flight.error = error
+            raise
+        finally:
+            with self.lock:
+                del self.flights[key]
+                if flight.error is None and self.is_success(flight.result):
+                    self.results[key] = (time.monotonic(), flight.result)
+                self.prune()
+            flight.done.set()
+
+        return flight.result
+
+    def forget(self, key=None):
+        """ (SingleFlight, hashable) -> NoneType
+
+        Drop the stored result for key, or every stored result.
+        """
+        with self.lock:
+            if key is None:
+                self.results.clear()
+            else:
+                self.results.pop(key, None)
+
+    def prune(self):
+        """ Drop expired results. Must be called with the lock held. """
+        now = time.monotonic()
+        expired = [key for key, result in self.results.items() if now - result[0] >= self.ttl]
+        for key in expired:
+            del self.results[key]
+
+    @staticmethod
+    def is_success(result):
+        return isinstance(result, dict) and result.get("success") is not False
+
+
+def coalesce(ttl=5):
+    """
+    Decorator sharing one in-flight call, and its result for ttl seconds,
+    between callers of an endpoint with the same arguments and account.
+
+    Every caller gets its own shallow copy of a dict result, since callers pop
+    keys such as "users" off what they receive.
+    """
+
+    def decorator(func):
+        flights = SingleFlight(ttl)
+
+        @wraps(func)
+        def wrap(self, *args, **kwargs):
+            key = (self.HEADERS.get("CH-UserID"), args, tuple(sorted(kwargs.items())))
+            result = flights.do(key, func, self, *args, **kwargs)
+            if isinstance(result, dict):
+                result = dict(result)
+            return result
+
+        wrap.flights = flights
+        return wrap
+
+    return decorator
@@ -0,0 +1,124 @@
+"""
+snapshot.py
+
+Snapshots of room state, for warm restarts.
+
+The log is a JSON lines file, one record per line:
+
+    {"channel": ..., "time": ..., "state": {...}}    latest state of a room
+    {"channel": ..., "time": ..., "closed": true}    the room was left
+
+Records are only ever appended. Once the log holds compact_ratio times more
+records than open rooms, it is rewritten with the latest state of every open
+room and swapped in atomically, so a crash mid-compaction loses nothing.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+
+class SnapshotLog:
+    """
+    Append-only log of room snapshots.
+
+    >>> ModClient.snapshots = SnapshotLog("automod-rooms.jsonl")
+    """
+
+    def __init__(self, filename, compact_ratio=4, min_records=100):
+        self.filename = filename
+        self.compact_ratio = compact_ratio
+        self.min_records = min_records
+        self.live = {}
+        self.records = 0
+        self.lock = threading.Lock()
+        self.load()
+
+    def __str__(self):
+        return f"SnapshotLog(filename={self.filename}, rooms={len(self.live)}, records={self.records})"
+
+    def load(self):
+        """ (SnapshotLog) -> dict
+
+        Replay the log: latest state of every room not closed, by channel.
+        A record torn by a crash is skipped.
+        """
+        live = {}
+        records = 0
+        if os.path.exists(self.filename):
+            with open(self.filename) as log:
+                for line in log:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        logging.error(f"Skipped torn snapshot record in {self.filename}")
+                        continue
+
+                    records += 1
+                    if record.get("closed"):
+                        live.pop(record.get("channel"), None)
+                    else:
+                        live[record.get("channel")] = record.get("state")
+
+        with self.lock:
+            self.live = live
+            self.records = records
+        return dict(live)
+
+    def rooms(self):
+        """ (SnapshotLog) -> dict
+
+        Latest state of every open room, by channel.
+        """
+        with self.lock:
+            return dict(self.live)
+
+    def append(self, channel, state):
+        """ Record the latest state of channel. """
+        with self.lock:
+            self.live[channel] = state
+            self.write({"channel": channel, "time": time.time(), "state": state})
+        self.maybe_compact()
+
+    def close(self, channel):
+        """ Record that channel was left, it is not resumed on restart. """
+        with self.lock:
+            if channel not in self.live:
+                return
+            self.live.pop(channel)
+            self.write({"channel": channel, "time": time.time(), "closed": True})
+        self.maybe_compact()
+
+    def write(self, record):
+        """ Append record. Must be called with the lock held. """
+        with open(self.filename, "a") as log:
+            log.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self.records += 1
+
+    def maybe_compact(self):
+        with self.lock:
+            compact = self.records > max(self.min_records, self.compact_ratio * len(self.live))
+        if compact:
+            self.compact()
+
+    def compact(self):
+        """ (SnapshotLog) -> NoneType
+
+        Rewrite the log with one record per open room.
+        """
+        with self.lock:
+            temp = f"{self.filename}.tmp"
+            now = time.time()
+            with open(temp, "w") as log:
+                for channel, state in self.live.items():
+                    log.write(json.dumps({"channel": channel, "time": now, "state": state}, separators=(",", ":")))
+                    log.write("\n")
+                log.flush()
+                os.fsync(log.fileno())
+
+            os.replace(temp, self.filename)
+            before, self.records = self.records, len(self.live)
+
+        logging.info(f"Compacted {self.filename}: {before} records to {self.records}")
@@ -0,0 +1,387 @@
+"""
+supervisor.py
+
+Shards rooms across worker processes, so moderation of many busy rooms is
+not bound to a single interpreter lock.
+
+Supervisor and shards talk over one multiprocessing Pipe per shard, with
+pickled (kind, request_id, payload) tuples:
+
+    supervisor -> shard   ("join", id, {"channel": ..., "notification_id": ...})
+                          ("leave", id, channel)
+                          ("stats", id, None)
+                          ("stop", id, None)
+    shard -> supervisor   ("reply", id, result)
+                          ("released", None, channel)
+                          ("resumed", None, [channel, ...])
+
+A shard first resumes the rooms of its snapshot file, if any, and reports
+them with "resumed" before it serves any request.
+"""
+
+import concurrent.futures
+import itertools
+import logging
+import multiprocessing
+import os
+import threading
+
+from .automod import AutoModClient
+from .clubhouse import Auth
+from .clubhouse import Clubhouse
+from .manager import ChannelManager
+from .snapshot import SnapshotLog
+
+
+class ShardWorker:
+    """ Runs in a shard process: moderates the rooms the supervisor assigns to it. """
+
+    def __init__(self, conn, max_rooms=10, snapshot_file=None):
+        self.conn = conn
+        snapshots = SnapshotLog(snapshot_file) if snapshot_file else None
+        self.manager = ChannelManager(max_rooms, on_release=self.released, snapshots=snapshots)
+        self.lock = threading.Lock()
+
+    def send(self, kind, request_id, payload):
+        with self.lock:
+            self.conn.send((kind, request_id, payload))
+
+    def serve(self):
+        """ (ShardWorker) -> NoneType
+
+        Handle requests until told to stop or the supervisor goes away.
+        Every request but stop is handled on its own thread, so a slow join
+        does not hold up stats or other joins.
+        """
+        self.manager.resume()
+        self.send("resumed", None, sorted(self.manager.rooms))
+
+        while True:
+            try:
+                kind, request_id, payload = self.conn.recv()
+            except EOFError:
+                self.manager.stop()
+                break
+
+            if kind == "stop":
+                self.manager.stop()
+                Clubhouse.shutdown()
+                self.send("reply", request_id, True)
+                break
+
+            handler = getattr(self, f"handle_{kind}", None)
+            thread = threading.Thread(target=self.reply, args=(handler, request_id, payload))
+            thread.daemon = True
+            thread.start()
+
+    def reply(self, handler, request_id, payload):
+        result = None
+        try:
+            result = handler(payload)
+        except Exception as error:
+            logging.exception(f"Shard {os.getpid()} {error}")
+        self.send("reply", request_id, result)
+
+    def handle_join(self, payload):
+        return self.manager.join(payload.get("channel"), payload.get("notification_id"))
+
+    def handle_leave(self, channel):
+        self.manager.leave(channel)
+        return True
+
+    def handle_stats(self, payload):
+        rooms = {}
+        for channel, session in self.manager.sessions().items():
+            rooms[channel] = {
+                "state": session.room_state.state if session.room_state else None,
+                "active": bool(session.automod_active),
+                "speaker": bool(session.active_speaker),
+                "mod": bool(session.active_mod),
+                "guests": len(session.screened_user_set),
+                "activity_per_min": round(session.activity.rate(), 2),
+                "actions": session.actions.stats(),
+            }
+
+        return {
+            "pid": os.getpid(),
+            "rooms": rooms,
+            "jobs": len(Clubhouse.scheduler.jobs()),
+            "tasks": Clubhouse.lifecycle.stats(),
+            "requests": Auth.transport.metrics.snapshot(),
+        }
+
+    def released(self, channel):
+        self.send("released", None, channel)
+
+
+def run_shard(conn, max_rooms=10, snapshot_file=None):
+    """ Entry point of a shard process. """
+    ShardWorker(conn, max_rooms, snapshot_file).serve()
+
+
+class Shard:
+    """ Supervisor side of one shard process. """
+
+    def __init__(self, index, process, conn, supervisor):
+        self.index = index
+        self.process = process
+        self.conn = conn
+        self.supervisor = supervisor
+        self.rooms = set()
+        self.pending = {}
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+        self.alive = True
+        # Set once the shard reported the rooms it resumed
+        self.ready = threading.Event()
+
+        self.reader = threading.Thread(target=self.read, name=f"automod-shard-{index}-reader")
+        self.reader.daemon = True
+        self.reader.start()
+
+    def __str__(self):
+        return f"Shard(index={self.index}, pid={self.process.pid}, rooms={len(self.rooms)}, alive={self.alive})"
+
+    def call(self, kind, payload=None):
+        """ (Shard, str, any) -> concurrent.futures.Future
+
+        Send a request to the shard, the future resolves with its reply.
+        It resolves with None if the shard is dead or dies before replying.
+        """
+        future = concurrent.futures.Future()
+        with self.lock:
+            if not self.alive:
+                future.set_result(None)
+                return future
+
+            request_id = next(self.counter)
+            self.pending[request_id] = future
+            try:
+                self.conn.send((kind, request_id, payload))
+                return future
+            except (OSError, EOFError, ValueError) as error:
+                logging.error(f"{self} {kind} {error}")
+
+        self.close()
+        return future
+
+    def read(self):
+        while True:
+            try:
+                kind, request_id, payload = self.conn.recv()
+            except (EOFError, OSError):
+                break
+
+            if kind == "reply":
+                with self.lock:
+                    future = self.pending.pop(request_id, None)
+                if future:
+                    future.set_result(payload)
+
+            elif kind == "released":
+                self.supervisor.release(payload, self)
+
+            elif kind == "resumed":
+                self.supervisor.assign(payload, self)
+                self.ready.set()
+
+        self.close()
+
+    def close(self):
+        """ (Shard) -> bool
+
+        Mark the shard dead once its pipe is broken: pending requests resolve
+        with None and its rooms are released. Returns False if it already was.
+        """
+        with self.lock:
+            if not self.alive:
+                return False
+            self.alive = False
+            pending, self.pending = self.pending, {}
+
+        self.ready.set()
+        for future in pending.values():
+            future.set_result(None)
+
+        self.supervisor.shard_exited(self)
+        return True
+
+
+class Supervisor:
+    """
+    Listens for pings in this process and shards the rooms across worker processes.
+
+    Each shard process runs a ChannelManager for up to rooms_per_process
+    rooms. A ping is forwarded to the least loaded shard with capacity. Rooms
+    a shard leaves are released here too, so its load stays accurate.
+
+    With snapshot_file, every shard snapshots its rooms to a file of its own,
+    snapshot_file.<shard index>, and resumes them when started again.
+
+    >>> supervisor = Supervisor(processes=4)
+    >>> supervisor.run()
+    """
+
+    def __init__(self, processes=None, rooms_per_process=10, call_timeout=60, snapshot_file=None):
+        self.processes = processes if processes else os.cpu_count()
+        self.rooms_per_process = rooms_per_process
+        self.call_timeout = call_timeout
+        self.snapshot_file = snapshot_file
+        self.shards = []
+        self.rooms = {}
+        self.listener = None
+        self.stopping = False
+        self.lock = threading.Lock()
+
+    def __str__(self):
+        return f"Supervisor(shards={len(self.shards)}, rooms={len(self.rooms)})"
+
+    def start(self):
+        """ (Supervisor) -> NoneType
+
+        Start the shard processes. Shards are spawned, not forked, so they do
+        not inherit this process's threads and locks.
+        """
+        context = multiprocessing.get_context("spawn")
+        for index in range(self.processes):
+            conn, shard_conn = context.Pipe()
+            snapshot_file = f"{self.snapshot_file}.{index}" if self.snapshot_file else None
+            process = context.Process(
+                target=run_shard, args=(shard_conn, self.rooms_per_process, snapshot_file),
+                name=f"automod-shard-{index}")
+            process.daemon = True
+            process.start()
+            shard_conn.close()
+            self.shards.append(Shard(index, process, conn, self))
+
+        logging.info(f"Started: {self}")
+
+    def run(self, interval=300):
+        """ (Supervisor, int) -> ScheduledJob
+
+        Start the shards and listen for pings, forwarding every room to a shard.
+        Pings are only listened for once every shard has resumed its rooms.
+        """
+        if not self.shards:
+            self.start()
+
+        for shard in self.shards:
+            if not shard.ready.wait(self.call_timeout):
+                logging.error(f"{shard} did not report its resumed rooms")
+
+        self.listener = AutoModClient()
+        self.listener.manager = self
+        self.listener.automod_active = False
+        self.listener.waiting_ping_thread = self.listener.listen_for_ping(interval)
+        return self.listener.waiting_ping_thread
+
+    def join(self, channel, notification_id=None):
+        """ (Supervisor, str, str) -> bool
+
+        Assign channel to the least loaded shard.
+        Returns None when every shard is at capacity or the shard died, so the
+        ping is tried again.
+        """
+        with self.lock:
+            if channel in self.rooms:
+                return True
+
+            shards = [_ for _ in self.shards if _.alive and len(_.rooms) < self.rooms_per_process]
+            if not shards:
+                logging.info(f"Every shard is at capacity, not joining {channel}")
+                return None
+
+            shard = min(shards, key=lambda _: len(_.rooms))
+            shard.rooms.add(channel)
+            self.rooms[channel] = shard
+
+        payload = {"channel": channel, "notification_id": notification_id}
+        future = shard.call("join", payload)
+        try:
+            join = future.result(self.call_timeout)
+        except concurrent.futures.TimeoutError:
+            # The shard may still join the room: it stays assigned until the reply
+            # says otherwise, so the next ping for it is not sent to another shard
+            logging.error(f"{shard} did not answer joining {channel} in time, waiting for its reply")
+            future.add_done_callback(lambda _: self.joined(channel, shard, _.result()))
+            return None
+
+        return self.joined(channel, shard, join)
+
+    def joined(self, channel, shard, join):
+        """ Keep channel on shard if it joined, release it otherwise. """
+        if not join:
+            self.release(channel, shard)
+        else:
+            logging.info(f"Assigned: {channel} to {shard}")
+        return join
+
+    def leave(self, channel):
+        shard = self.rooms.get(channel)
+        if shard:
+            shard.call("leave", channel).result(self.call_timeout)
+
+    def assign(self, channels, shard):
+        """ Record rooms shard moderates without the supervisor having sent them, i.e. resumed ones. """
+        with self.lock:
+            for channel in channels:
+                self.rooms[channel] = shard
+                shard.rooms.add(channel)
+
+        if channels:
+            logging.info(f"Resumed: {len(channels)} rooms on {shard}")
+
+    def release(self, channel, shard=None):
+        """ Forget channel once its shard has left it, or failed to join it. """
+        with self.lock:
+            if shard is not None and self.rooms.get(channel) is not shard:
+                return
+            shard = self.rooms.pop(channel, None)
+            if shard:
+                shard.rooms.discard(channel)
+
+    def shard_exited(self, shard):
+        with self.lock:
+            for channel in shard.rooms:
+                self.rooms.pop(channel, None)
+            shard.rooms = set()
+
+        if self.stopping:
+            logging.info(f"Exited: {shard}")
+        else:
+            logging.error(f"Exited: {shard}")
+
+    def stats(self):
+        """ (Supervisor) -> dict
+
+        Room and request stats of every live shard, by shard index.
+        """
+        futures = {shard.index: shard.call("stats") for shard in self.shards if shard.alive}
+        stats = {}
+        for index, future in futures.items():
+            try:
+                stats[index] = future.result(self.call_timeout)
+            except concurrent.futures.TimeoutError:
+                stats[index] = None
+        return stats
+
+    def stop(self):
+        """ (Supervisor) -> NoneType
+
+        Stop listening for pings, make every shard leave its rooms and exit.
+        """
+        self.stopping = True
+        if self.listener and self.listener.waiting_ping_thread:
+            self.listener.waiting_ping_thread.set()
+
+        futures = [shard.call("stop") for shard in self.shards if shard.alive]
+        for future in futures:
+            try:
+                future.result(self.call_timeout)
+            except concurrent.futures.TimeoutError:
+                pass
+
+        for shard in self.shards:
+            shard.process.join(self.call_timeout)
+
+        logging.info(f"Stopped: {self}")
@@ -9,6 +9,7 @@ import pytz
 import boto3
 
 from .clubhouse import Config
+from .roster import encode_record
 
 
 class Tracker:
@@ -43,7 +44,8 @@ class Tracker:
         :rtype: bool
         """
         if isinstance(dump, dict):
-            dump = json.dumps(dump)
+            # Users of lean responses are UserRecords
+            dump = json.dumps(dump, default=encode_record)
         s3_client = boto3.client("s3")
         bucket = self.S3_BUCKET
         timestamp = datetime.now(pytz.timezone('UTC')).isoformat()
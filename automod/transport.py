@@ -0,0 +1,252 @@
+"""
+transport.py
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .ratelimit import RateLimiter
+from .breaker import CircuitBreakers
+from .metrics import Metrics
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """ The latency budget of the surrounding Deadline ran out before the request was sent. """
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """ The circuit breaker for the host is open, the request was not sent. """
+
+
+class Deadline:
+    """
+    Latency budget shared by every request made inside the with block.
+
+    Deadlines are tracked per thread and per asyncio task, and nest: an inner
+    deadline never extends the one around it. Both transports shorten their
+    timeouts and rate limit waits to what is left, and raise DeadlineExceeded
+    once nothing is left.
+
+    >>> with Deadline(10):
+    ...     channel_info = self.channel.get_channel(channel)
+    """
+
+    stack = contextvars.ContextVar("deadlines", default=())
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.expires = None
+        self.token = None
+
+    def __enter__(self):
+        self.expires = time.monotonic() + self.budget
+        outer = Deadline.current()
+        if outer is not None:
+            self.expires = min(self.expires, outer.expires)
+
+        self.token = self.stack.set(self.stack.get() + (self,))
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stack.reset(self.token)
+
+    def remaining(self):
+        return max(0, self.expires - time.monotonic())
+
+    @staticmethod
+    def current():
+        """ () -> Deadline or NoneType
+
+        Innermost deadline active in this thread or task.
+        """
+        stack = Deadline.stack.get()
+        return stack[-1] if stack else None
+
+    @staticmethod
+    def time_left():
+        """ () -> float or NoneType
+
+        Seconds left on the current deadline, None if there is no deadline.
+        """
+        deadline = Deadline.current()
+        return deadline.remaining() if deadline else None
+
+
+def get_endpoint(url):
+    """ (str) -> str
+
+    Name of the endpoint a url points at, e.g. get_channel.
+    """
+    return url.split("?", 1)[0].rstrip("/").rsplit("/", 1)[-1]
+
+
+def get_host(url):
+    """ (str) -> str
+
+    Host a url points at, e.g. www.clubhouseapi.com.
+    """
+    return urlsplit(url).netloc
+
+
+def get_body_size(body):
+    """ (bytes or str) -> int
+
+    Size in bytes of a prepared request body.
+    """
+    if not body:
+        return 0
+    if isinstance(body, str):
+        return len(body.encode())
+    if isinstance(body, bytes):
+        return len(body)
+    # Streamed multipart uploads
+    return 0
+
+
+class Transport:
+    """
+    Connection-pooled HTTP transport shared by every Auth subclass.
+
+    One requests.Session is mounted with a pooled HTTPAdapter so repeated polls
+    against the same host reuse an open TCP/TLS connection instead of paying a
+    fresh handshake on every call. urllib3's pool is thread-safe, so a single
+    Transport can be used from every set_interval loop at once.
+
+    Every request first waits on the rate limiter bucket for its endpoint, so
+    callers never need to sleep between calls themselves.
+
+    Every request has connect and read timeouts, so a hung socket cannot freeze
+    the loop that made the call.
+
+    Each host has a circuit breaker. Connection errors, timeouts and 5xx replies
+    count as failures; while a host's circuit is open, requests to it fail fast
+    with CircuitOpenError instead of piling onto an outage.
+
+    Every request is recorded in metrics: status code or error, latency, bytes
+    sent and received, and time spent waiting on the rate limiter.
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=20, pool_block=False, keep_alive=True, limiter=None,
+                 connect_timeout=3.05, read_timeout=10, breakers=None, metrics=None):
+        """ (Transport, int, int, bool, bool, RateLimiter, float, float, CircuitBreakers, Metrics) -> NoneType
+
+        pool_connections is the number of hosts to keep pools for,
+        pool_maxsize the number of open connections kept per host.
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self.limiter = limiter if limiter else RateLimiter()
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.breakers = breakers if breakers else CircuitBreakers()
+        self.metrics = metrics if metrics else Metrics()
+        self.lock = threading.Lock()
+        self.session = self.build_session()
+
+    def __str__(self):
+        return "Transport(pool_connections={}, pool_maxsize={}, keep_alive={}, timeout={})".format(
+            self.pool_connections,
+            self.pool_maxsize,
+            self.keep_alive,
+            (self.connect_timeout, self.read_timeout)
+        )
+
+    def build_session(self):
+        """ (Transport) -> requests.Session
+
+        Create a session with a pooled adapter mounted for http and https.
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def request(self, method, url, headers=None, endpoint=None, **kwargs):
+        """ (Transport, str, str, dict, str) -> requests.Response
+
+        Send a request through the pooled session.
+        endpoint names the rate limit bucket, it defaults to the last url path segment.
+        """
+        endpoint = endpoint if endpoint else get_endpoint(url)
+        headers = dict(headers) if headers else {}
+        headers["Connection"] = "keep-alive" if self.keep_alive else "close"
+
+        breaker = self.breakers.get(get_host(url))
+        if not breaker.allow_request():
+            self.metrics.record_request(endpoint, method, error="CircuitOpenError")
+            raise CircuitOpenError(f"Circuit open for {breaker.name}, retry in {breaker.retry_after():.0f}s")
+
+        queued = time.perf_counter()
+        if not self.limiter.acquire(endpoint, Deadline.time_left()):
+            self.metrics.record_request(
+                endpoint, method, queue_time=time.perf_counter() - queued, error="DeadlineExceeded")
+            raise DeadlineExceeded(f"Deadline exceeded waiting for the {endpoint} rate limit")
+
+        kwargs.setdefault("timeout", self.get_timeout())
+        started = time.perf_counter()
+        queue_time = started - queued
+        try:
+            response = self.session.request(method, url, headers=headers, **kwargs)
+
+        except requests.exceptions.RequestException as req_error:
+            if isinstance(req_error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+                breaker.record_failure()
+            self.metrics.record_request(
+                endpoint, method, latency=time.perf_counter() - started, queue_time=queue_time,
+                error=type(req_error).__name__)
+            raise
+
+        latency = time.perf_counter() - started
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+        self.limiter.update(endpoint, response)
+        self.metrics.record_request(
+            endpoint, method, response.status_code, latency, get_body_size(response.request.body),
+            len(response.content), queue_time)
+
+        return response
+
+    def get_timeout(self):
+        """ (Transport) -> tuple
+
+        (connect, read) timeouts, shortened to what is left of the current deadline.
+        """
+        time_left = Deadline.time_left()
+        if time_left is None:
+            return self.connect_timeout, self.read_timeout
+
+        if time_left <= 0:
+            raise DeadlineExceeded("Deadline exceeded before the request was sent")
+
+        return min(self.connect_timeout, time_left), min(self.read_timeout, time_left)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        """ (Transport) -> NoneType
+
+        Close every pooled connection.
+        """
+        with self.lock:
+            self.session.close()
+            logging.info(f"Closed: {self}")
@@ -12,6 +12,10 @@ setup(
         "rich",
         "secrets",
     ],
+    extras_require={
+        "fast": ["orjson"],
+        "async": ["aiohttp"],
+    },
     entry_points={
         "console_scripts": ["run_automod=automod.automod:run_automod_client"]
     }
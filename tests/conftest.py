@@ -0,0 +1,19 @@
+"""
+conftest.py
+
+The tests cover the modules of automod that need nothing but the standard
+library. automod/__init__.py imports the whole client and its dependencies,
+so the package is registered here without running it, and the modules under
+test are imported on their own.
+"""
+
+import os
+import sys
+import types
+
+PACKAGE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "automod")
+
+if "automod" not in sys.modules:
+    automod = types.ModuleType("automod")
+    automod.__path__ = [PACKAGE]
+    sys.modules["automod"] = automod
@@ -0,0 +1,100 @@
+"""
+test_actions.py
+"""
+
+from automod.actions import ActionQueue
+
+
+class FakeBucket:
+    def __init__(self, wait=0):
+        self.wait = wait
+        self.reserved = 0
+
+    def reserve(self):
+        self.reserved += 1
+        return self.wait
+
+    def refund(self):
+        self.reserved -= 1
+
+
+class FakeLimiter:
+    def __init__(self, waits=None):
+        self.buckets = {endpoint: FakeBucket(wait) for endpoint, wait in (waits or {}).items()}
+
+    def bucket(self, endpoint):
+        return self.buckets.setdefault(endpoint, FakeBucket())
+
+
+def test_runs_by_priority_then_first_in():
+    queue = ActionQueue()
+    ran = []
+    queue.put(ActionQueue.WELCOME, ("welcome", 1), ran.append, "welcome 1")
+    queue.put(ActionQueue.INVITE_SPEAKER, ("invite", 1), ran.append, "invite 1")
+    queue.put(ActionQueue.ANNOUNCEMENT, ("announcement",), ran.append, "announcement")
+    queue.put(ActionQueue.INVITE_SPEAKER, ("invite", 2), ran.append, "invite 2")
+    queue.put(ActionQueue.PROMOTE_MOD, ("mod", 3), ran.append, "mod 3")
+
+    assert queue.drain() == 5
+    assert ran == ["mod 3", "invite 1", "invite 2", "welcome 1", "announcement"]
+    assert len(queue) == 0
+
+
+def test_duplicate_keys_are_dropped():
+    queue = ActionQueue()
+    assert queue.put(ActionQueue.INVITE_SPEAKER, ("invite", 1), print)
+    assert not queue.put(ActionQueue.INVITE_SPEAKER, ("invite", 1), print)
+    assert queue.stats()["duplicates"] == 1
+    assert len(queue) == 1
+
+
+def test_key_can_be_queued_again_once_taken():
+    queue = ActionQueue()
+    queue.put(ActionQueue.INVITE_SPEAKER, ("invite", 1), print)
+    assert queue.get().key == ("invite", 1)
+    assert queue.put(ActionQueue.INVITE_SPEAKER, ("invite", 1), print)
+
+
+def test_drain_stops_at_the_limit():
+    queue = ActionQueue()
+    for user_id in range(5):
+        queue.put(ActionQueue.WELCOME, ("welcome", user_id), lambda: None)
+    assert queue.drain(limit=2) == 2
+    assert len(queue) == 3
+
+
+def test_drain_leaves_actions_that_would_wait():
+    queue = ActionQueue()
+    limiter = FakeLimiter({"send_channel_message": 1.5})
+    ran = []
+    queue.put(ActionQueue.WELCOME, ("welcome", 1), ran.append, "welcome")
+    queue.put(ActionQueue.INVITE_SPEAKER, ("invite", 1), ran.append, "invite")
+
+    assert queue.drain(limiter=limiter) == 1
+    assert ran == ["invite"]
+    assert queue.peek().key == ("welcome", 1)
+    assert limiter.bucket("send_channel_message").reserved == 0
+
+
+def test_failing_action_does_not_stop_the_drain():
+    queue = ActionQueue()
+    ran = []
+    queue.put(ActionQueue.PROMOTE_MOD, ("mod", 1), lambda: 1 / 0)
+    queue.put(ActionQueue.WELCOME, ("welcome", 1), ran.append, "welcome")
+    assert queue.drain() == 2
+    assert ran == ["welcome"]
+
+
+def test_stats_and_clear():
+    queue = ActionQueue()
+    queue.put(ActionQueue.WELCOME, ("welcome", 1), print)
+    queue.put(ActionQueue.WELCOME, ("welcome", 2), print)
+    queue.put(ActionQueue.PROMOTE_MOD, ("mod", 1), print)
+
+    stats = queue.stats()
+    assert stats["depth"] == 3
+    assert stats["queued"]["welcome"] == 2 and stats["queued"]["promote_mod"] == 1
+
+    queue.clear()
+    assert len(queue) == 0
+    assert queue.put(ActionQueue.WELCOME, ("welcome", 1), print)
@@ -0,0 +1,118 @@
+"""
+test_breaker.py
+"""
+
+import pytest
+
+from automod import breaker
+from automod.breaker import CircuitBreaker
+from automod.breaker import CircuitBreakers
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(breaker.time, "monotonic", clock)
+    return clock
+
+
+def open_breaker(clock, failure_threshold=3, recovery_timeout=30):
+    circuit = CircuitBreaker("host", failure_threshold, recovery_timeout)
+    for _ in range(failure_threshold):
+        circuit.record_failure()
+    return circuit
+
+
+def test_closed_until_the_threshold(clock):
+    circuit = CircuitBreaker("host", failure_threshold=3)
+    circuit.record_failure()
+    circuit.record_failure()
+    assert circuit.state == CircuitBreaker.CLOSED
+    assert circuit.allow_request()
+
+    circuit.record_failure()
+    assert circuit.state == CircuitBreaker.OPEN
+
+
+def test_success_resets_the_failures(clock):
+    circuit = CircuitBreaker("host", failure_threshold=3)
+    circuit.record_failure()
+    circuit.record_failure()
+    circuit.record_success()
+    circuit.record_failure()
+    circuit.record_failure()
+    assert circuit.state == CircuitBreaker.CLOSED
+
+
+def test_open_fails_fast(clock):
+    circuit = open_breaker(clock, recovery_timeout=30)
+    assert not circuit.allow_request()
+    clock.now += 10
+    assert not circuit.allow_request()
+    assert circuit.retry_after() == pytest.approx(20)
+
+
+def test_half_open_lets_one_trial_through(clock):
+    circuit = open_breaker(clock, recovery_timeout=30)
+    clock.now += 30
+    assert circuit.allow_request()
+    assert circuit.state == CircuitBreaker.HALF_OPEN
+    assert not circuit.allow_request()
+    assert circuit.retry_after() == 0
+
+
+def test_trial_success_closes(clock):
+    circuit = open_breaker(clock)
+    clock.now += 30
+    circuit.allow_request()
+    circuit.record_success()
+    assert circuit.state == CircuitBreaker.CLOSED
+    assert circuit.allow_request()
+
+
+def test_trial_failure_reopens(clock):
+    circuit = open_breaker(clock)
+    clock.now += 30
+    circuit.allow_request()
+    circuit.record_failure()
+    assert circuit.state == CircuitBreaker.OPEN
+    assert not circuit.allow_request()
+
+
+def test_lost_trial_is_replaced(clock):
+    circuit = open_breaker(clock, recovery_timeout=30)
+    clock.now += 30
+    assert circuit.allow_request()
+    clock.now += 31
+    assert circuit.allow_request()
+
+
+def test_one_breaker_per_host_and_listeners(clock):
+    transitions = []
+    breakers = CircuitBreakers(failure_threshold=1, recovery_timeout=30)
+    breakers.add_listener(lambda *transition: transitions.append(transition))
+
+    assert breakers.get("a") is breakers.get("a")
+    breakers.get("a").record_failure()
+    clock.now += 30
+    breakers.get("a").allow_request()
+
+    assert breakers.states() == {"a": CircuitBreaker.HALF_OPEN}
+    assert transitions == [("a", "closed", "open"), ("a", "open", "half_open")]
+
+
+def test_failing_listener_does_not_break_transitions(clock):
+    def listener(*transition):
+        raise ValueError("listener")
+
+    circuit = CircuitBreaker("host", failure_threshold=1, listeners=[listener])
+    circuit.record_failure()
+    assert circuit.state == CircuitBreaker.OPEN
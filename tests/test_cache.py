@@ -0,0 +1,131 @@
+"""
+test_cache.py
+"""
+
+import pytest
+
+from automod import cache
+from automod.cache import DiskCache
+from automod.cache import MemoryCache
+from automod.cache import ResponseCache
+from automod.cache import cached
+from automod.cache import invalidates
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Endpoints:
+    def __init__(self, user_id="1", response_cache=None):
+        self.HEADERS = {"CH-UserID": user_id}
+        self.response_cache = response_cache if response_cache else ResponseCache(ttls={"get_profile": 60})
+        self.calls = []
+        self.success = True
+
+    @cached
+    def get_profile(self, user_id):
+        self.calls.append(("get_profile", user_id))
+        return {"success": self.success, "user_id": user_id}
+
+    @invalidates("get_profile")
+    def update_bio(self, bio):
+        self.calls.append(("update_bio", bio))
+        return {"success": self.success}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache.time, "time", clock)
+    return clock
+
+
+def test_cached_until_the_ttl(clock):
+    endpoints = Endpoints()
+    assert endpoints.get_profile(5)["user_id"] == 5
+    endpoints.get_profile(5)
+    assert endpoints.calls == [("get_profile", 5)]
+
+    clock.now += 61
+    endpoints.get_profile(5)
+    assert len(endpoints.calls) == 2
+
+
+def test_cached_per_arguments_and_account(clock):
+    shared = ResponseCache()
+    first, second = Endpoints("1", shared), Endpoints("2", shared)
+    first.get_profile(5)
+    first.get_profile(6)
+    second.get_profile(5)
+    assert len(first.calls) == 2 and len(second.calls) == 1
+
+
+def test_failures_are_not_cached(clock):
+    endpoints = Endpoints()
+    endpoints.success = False
+    endpoints.get_profile(5)
+    endpoints.get_profile(5)
+    assert len(endpoints.calls) == 2
+
+
+def test_callers_get_their_own_copy(clock):
+    endpoints = Endpoints()
+    endpoints.get_profile(5).pop("user_id")
+    assert endpoints.get_profile(5)["user_id"] == 5
+
+
+def test_successful_change_invalidates(clock):
+    endpoints = Endpoints()
+    endpoints.get_profile(5)
+    endpoints.update_bio("bio")
+    endpoints.get_profile(5)
+    assert endpoints.calls == [("get_profile", 5), ("update_bio", "bio"), ("get_profile", 5)]
+    assert Endpoints.update_bio.invalidated == ("get_profile",)
+
+
+def test_failed_change_keeps_the_cache(clock):
+    endpoints = Endpoints()
+    endpoints.get_profile(5)
+    endpoints.success = False
+    endpoints.update_bio("bio")
+    endpoints.get_profile(5)
+    assert endpoints.calls.count(("get_profile", 5)) == 1
+
+
+def test_listeners_hear_invalidations():
+    response_cache = ResponseCache()
+    heard = []
+    response_cache.add_listener(heard.append)
+    response_cache.invalidate("get_profile", "get_club")
+    assert heard == ["get_profile", "get_club"]
+
+
+def test_zero_ttl_is_never_stored():
+    response_cache = ResponseCache(ttls={"feed": 0})
+    response_cache.set(("feed", "1", (), ()), {"success": True})
+    assert response_cache.get(("feed", "1", (), ())) is None
+
+
+def test_memory_cache_evicts_least_recently_used(clock):
+    memory = MemoryCache(maxsize=2)
+    memory.set(("a",), 1, 60)
+    memory.set(("b",), 2, 60)
+    memory.get(("a",))
+    memory.set(("c",), 3, 60)
+    assert memory.get(("b",)) is None
+    assert memory.get(("a",)) == 1 and memory.get(("c",)) == 3
+
+
+def test_disk_cache_survives_reopening(clock, tmp_path):
+    filename = str(tmp_path / "cache")
+    DiskCache(filename).set(("get_profile", "1", (5,), ()), {"user_id": 5}, 60)
+    disk = DiskCache(filename)
+    assert disk.get(("get_profile", "1", (5,), ())) == {"user_id": 5}
+
+    assert disk.invalidate("get_profile") == 1
+    assert disk.get(("get_profile", "1", (5,), ())) is None
@@ -0,0 +1,133 @@
+"""
+test_dedupe.py
+"""
+
+import threading
+
+import pytest
+
+from automod import dedupe
+from automod.dedupe import BloomSet
+from automod.dedupe import BoundedSet
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(dedupe.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_behaves_like_a_set():
+    items = BoundedSet([1, 2, 2, 3])
+    assert len(items) == 3
+    assert 2 in items and 4 not in items
+    items.discard(2)
+    items.discard(9)
+    assert set(items) == {1, 3}
+    items |= {4}
+    assert set(items) == {1, 3, 4}
+    assert items - {1} == {3, 4}
+
+
+def test_maxlen_evicts_oldest_first():
+    items = BoundedSet(range(5), maxlen=3)
+    assert list(items) == [2, 3, 4]
+    assert items.evicted == 2
+
+
+def test_adding_again_renews():
+    items = BoundedSet([1, 2, 3], maxlen=3)
+    items.add(1)
+    items.add(4)
+    assert list(items) == [3, 1, 4]
+
+
+def test_ttl_expires_items(clock):
+    items = BoundedSet(ttl=10)
+    items.add("old")
+    clock[0] += 6
+    items.add("new")
+    clock[0] += 5
+    assert "old" not in items
+    assert "new" in items
+    assert list(items) == ["new"]
+    clock[0] += 10
+    assert len(items) == 0
+    assert items.evicted == 2
+
+
+def test_renewing_resets_ttl(clock):
+    items = BoundedSet(["a"], ttl=10)
+    clock[0] += 8
+    items.add("a")
+    clock[0] += 8
+    assert "a" in items
+
+
+def test_copy_and_union_keep_bounds():
+    items = BoundedSet([1, 2], maxlen=3, ttl=60)
+    union = items.union([3, 4])
+    assert list(union) == [2, 3, 4]
+    assert union.maxlen == 3 and union.ttl == 60
+    assert list(items) == [1, 2]
+
+    copy = items.copy()
+    copy.add(5)
+    assert 5 not in items
+
+
+def test_operators_return_plain_sets():
+    items = BoundedSet([1, 2, 3], maxlen=3)
+    assert items | {4} == {1, 2, 3, 4}
+    assert items & {2, 3, 4} == {2, 3}
+    assert items - {1} == {2, 3}
+    assert items ^ {3, 4} == {1, 2, 4}
+    assert type(items | {4}) is set
+
+    items |= {4}
+    assert isinstance(items, BoundedSet)
+    assert list(items) == [2, 3, 4]
+
+
+def test_concurrent_adds_stay_bounded():
+    items = BoundedSet(maxlen=100)
+
+    def add(start):
+        for item in range(start, start + 1000):
+            items.add(item)
+
+    threads = [threading.Thread(target=add, args=(_ * 1000,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(items) == 100
+    assert items.evicted == 3900
+
+
+def test_bloom_has_no_false_negatives():
+    seen = BloomSet(capacity=1000, error_rate=0.01)
+    seen.update(range(1000))
+    assert all(_ in seen for _ in range(1000))
+    assert len(seen) == 1000
+
+
+def test_bloom_false_positive_rate():
+    seen = BloomSet(capacity=5000, error_rate=0.01)
+    seen |= (f"user-{_}" for _ in range(5000))
+    false_positives = sum(f"other-{_}" in seen for _ in range(20000))
+    assert false_positives / 20000 < 0.02
+
+
+def test_bloom_forgets_after_two_generations():
+    seen = BloomSet(capacity=100, error_rate=0.001)
+    seen.update(range(100))
+    seen.update(range(100, 200))
+    assert 5 in seen and 150 in seen
+    assert len(seen.filters) == 2
+
+    seen.update(range(200, 300))
+    assert 150 in seen and 250 in seen
+    assert sum(_ in seen for _ in range(100)) < 5
@@ -0,0 +1,158 @@
+"""
+test_ratelimit.py
+"""
+
+import time
+
+import pytest
+
+from automod import ratelimit
+from automod.ratelimit import RateLimiter
+from automod.ratelimit import TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, content=b"{}", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers if headers else {}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ratelimit.time, "monotonic", clock)
+    return clock
+
+
+def test_burst_then_wait(clock):
+    bucket = TokenBucket(rate=2, capacity=3)
+    assert [bucket.reserve() for _ in range(3)] == [0, 0, 0]
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+
+
+def test_refill_is_capped(clock):
+    bucket = TokenBucket(rate=1, capacity=2)
+    bucket.reserve()
+    bucket.reserve()
+    clock.now += 60
+    assert [bucket.reserve() for _ in range(2)] == [0, 0]
+    assert bucket.reserve() == pytest.approx(1)
+
+
+def test_refund_gives_the_token_back(clock):
+    bucket = TokenBucket(rate=1, capacity=1)
+    bucket.reserve()
+    wait = bucket.reserve()
+    bucket.refund()
+    assert bucket.reserve() == pytest.approx(wait)
+
+
+def test_throttled_halves_rate_and_waits_retry_after(clock):
+    bucket = TokenBucket(rate=4, capacity=4)
+    bucket.throttled(retry_after=10)
+    assert bucket.rate == 2
+    assert bucket.reserve() == pytest.approx(10 + 1 / 2)
+
+
+def test_throttled_rate_has_a_floor(clock):
+    bucket = TokenBucket(rate=8, capacity=1)
+    for _ in range(10):
+        bucket.throttled()
+    assert bucket.rate == bucket.min_rate == 1
+
+
+def test_succeeded_recovers_up_to_base_rate(clock):
+    bucket = TokenBucket(rate=1, capacity=1, recovery=2)
+    bucket.throttled()
+    bucket.throttled()
+    bucket.succeeded()
+    assert bucket.rate == 0.5
+    bucket.succeeded()
+    bucket.succeeded()
+    assert bucket.rate == 1
+
+
+def test_headroom(clock):
+    bucket = TokenBucket(rate=1, capacity=1)
+    assert bucket.headroom() == 1
+
+    bucket.throttled(retry_after=30)
+    assert bucket.headroom() == 0
+    assert bucket.headroom(grace=30) == 0.5
+
+    clock.now += 31
+    assert bucket.headroom() == 0.5
+
+
+def test_endpoints_get_their_own_buckets():
+    limiter = RateLimiter(limits={"get_channel": (5, 1)}, default_limit=(1, 2))
+    assert limiter.bucket("get_channel") is limiter.bucket("get_channel")
+    assert limiter.bucket("get_channel").base_rate == 5
+    assert limiter.bucket("send_channel_message").base_rate == RateLimiter.LIMITS["send_channel_message"][0]
+    assert limiter.bucket("other").capacity == 2
+    assert limiter.bucket("other") is not limiter.bucket("another")
+
+
+def test_acquire_gives_up_past_timeout(clock):
+    limiter = RateLimiter(limits={"join_channel": (1, 1)})
+    assert limiter.acquire("join_channel", timeout=0)
+    bucket = limiter.bucket("join_channel")
+    tokens = bucket.tokens
+    assert not limiter.acquire("join_channel", timeout=0.5)
+    assert bucket.tokens == tokens
+
+
+def test_acquire_sleeps_for_the_wait(monkeypatch, clock):
+    slept = []
+    monkeypatch.setattr(ratelimit.time, "sleep", slept.append)
+    limiter = RateLimiter(limits={"get_feed": (2, 1)})
+    assert limiter.acquire("get_feed")
+    assert limiter.acquire("get_feed", timeout=1)
+    assert slept == [pytest.approx(0.5)]
+
+
+def test_update_reads_throttle_signals(clock):
+    limiter = RateLimiter()
+    assert limiter.update("get_channel", FakeResponse(429, headers={"Retry-After": "5"}))
+    assert limiter.bucket("get_channel").reserve() >= 5
+
+    assert limiter.update("send_channel_message", FakeResponse(200, b'{"error_message": "Less is more"}'))
+    assert limiter.bucket("send_channel_message").headroom() == 0
+
+    assert not limiter.update("get_feed", FakeResponse(200))
+
+    unreadable = FakeResponse(429, headers={"Retry-After": "soon"})
+    assert RateLimiter.get_retry_after(unreadable) is None
+    assert limiter.update("get_profile", unreadable)
+
+
+def test_headroom_over_endpoints(clock):
+    limiter = RateLimiter()
+    assert limiter.headroom() == 1
+
+    limiter.update("urban_dictionary", FakeResponse(429, headers={"Retry-After": "60"}))
+    assert limiter.headroom() == 0
+    assert limiter.headroom(set(RateLimiter.LIMITS)) == 1
+
+    limiter.update("send_channel_message", FakeResponse(200, b"Less is more"))
+    assert limiter.headroom(set(RateLimiter.LIMITS)) == 0
+    assert limiter.headroom(set(RateLimiter.LIMITS), grace=RateLimiter.THROTTLE_MESSAGE_BACKOFF) == 0.5
+
+
+def test_concurrent_reservations_queue_up():
+    bucket = TokenBucket(rate=10, capacity=1)
+    started = time.monotonic()
+    waits = sorted(bucket.reserve() for _ in range(5))
+    assert time.monotonic() - started < 1
+    assert waits[0] == 0
+    assert waits == sorted(set(waits))
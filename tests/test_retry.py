@@ -0,0 +1,118 @@
+"""
+test_retry.py
+"""
+
+import pytest
+import requests
+
+from automod import retry
+from automod.retry import RetryPolicy
+from automod.transport import Deadline
+from automod.transport import DeadlineExceeded
+
+API_URL = "https://www.clubhouseapi.com/api"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class FakeResponse:
+    def __init__(self, status_code, request):
+        self.status_code = status_code
+        self.request = request
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(retry.time, "monotonic", clock)
+    monkeypatch.setattr(retry.time, "sleep", clock.sleep)
+    return clock
+
+
+def request(endpoint, method="POST"):
+    return requests.Request(method, f"{API_URL}/{endpoint}").prepare()
+
+
+def test_idempotent_requests():
+    policy = RetryPolicy()
+    assert policy.is_idempotent("GET", f"{API_URL}/join_channel")
+    assert policy.is_idempotent("POST", f"{API_URL}/get_channel")
+    assert not policy.is_idempotent("POST", f"{API_URL}/join_channel")
+    assert not policy.is_idempotent(None, f"{API_URL}/get_channel")
+
+
+def test_errors_retried_only_when_safe():
+    policy = RetryPolicy()
+    assert policy.should_retry_error(requests.exceptions.ReadTimeout(request=request("get_channel")))
+    assert policy.should_retry_error(requests.exceptions.ConnectionError(request=request("get_channel")))
+    assert not policy.should_retry_error(requests.exceptions.ReadTimeout(request=request("join_channel")))
+
+    # Nothing reached the server
+    assert policy.should_retry_error(requests.exceptions.ConnectTimeout(request=request("join_channel")))
+
+
+def test_errors_never_retried():
+    policy = RetryPolicy()
+    assert not policy.should_retry_error(DeadlineExceeded(request=request("get_channel")))
+    assert not policy.should_retry_error(requests.exceptions.TooManyRedirects(request=request("get_channel")))
+    assert not policy.should_retry_error(requests.exceptions.ReadTimeout())
+
+
+def test_responses_retried_on_server_errors():
+    policy = RetryPolicy()
+    assert policy.should_retry_response(FakeResponse(503, request("get_channel")))
+    assert not policy.should_retry_response(FakeResponse(503, request("join_channel")))
+    assert not policy.should_retry_response(FakeResponse(429, request("get_channel")))
+    assert not policy.should_retry_response(FakeResponse(503, None))
+
+
+def test_jitter_stays_under_the_cap(monkeypatch):
+    policy = RetryPolicy(backoff=0.25, max_backoff=1)
+    bounds = []
+    monkeypatch.setattr(retry.random, "uniform", lambda low, high: bounds.append((low, high)) or high)
+
+    assert [policy.backoff_time(attempt) for attempt in range(4)] == [0.25, 0.5, 1, 1]
+    assert all(low == 0 for low, _ in bounds)
+
+
+def test_retries_run_out(clock):
+    policy = RetryPolicy(retries=2, backoff=0.25, max_backoff=4, deadline=15)
+    started = clock()
+    assert policy.wait(0, started)
+    assert policy.wait(1, started)
+    assert not policy.wait(2, started)
+    assert len(clock.slept) == 2
+
+
+def test_waits_stay_within_the_total_budget(clock, monkeypatch):
+    monkeypatch.setattr(retry.random, "uniform", lambda low, high: high)
+    policy = RetryPolicy(retries=5, backoff=1, max_backoff=4, deadline=5)
+    started = clock()
+
+    assert policy.next_wait(0, started) == 1
+    clock.now += 3
+    assert policy.next_wait(1, started) == 2
+    clock.now += 1
+    assert policy.next_wait(1, started) is None
+    assert not policy.wait(1, started)
+    assert clock.slept == []
+
+
+def test_waits_stay_within_the_deadline(clock, monkeypatch):
+    monkeypatch.setattr(retry.random, "uniform", lambda low, high: high)
+    policy = RetryPolicy(retries=5, backoff=1, max_backoff=4, deadline=60)
+
+    with Deadline(1.5):
+        assert policy.next_wait(0, clock()) == 1
+        assert policy.next_wait(1, clock()) is None
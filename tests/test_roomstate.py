@@ -0,0 +1,108 @@
+"""
+test_roomstate.py
+"""
+
+import concurrent.futures
+
+import pytest
+
+from automod import roomstate
+from automod.roomstate import RoomState
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(roomstate.time, "monotonic", clock)
+    return clock
+
+
+def test_transitions():
+    room = RoomState("room")
+    assert room.state == RoomState.JOINED
+    assert room.set_state(RoomState.WAITING_SPEAKER)
+    assert not room.set_state(RoomState.WAITING_SPEAKER)
+    assert room.set_state(RoomState.ACTIVE)
+    assert room.set_state(RoomState.RECONNECTING)
+    assert room.set_state(RoomState.ACTIVE)
+
+
+def test_closed_is_final():
+    room = RoomState("room")
+    assert room.set_state(RoomState.CLOSED)
+    assert room.is_closed()
+    assert not room.set_state(RoomState.ACTIVE)
+    assert room.state == RoomState.CLOSED
+
+
+def test_callbacks_run_on_every_entry():
+    room = RoomState("room")
+    entered = []
+    room.on(RoomState.ACTIVE, lambda room_state, previous, state: entered.append((previous, state)))
+
+    room.set_state(RoomState.ACTIVE)
+    room.set_state(RoomState.RECONNECTING)
+    room.set_state(RoomState.ACTIVE)
+    assert entered == [(RoomState.JOINED, RoomState.ACTIVE), (RoomState.RECONNECTING, RoomState.ACTIVE)]
+
+
+def test_failing_callback_does_not_stop_the_others():
+    room = RoomState("room")
+    entered = []
+    room.on(RoomState.ACTIVE, lambda *args: 1 / 0)
+    room.on(RoomState.ACTIVE, lambda *args: entered.append(args[2]))
+    assert room.set_state(RoomState.ACTIVE)
+    assert entered == [RoomState.ACTIVE]
+
+
+def test_when_resolves_with_the_first_state_entered():
+    room = RoomState("room")
+    future = room.when(RoomState.WAITING_MOD, RoomState.ACTIVE)
+    assert not future.done()
+
+    room.set_state(RoomState.WAITING_SPEAKER)
+    assert not future.done()
+    room.set_state(RoomState.WAITING_MOD)
+    assert future.result(0) == RoomState.WAITING_MOD
+
+
+def test_when_already_in_state():
+    room = RoomState("room")
+    room.set_state(RoomState.ACTIVE)
+    assert room.when(RoomState.ACTIVE).result(0) == RoomState.ACTIVE
+
+
+def test_when_cancelled_on_close():
+    room = RoomState("room")
+    future = room.when(RoomState.ACTIVE)
+    room.set_state(RoomState.CLOSED)
+    assert future.cancelled()
+    assert room.when(RoomState.ACTIVE).cancelled()
+
+
+def test_when_times_out():
+    room = RoomState("room")
+    with pytest.raises(concurrent.futures.TimeoutError):
+        room.when(RoomState.ACTIVE).result(0.01)
+
+
+def test_time_in_state(clock):
+    room = RoomState("room")
+    clock.now += 30
+    assert room.time_in_state() == 30
+
+    room.set_state(RoomState.RECONNECTING)
+    clock.now += 5
+    assert room.time_in_state() == 5
+
+    room.set_state(RoomState.RECONNECTING)
+    clock.now += 5
+    assert room.time_in_state() == 10
@@ -0,0 +1,126 @@
+"""
+test_roster.py
+"""
+
+import json
+
+import pytest
+
+from automod.roster import RoomRoster
+from automod.roster import RosterDiff
+from automod.roster import UserRecord
+from automod.roster import encode_record
+
+
+def user(user_id, speaker=False, mod=False, invited=False, **fields):
+    return dict(
+        user_id=user_id,
+        first_name=f"User{user_id}",
+        is_speaker=speaker,
+        is_moderator=mod,
+        is_invited_as_speaker=invited,
+        time_joined_as_speaker="2021-01-01T00:00:00.000000+0000" if speaker else None,
+        photo_url="https://example.com/photo.jpg",
+        **fields
+    )
+
+
+USERS = [
+    user(1, speaker=True, mod=True),
+    user(2, speaker=True),
+    user(3, invited=True),
+    user(4),
+    user(5, speaker=True),
+]
+
+
+def test_record_keeps_only_the_fields_read():
+    record = UserRecord.from_dict(user(7, speaker=True, bio="long"))
+    assert record.get("first_name") == "User7"
+    assert record.get("is_speaker") is True
+    assert record.get("photo_url") is None
+    assert record.get("bio", "missing") == "missing"
+    assert UserRecord.from_dict(record) is record
+    assert set(record.to_dict()) == set(UserRecord.__slots__)
+
+
+def test_record_encodes_to_json():
+    record = UserRecord.from_dict(user(7))
+    assert json.loads(json.dumps({"users": [record]}, default=encode_record)) == {"users": [record.to_dict()]}
+    with pytest.raises(TypeError):
+        encode_record(object())
+
+
+def test_roster_indexes_users():
+    roster = RoomRoster(USERS, creator_id=1)
+    assert len(roster) == 5
+    assert 3 in roster and 9 not in roster
+    assert roster.get(4).first_name == "User4"
+    assert roster.get(9) is None
+    assert roster.speakers == {1, 2, 5}
+    assert roster.moderators == {1}
+    assert roster.invited == {3}
+    assert set(roster.ids()) == {1, 2, 3, 4, 5}
+    assert [_.user_id for _ in roster] == [1, 2, 3, 4, 5]
+
+
+def test_first_speaker_skips_moderators():
+    assert RoomRoster(USERS).first_speaker.user_id == 2
+
+
+def test_host_falls_back_to_first_user():
+    assert RoomRoster(USERS, creator_id=2).host.user_id == 2
+    assert RoomRoster(USERS, creator_id=99).host.user_id == 1
+    assert RoomRoster().host is None
+
+
+def test_from_response():
+    roster = RoomRoster.from_response({"users": USERS, "creator_user_profile_id": 5})
+    assert roster.host.user_id == 5
+    assert len(RoomRoster.from_response(None)) == 0
+    assert len(RoomRoster.from_response({"success": False})) == 0
+
+
+def test_unscreened_keeps_room_order():
+    roster = RoomRoster(USERS)
+    assert [_.user_id for _ in roster.unscreened({2, 4})] == [1, 3, 5]
+    assert roster.unscreened({1, 2, 3, 4, 5}) == []
+
+
+def test_diff_against_no_roster_has_everyone_new():
+    diff = RosterDiff(None, RoomRoster(USERS))
+    assert {_.user_id for _ in diff.joined} == {1, 2, 3, 4, 5}
+    assert {_.user_id for _ in diff.speakers} == {1, 2, 5}
+    assert diff.left == []
+    assert diff.churn() == 5
+
+
+def test_diff_finds_what_changed():
+    previous = RoomRoster(USERS)
+    current = RoomRoster([
+        user(1, speaker=True, mod=True),
+        user(2, speaker=True, mod=True),
+        user(3, speaker=True),
+        user(5, speaker=True),
+        user(6, invited=True),
+    ])
+    diff = RosterDiff(previous, current)
+    assert [_.user_id for _ in diff.joined] == [6]
+    assert [_.user_id for _ in diff.left] == [4]
+    assert [_.user_id for _ in diff.speakers] == [3]
+    assert [_.user_id for _ in diff.moderators] == [2]
+    assert [_.user_id for _ in diff.invited] == [6]
+    assert diff.churn() == 2
+    assert sorted((event, _.user_id) for event, _ in diff.events()) == [
+        ("invited", 6),
+        ("joined", 6),
+        ("left", 4),
+        ("promoted_to_mod", 2),
+        ("promoted_to_speaker", 3),
+    ]
+
+
+def test_unchanged_room_diffs_empty():
+    diff = RosterDiff(RoomRoster(USERS), RoomRoster(USERS))
+    assert not diff
+    assert list(diff.events()) == []
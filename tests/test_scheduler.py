@@ -0,0 +1,156 @@
+"""
+test_scheduler.py
+"""
+
+import threading
+import time
+
+import pytest
+
+from automod.scheduler import Cadence
+from automod.scheduler import Scheduler
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = Scheduler(workers=4)
+    yield scheduler
+    scheduler.shutdown()
+
+
+def wait_for(condition, timeout=2):
+    expires = time.monotonic() + timeout
+    while time.monotonic() < expires:
+        if condition():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def test_fixed_delay_follows_the_last_run():
+    cadence = Cadence()
+    assert cadence.first_due(100, 5, 10) == 105
+    assert cadence.next_due(112, 10) == 122
+    assert cadence.mode() == "fixed_delay"
+
+
+def test_fixed_rate_keeps_to_the_grid():
+    cadence = Cadence(fixed_rate=True)
+    assert cadence.first_due(100, 10, 10) == 110
+    assert cadence.next_due(113, 10) == 120
+    assert cadence.next_due(121, 10) == 130
+    assert cadence.missed == 0
+
+
+def test_fixed_rate_skips_missed_runs():
+    cadence = Cadence(fixed_rate=True)
+    cadence.first_due(100, 10, 10)
+    assert cadence.next_due(145, 10) == 150
+    assert cadence.missed == 3
+
+
+def test_jitter_stays_in_bounds_and_off_the_grid():
+    cadence = Cadence(fixed_rate=True, jitter=0.1)
+    cadence.first_due(0, 10, 10)
+    for run in range(1, 200):
+        due = cadence.next_due(run * 10, 10)
+        assert run * 10 <= due <= (run + 1) * 10 + 1
+        assert cadence.anchor == (run + 1) * 10
+
+
+def test_job_runs_until_it_returns_falsy(scheduler):
+    runs = []
+
+    def tick():
+        runs.append(time.monotonic())
+        return len(runs) < 3
+
+    job = scheduler.schedule_every(0.01, tick, delay=0)
+    assert job.wait(2)
+    assert len(runs) == 3
+    assert job.runs == 3
+    assert job.is_set()
+    assert scheduler.jobs() == []
+
+
+def test_failing_job_stops(scheduler):
+    def fail():
+        raise ValueError("boom")
+
+    job = scheduler.schedule_every(0.01, fail, delay=0)
+    assert job.wait(2)
+    assert job.runs == 1
+
+
+def test_cancel_removes_the_job(scheduler):
+    job = scheduler.schedule_every(60, lambda: True)
+    assert scheduler.jobs() == [job]
+    job.set()
+    assert job.is_set()
+    assert scheduler.jobs() == []
+
+
+def test_jobs_are_ordered_by_due_time(scheduler):
+    late = scheduler.schedule_every(60, lambda: True)
+    early = scheduler.schedule_every(30, lambda: True)
+    later = scheduler.schedule_every(90, lambda: True)
+    assert scheduler.jobs() == [early, late, later]
+    assert [rate["name"] for rate in scheduler.rates()] == [early.name, late.name, later.name]
+
+
+def test_runs_never_overlap(scheduler):
+    running = []
+    overlaps = []
+
+    def slow():
+        if running:
+            overlaps.append(True)
+        running.append(True)
+        time.sleep(0.03)
+        running.pop()
+        return True
+
+    job = scheduler.schedule_every(0.001, slow, delay=0)
+    assert wait_for(lambda: job.runs >= 5)
+    job.set()
+    assert overlaps == []
+
+
+def test_workers_are_started_on_demand_up_to_the_limit(scheduler):
+    release = threading.Event()
+    started = []
+
+    def block(index):
+        started.append(index)
+        release.wait(2)
+        return False
+
+    for index in range(10):
+        scheduler.schedule_every(0.01, block, args=(index,), delay=0)
+
+    assert wait_for(lambda: len(started) == scheduler.workers)
+    assert len(scheduler.threads) == scheduler.workers
+
+    release.set()
+    assert wait_for(lambda: len(started) == 10)
+    assert len(scheduler.threads) == scheduler.workers
+
+
+def test_idle_workers_are_reused(scheduler):
+    done = []
+    for _ in range(3):
+        job = scheduler.schedule_every(0.01, lambda: done.append(True), delay=0)
+        assert job.wait(2)
+        assert wait_for(lambda: scheduler.idle == 1)
+
+    assert len(done) == 3
+    assert len(scheduler.threads) == 1
+
+
+def test_shutdown_cancels_every_job():
+    scheduler = Scheduler(workers=2)
+    jobs = [scheduler.schedule_every(60, lambda: True) for _ in range(3)]
+    scheduler.shutdown()
+    assert all(job.is_set() for job in jobs)
+    assert scheduler.jobs() == []
+    assert not scheduler.running
@@ -0,0 +1,158 @@
+"""
+test_singleflight.py
+"""
+
+import threading
+import time
+
+import pytest
+
+from automod import singleflight
+from automod.singleflight import SingleFlight
+from automod.singleflight import coalesce
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Endpoints:
+    def __init__(self, user_id="1"):
+        self.HEADERS = {"CH-UserID": user_id}
+        self.calls = []
+
+    @coalesce(ttl=5)
+    def get_channel(self, channel):
+        self.calls.append(channel)
+        return {"success": True, "channel": channel, "users": []}
+
+
+def wait_for(condition, timeout=2):
+    expires = time.monotonic() + timeout
+    while time.monotonic() < expires:
+        if condition():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(singleflight.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture(autouse=True)
+def forget():
+    yield
+    Endpoints.get_channel.flights.forget()
+
+
+def test_concurrent_calls_share_one():
+    flights = SingleFlight(ttl=5)
+    release = threading.Event()
+    calls = []
+
+    def call():
+        calls.append(1)
+        release.wait(2)
+        return {"success": True}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.do("key", call)))
+    leader.start()
+    assert wait_for(lambda: "key" in flights.flights)
+
+    followers = [threading.Thread(target=lambda: results.append(flights.do("key", call))) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(2)
+
+    assert len(calls) == 1
+    assert results == [{"success": True}] * 4
+
+
+def test_followers_get_the_error():
+    flights = SingleFlight()
+    release = threading.Event()
+    errors = []
+
+    def call():
+        release.wait(2)
+        raise ValueError("failed")
+
+    def do():
+        try:
+            flights.do("key", call)
+        except ValueError as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=do)]
+    threads[0].start()
+    assert wait_for(lambda: "key" in flights.flights)
+    threads.append(threading.Thread(target=do))
+    threads[1].start()
+    release.set()
+    for thread in threads:
+        thread.join(2)
+
+    assert len(errors) == 2
+    assert flights.results == {}
+
+
+def test_result_shared_within_the_ttl(clock):
+    flights = SingleFlight(ttl=5)
+    calls = []
+    call = lambda: calls.append(1) or {"success": True}
+
+    flights.do("key", call)
+    clock.now += 4
+    flights.do("key", call)
+    assert len(calls) == 1
+
+    clock.now += 1
+    flights.do("key", call)
+    assert len(calls) == 2
+
+
+def test_failures_are_not_shared(clock):
+    flights = SingleFlight(ttl=5)
+    calls = []
+    call = lambda: calls.append(1) or {"success": False}
+
+    flights.do("key", call)
+    flights.do("key", call)
+    assert len(calls) == 2
+
+
+def test_forget(clock):
+    flights = SingleFlight(ttl=5)
+    flights.do("a", lambda: {"success": True})
+    flights.do("b", lambda: {"success": True})
+    flights.forget("a")
+    assert list(flights.results) == ["b"]
+    flights.forget()
+    assert flights.results == {}
+
+
+def test_coalesce_keys_on_account_and_arguments(clock):
+    first, second = Endpoints("1"), Endpoints("2")
+    first.get_channel("room")
+    first.get_channel("room")
+    first.get_channel("other")
+    second.get_channel("room")
+    assert first.calls == ["room", "other"]
+    assert second.calls == ["room"]
+
+
+def test_coalesce_hands_out_copies(clock):
+    endpoints = Endpoints()
+    endpoints.get_channel("room").pop("users")
+    assert "users" in endpoints.get_channel("room")
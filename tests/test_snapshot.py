@@ -0,0 +1,102 @@
+"""
+test_snapshot.py
+"""
+
+import json
+import os
+
+import pytest
+
+from automod.snapshot import SnapshotLog
+
+
+@pytest.fixture
+def filename(tmp_path):
+    return str(tmp_path / "rooms.jsonl")
+
+
+def records(filename):
+    with open(filename) as log:
+        return [json.loads(line) for line in log]
+
+
+def test_empty_log(filename):
+    log = SnapshotLog(filename)
+    assert log.rooms() == {}
+    assert not os.path.exists(filename)
+
+
+def test_latest_state_of_open_rooms(filename):
+    log = SnapshotLog(filename)
+    log.append("a", {"n": 1})
+    log.append("b", {"n": 1})
+    log.append("a", {"n": 2})
+    log.close("b")
+    assert log.rooms() == {"a": {"n": 2}}
+    assert len(records(filename)) == 4
+    assert SnapshotLog(filename).rooms() == {"a": {"n": 2}}
+
+
+def test_closing_an_unknown_room_writes_nothing(filename):
+    log = SnapshotLog(filename)
+    log.append("a", {})
+    log.close("b")
+    assert len(records(filename)) == 1
+
+
+def test_torn_record_is_skipped(filename):
+    log = SnapshotLog(filename)
+    log.append("a", {"n": 1})
+    with open(filename, "a") as torn:
+        torn.write('{"channel": "b", "sta')
+
+    reloaded = SnapshotLog(filename)
+    assert reloaded.rooms() == {"a": {"n": 1}}
+    assert reloaded.records == 1
+
+
+def test_compaction_keeps_one_record_per_open_room(filename):
+    log = SnapshotLog(filename, compact_ratio=2, min_records=5)
+    log.append("b", {"n": 0})
+    log.close("b")
+    for n in range(4):
+        log.append("a", {"n": n})
+
+    assert log.records == 1
+    assert [(_["channel"], _["state"]) for _ in records(filename)] == [("a", {"n": 3})]
+    assert not os.path.exists(f"{filename}.tmp")
+    assert SnapshotLog(filename).rooms() == {"a": {"n": 3}}
+
+
+def test_log_is_appended_to_after_compaction(filename):
+    log = SnapshotLog(filename, compact_ratio=1, min_records=2)
+    for n in range(3):
+        log.append("a", {"n": n})
+    log.append("b", {"n": 0})
+    assert SnapshotLog(filename).rooms() == {"a": {"n": 2}, "b": {"n": 0}}
+
+
+def test_compaction_waits_for_min_records(filename):
+    log = SnapshotLog(filename, compact_ratio=1, min_records=10)
+    for n in range(10):
+        log.append("a", {"n": n})
+    assert log.records == 10
+    log.append("a", {"n": 10})
+    assert log.records == 1
+
+
+def test_failed_compaction_leaves_the_log_intact(filename, monkeypatch):
+    log = SnapshotLog(filename)
+    log.append("a", {"n": 1})
+    log.append("b", {"n": 1})
+    before = records(filename)
+
+    def fail(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", fail)
+    with pytest.raises(OSError):
+        log.compact()
+
+    assert records(filename) == before
+    assert SnapshotLog(filename).rooms() == {"a": {"n": 1}, "b": {"n": 1}}